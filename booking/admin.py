@@ -1,8 +1,13 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import (
     User, ServiceCenter, Vehicle, Mechanic, ServiceCategory,
-    Booking, Invoice, Inventory, Feedback, MechanicRequest
+    BookingSlot, Booking, Invoice, Inventory, Feedback, MechanicRequest, Job, Notification
 )
+from .assignment import update_workload
+from .jobs import requeue_dead
+from .slots import release_slot
+from .stats import record_booking_created, record_booking_deleted
 
 
 @admin.register(User)
@@ -14,7 +19,7 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(ServiceCenter)
 class ServiceCenterAdmin(admin.ModelAdmin):
-    list_display = ['name', 'user', 'phone', 'email', 'is_active', 'created_at']
+    list_display = ['name', 'user', 'phone', 'email', 'bays', 'slot_minutes', 'is_active', 'created_at']
     list_filter = ['is_active']
     search_fields = ['name', 'phone', 'email']
 
@@ -39,12 +44,51 @@ class ServiceCategoryAdmin(admin.ModelAdmin):
     list_filter = ['is_active']
 
 
+@admin.register(BookingSlot)
+class BookingSlotAdmin(admin.ModelAdmin):
+    list_display = ['service_center', 'date', 'start_time', 'booked']
+    list_filter = ['service_center', 'date']
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ['id', 'vehicle', 'service_center', 'status', 'booking_date', 'estimated_cost']
     list_filter = ['status', 'booking_date', 'service_center']
     search_fields = ['vehicle__registration_number', 'service_center__name']
 
+    # What the booking counters (booking/stats.py), slots and mechanic
+    # workloads are kept by; change the status from the service center's
+    # booking page, which goes through Booking.apply_changes.
+    counted_fields = ['status', 'service_center', 'vehicle', 'booking_date', 'slot', 'mechanic', 'version']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return super().get_readonly_fields(request, obj)
+        return [*super().get_readonly_fields(request, obj), *self.counted_fields]
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if not change:
+                record_booking_created(obj)
+                update_workload(None, None, obj.mechanic_id, obj.status)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            self._uncount(obj)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for booking in queryset.select_related('vehicle', 'service_center'):
+                self._uncount(booking)
+            super().delete_queryset(request, queryset)
+
+    def _uncount(self, booking):
+        record_booking_deleted(booking)
+        release_slot(booking)
+        update_workload(booking.mechanic_id, booking.status, None, None)
+
 
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
@@ -74,4 +118,21 @@ class MechanicRequestAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'max_attempts', 'run_at', 'updated_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['claim', 'claimed_at', 'last_error', 'created_at', 'updated_at']
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected dead jobs')
+    def requeue(self, request, queryset):
+        self.message_user(request, f'{requeue_dead(queryset)} job(s) requeued.')
+
 
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipient', 'created_at', 'sent_at']
+    list_filter = ['sent_at']
+    search_fields = ['recipient__username', 'subject']
+    readonly_fields = ['claim', 'claimed_at', 'created_at', 'sent_at']
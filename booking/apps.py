@@ -5,5 +5,8 @@ class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
 
 
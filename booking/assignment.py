@@ -0,0 +1,130 @@
+"""Mechanic workload tracking and automatic assignment.
+
+``Mechanic.open_bookings`` counts the bookings assigned to a mechanic that
+are still ``accepted`` or ``in_progress``. It is kept up to date with F()
+updates whenever a booking's mechanic or status changes, so picking the
+least-loaded mechanic is a single ordered query instead of a COUNT per
+mechanic.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .cache import invalidate_center, invalidate_user
+from .events import publish_status_changes
+from .models import Booking, Mechanic
+
+OPEN_STATUSES = ('accepted', 'in_progress')
+
+# A mechanic whose specialization matches the service category is
+# preferred over one with up to this many fewer open bookings.
+SPECIALIZATION_BONUS = 2
+
+
+def update_workload(old_mechanic_id, old_status, new_mechanic_id, new_status):
+    """Move a booking's contribution to ``open_bookings`` after its mechanic
+    and/or status changed from (old_mechanic_id, old_status).
+    """
+    was_open = old_mechanic_id if old_status in OPEN_STATUSES else None
+    is_open = new_mechanic_id if new_status in OPEN_STATUSES else None
+    if was_open == is_open:
+        return
+    if was_open:
+        Mechanic.objects.filter(pk=was_open, open_bookings__gt=0).update(open_bookings=F('open_bookings') - 1)
+    if is_open:
+        Mechanic.objects.filter(pk=is_open).update(open_bookings=F('open_bookings') + 1)
+
+
+def bulk_update_workload(changes):
+    """Apply many ``(mechanic_id, old_status, new_status)`` changes with one
+    UPDATE per mechanic whose count actually moves.
+    """
+    deltas = defaultdict(int)
+    for mechanic_id, old_status, new_status in changes:
+        if not mechanic_id:
+            continue
+        deltas[mechanic_id] += (new_status in OPEN_STATUSES) - (old_status in OPEN_STATUSES)
+    for mechanic_id, delta in deltas.items():
+        if delta:
+            Mechanic.objects.filter(pk=mechanic_id).update(open_bookings=Greatest(F('open_bookings') + delta, 0))
+
+
+def _matches(specialization, category_name):
+    return bool(specialization) and category_name.lower() in specialization.lower()
+
+
+def candidate_mechanics(service_center, service_category=None):
+    """Active mechanics of a center, best candidate first."""
+    mechanics = Mechanic.objects.filter(service_center=service_center, is_active=True).select_related('user')
+    if service_category is None:
+        return mechanics.order_by('open_bookings', 'id')
+    match = Case(
+        When(specialization__icontains=service_category.name, then=Value(SPECIALIZATION_BONUS)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return mechanics.annotate(score=F('open_bookings') - match).order_by('score', 'id')
+
+
+def pick_mechanic(booking):
+    """Return the least-loaded active mechanic for ``booking`` or None."""
+    return candidate_mechanics(booking.service_center, booking.service_category).first()
+
+
+def assign_backlog(service_center, day):
+    """Assign every accepted, unassigned booking of ``day`` in one pass.
+
+    Mechanics are loaded once and their loads tracked in memory; the result
+    is written back with one UPDATE per mechanic. Returns the number of
+    bookings assigned.
+    """
+    with transaction.atomic():
+        mechanics = list(
+            Mechanic.objects.select_for_update()
+            .filter(service_center=service_center, is_active=True)
+            .order_by('id')
+        )
+        if not mechanics:
+            return 0
+        backlog = (
+            Booking.objects.filter(
+                service_center=service_center, booking_date=day,
+                status__in=OPEN_STATUSES, mechanic__isnull=True,
+            )
+            .select_related('service_category', 'vehicle')
+            .order_by('booking_time', 'id')
+        )
+
+        total = 0
+        now = timezone.now()
+        load = {m.id: m.open_bookings for m in mechanics}
+        assigned = defaultdict(list)
+        owners = set()
+        for booking in backlog:
+            category = booking.service_category.name
+            best = min(
+                mechanics,
+                key=lambda m: (load[m.id] - (SPECIALIZATION_BONUS if _matches(m.specialization, category) else 0), m.id),
+            )
+            load[best.id] += 1
+            assigned[best.id].append(booking.id)
+            owners.add(booking.vehicle.owner_id)
+
+        for mechanic_id, booking_ids in assigned.items():
+            # mechanic__isnull guards against a concurrent manual assignment.
+            count = Booking.objects.filter(id__in=booking_ids, mechanic__isnull=True).update(
+                mechanic_id=mechanic_id, version=F('version') + 1, updated_at=now,
+            )
+            Mechanic.objects.filter(pk=mechanic_id).update(open_bookings=F('open_bookings') + count)
+            total += count
+        if total:
+            # As Booking.apply_changes does: the new mechanic's (and the
+            # owner's) open pages follow, and the owners' cached pages go
+            invalidate_center(service_center.id)
+            for owner_id in owners:
+                invalidate_user(owner_id)
+            publish_status_changes([booking_id for booking_ids in assigned.values() for booking_id in booking_ids])
+    return total
@@ -0,0 +1,58 @@
+"""Load the logged-in user together with their role profile.
+
+Most views start from ``request.user.service_center`` or
+``request.user.mechanic``, and each of those is a query of its own on
+top of the one that loads the user. ``RoleProfileBackend`` loads the user
+with both profiles (and the mechanic's center) joined in, once per
+request, so those lookups are free for the rest of the request, including
+in templates. A user without a profile gets the usual ``DoesNotExist``
+without a query.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.views import redirect_to_login
+
+ROLE_PROFILE_BACKEND = 'booking.auth.RoleProfileBackend'
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+class RoleProfileBackend(ModelBackend):
+    def get_user(self, user_id):
+        users = get_user_model()._default_manager.select_related('service_center', 'mechanic__service_center')
+        try:
+            user = users.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class RoleProfileMiddleware:
+    """Move sessions logged in through ``ModelBackend`` over to
+    ``RoleProfileBackend`` instead of logging them out. Goes before
+    ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Costs no extra query: the session is loaded for request.user anyway.
+        if request.session.get(BACKEND_SESSION_KEY) == MODEL_BACKEND:
+            request.session[BACKEND_SESSION_KEY] = ROLE_PROFILE_BACKEND
+        return self.get_response(request)
+
+
+def async_login_required(view):
+    """``login_required`` for async views, which Django 4.2's doesn't
+    support. Loads ``request.user`` (with its role profile), so the view
+    can use it without a query.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,78 @@
+"""Bulk booking status changes for service centers.
+
+Moves a selected set of bookings to a new status in one transaction: one
+set-based UPDATE for the bookings, one batch for the invoices that are
+missing (see booking/invoices.py) and one counter UPDATE per affected
+mechanic, center and owner, instead of a full ``save()`` per booking.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .assignment import bulk_update_workload
+from .cache import invalidate_center, invalidate_user
+from .events import publish_status_changes
+from .invoices import INVOICE_STATUSES, create_invoices, notify_invoices_created
+from .models import Booking
+from .stats import record_bulk_status_change
+
+# Target status -> statuses a booking may be moved from in bulk. Follows
+# Booking.TRANSITIONS; cancelling stays a one-booking action because it has
+# to give back the booking's slot.
+BULK_TRANSITIONS = {
+    target: tuple(source for source, targets in Booking.TRANSITIONS.items() if target in targets)
+    for target in ('accepted', 'in_progress', 'completed', 'ready_for_delivery')
+}
+
+
+def bulk_transition(service_center, booking_ids, target):
+    """Move ``booking_ids`` of ``service_center`` to ``target``.
+
+    Returns ``{booking_id: message}`` with one entry per requested id and
+    the number of bookings updated.
+    """
+    if target not in BULK_TRANSITIONS:
+        raise ValueError(f'Unsupported bulk status: {target}')
+    sources = BULK_TRANSITIONS[target]
+    target_label = dict(Booking.STATUS_CHOICES)[target]
+    results = {booking_id: 'Not found.' for booking_id in booking_ids}
+
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.select_for_update()
+            .filter(service_center=service_center, id__in=booking_ids)
+            .values_list('id', 'status', 'mechanic_id', 'actual_cost', 'estimated_cost', 'vehicle__owner_id')
+        )
+        eligible = []
+        for booking_id, status, mechanic_id, actual_cost, estimated_cost, owner_id in rows:
+            if status in sources:
+                eligible.append((booking_id, status, mechanic_id, actual_cost or estimated_cost, owner_id))
+                results[booking_id] = f'Updated to {target_label}.'
+            else:
+                label = dict(Booking.STATUS_CHOICES).get(status, status)
+                results[booking_id] = f'Skipped: cannot move from {label} to {target_label}.'
+        if not eligible:
+            return results, 0
+
+        now = timezone.now()
+        changes = {'status': target, 'updated_at': now, 'version': F('version') + 1}
+        if target == 'completed':
+            changes['completed_at'] = now
+        ids = [row[0] for row in eligible]
+        updated = Booking.objects.filter(id__in=ids, status__in=sources).update(**changes)
+
+        invalidate_center(service_center.id)
+        for owner_id in {row[4] for row in eligible}:
+            invalidate_user(owner_id)
+        bulk_update_workload((mechanic_id, status, target) for _, status, mechanic_id, _, _ in eligible)
+        record_bulk_status_change(
+            (service_center.id, owner_id, status, target) for _, status, _, _, owner_id in eligible
+        )
+        publish_status_changes(ids)
+
+        if target in INVOICE_STATUSES:
+            invoices = create_invoices({booking_id: cost for booking_id, _, _, cost, _ in eligible})
+            if target == 'accepted':
+                notify_invoices_created(invoices)
+    return results, updated
+
@@ -0,0 +1,166 @@
+"""Cache of computed per-service-center page contexts.
+
+The service center dashboard and analytics compute the same numbers for
+every staff member of a center. ``cached_context`` keeps them in the cache
+under a per-center version; ``invalidate_center`` moves the version on when
+the center's bookings, invoices or feedback change (see booking/signals.py
+and the set-based updates that call it directly), so stale entries are
+never read again and simply expire. Versions are kept in the ``stamps``
+cache, which all processes share (see ``CACHES`` in the settings), so a
+change is seen by every process as soon as it commits.
+
+When an entry is missing, only the worker that wins a short lock
+recomputes it; the others wait briefly for its result instead of all
+running the same queries at once. Hits and misses are counted per context
+name and shown on the admin dashboard.
+
+Users have a version of their own, moved by ``invalidate_user`` when their
+bookings, invoices or vehicles change; the owner dashboard's rendered
+fragments are cached under it.
+"""
+import time
+
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+# Version stamps, shared by all processes
+stamps = ConnectionProxy(caches, 'stamps')
+
+TIMEOUT = 300
+LOCK_TIMEOUT = 10
+# How long a worker waits for another one to finish recomputing
+WAIT = 2.0
+POLL = 0.05
+
+CONTEXTS = ('dashboard', 'analytics')
+
+
+def _version_key(center_id):
+    return f'center:{center_id}:version'
+
+
+def _user_version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def _versions(keys):
+    found = stamps.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Any new value is safe: nothing has been cached under it yet.
+        for key in missing:
+            stamps.add(key, time.time_ns())
+        found.update(stamps.get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def _version(key):
+    return _versions([key])[0]
+
+
+def _bump(key):
+    transaction.on_commit(lambda: stamps.set(key, time.time_ns()))
+
+
+def center_version(center_id):
+    return _version(_version_key(center_id))
+
+
+def user_version(user_id):
+    return _version(_user_version_key(user_id))
+
+
+def fragment_version(user_id=None, center_id=None):
+    """Version of a dashboard fragment built from the bookings of
+    ``user_id`` or ``center_id`` and the reference data, read from the
+    shared stamps in one go.
+    """
+    from .reference import VERSION_KEY as REFERENCE_KEY
+
+    keys = [_user_version_key(user_id) if user_id else _version_key(center_id), REFERENCE_KEY]
+    return '-'.join(str(version) for version in _versions(keys))
+
+
+def fragment_cached(fragment_name, vary_on):
+    """Whether the template fragment ``{% cache ... fragment_name *vary_on %}``
+    is cached, i.e. rendering it won't evaluate the context it uses.
+    """
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = cache
+    return fragment_cache.has_key(make_template_fragment_key(fragment_name, vary_on))
+
+
+def invalidate_center(center_id):
+    """Drop the cached contexts of ``center_id`` once the current
+    transaction commits (immediately outside a transaction).
+    """
+    if center_id:
+        _bump(_version_key(center_id))
+
+
+def invalidate_user(user_id):
+    """Drop the cached dashboard fragments of ``user_id`` once the current
+    transaction commits.
+    """
+    if user_id:
+        _bump(_user_version_key(user_id))
+
+
+def cached_context(name, center_id, compute, variant=''):
+    """Return the ``name`` context of ``center_id``, calling ``compute()``
+    to build it on a miss. ``variant`` separates contexts that also depend
+    on something other than the center's data, e.g. today's date.
+    """
+    key = f'center:{center_id}:{name}:{variant}:{center_version(center_id)}'
+    value = cache.get(key)
+    if value is not None:
+        _count(name, 'hits')
+        return value
+    _count(name, 'misses')
+
+    lock = f'{key}:lock'
+    if not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+        deadline = time.monotonic() + WAIT
+        while time.monotonic() < deadline:
+            time.sleep(POLL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        # The other worker is slow or gone; don't keep the user waiting.
+        return compute()
+    try:
+        value = compute()
+        cache.set(key, value, timeout=TIMEOUT)
+    finally:
+        cache.delete(lock)
+    return value
+
+
+def _count(name, kind):
+    key = f'cache-stats:{name}:{kind}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats():
+    """``[{'name', 'hits', 'misses', 'hit_rate'}]`` for each cached context."""
+    stats = []
+    for name in CONTEXTS:
+        counts = cache.get_many([f'cache-stats:{name}:hits', f'cache-stats:{name}:misses'])
+        hits = counts.get(f'cache-stats:{name}:hits', 0)
+        misses = counts.get(f'cache-stats:{name}:misses', 0)
+        total = hits + misses
+        stats.append({
+            'name': name,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(100 * hits / total, 1) if total else None,
+        })
+    return stats
@@ -0,0 +1,102 @@
+"""Conditional GET for the pages owners and mechanics keep reloading while
+they wait for a status change.
+
+Each page's validators come from one indexed query for the timestamps of
+what it shows. The ETag also covers the user and the CSRF secret the
+page's forms were rendered with, and the reference data version (center
+and category names). So an unchanged page is answered with
+``304 Not Modified`` before the view runs its queries or renders anything.
+Responses are marked ``private, no-cache`` so browsers always revalidate
+instead of guessing a freshness lifetime from ``Last-Modified``. A request
+with flash messages waiting is always rendered in full, and only full
+pages (200) carry validators: a redirect, e.g. away from a page the user
+may not see, must not be answered with a 304 later.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import Booking
+from .reference import reference_version
+
+
+def conditional_page(state):
+    """Decorate a view with ETag/Last-Modified handling.
+
+    ``state(request, *args, **kwargs)`` returns ``(parts, last_modified)``
+    for the page, or None to skip conditional handling (e.g. for a role
+    whose page also shows data that has no timestamp).
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            result = None
+            if not get_messages(request):
+                result = state(request, *args, **kwargs)
+            if result is not None:
+                parts, last_modified = result
+                raw = ':'.join(str(part) for part in (
+                    request.user.pk, request.META.get('CSRF_COOKIE', ''), reference_version(), *parts,
+                ))
+                result = (hashlib.md5(raw.encode()).hexdigest(), last_modified)
+            request._page_validators = result
+        return request._page_validators
+
+    def etag(request, *args, **kwargs):
+        result = validators(request, *args, **kwargs)
+        return result and result[0]
+
+    def last_modified(request, *args, **kwargs):
+        result = validators(request, *args, **kwargs)
+        return result and result[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                response.headers.pop('ETag')
+                response.headers.pop('Last-Modified')
+            elif response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def booking_page_state(request, booking_id):
+    """Booking detail and invoice: the booking, its invoice and feedback."""
+    if request.user.role not in ('owner', 'mechanic'):
+        # The service center's page also lists mechanic workloads.
+        return None
+    row = Booking.objects.filter(pk=booking_id).values_list(
+        'updated_at', 'version', 'invoice__updated_at', 'feedback__id',
+    ).first()
+    if row is None:
+        return None
+    updated_at, _, invoice_updated_at, _ = row
+    return row, max(filter(None, (updated_at, invoice_updated_at)))
+
+
+def _list_state(bookings):
+    latest, count = bookings.aggregate(latest=Max('updated_at'), count=Count('id')).values()
+    return (latest, count), latest
+
+
+def my_bookings_state(request):
+    if request.user.role != 'owner':
+        return None
+    return _list_state(Booking.objects.filter(vehicle__owner=request.user))
+
+
+def mechanic_tasks_state(request):
+    if request.user.role != 'mechanic':
+        return None
+    return _list_state(Booking.objects.filter(mechanic__user=request.user))
@@ -0,0 +1,241 @@
+"""Live booking status updates, pushed to open pages as Server-Sent Events.
+
+A status change writes one ``StatusEvent`` row per user who can see the
+booking (its owner, its service center and its mechanic) in the
+transaction that makes it; see ``publish_status_changes``. Each ASGI
+process has one ``Hub`` that polls that table for new rows while anyone
+is connected and hands each row to its user's open streams. An idle
+stream is just a queue and a keepalive comment every ``KEEPALIVE_SECONDS``,
+and since the events go through the database, a change made by any
+process (web, worker, admin) reaches the pages open in every process.
+
+A browser that reconnects sends the id of the last event it got and is
+sent what it missed, as long as the events are kept (``RETENTION``). Older
+events are deleted by the background workers (booking/jobs.py), whether
+or not anyone is connected.
+
+The stream needs the ASGI server (vehicle_service/asgi.py). Under WSGI
+it answers 204, which tells the browser not to reconnect, and pages just
+show what they showed when they were loaded.
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Max, Q
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Booking, StatusEvent
+
+POLL_SECONDS = 1.0
+KEEPALIVE_SECONDS = 15
+# Streams are closed after this long and the browser reconnects, which
+# also checks the user is still logged in
+STREAM_SECONDS = 600
+# Events queued for one stream; a stream that falls further behind is
+# closed and catches up from the database when the browser reconnects
+QUEUE_SIZE = 100
+REPLAY_LIMIT = 100
+RETENTION = timedelta(hours=1)
+# A missing event id is looked for this long, in case its transaction
+# commits after one with a higher id
+GAP_SECONDS = 10
+STATUS_LABELS = dict(Booking.STATUS_CHOICES)
+
+
+def publish_status_changes(booking_ids):
+    """Record the current status of ``booking_ids`` for their users' open
+    pages; call in the transaction that changed them.
+    """
+    rows = Booking.objects.filter(id__in=booking_ids).values_list(
+        'id', 'status', 'version', 'vehicle__owner_id', 'service_center__user_id', 'mechanic__user_id',
+    )
+    StatusEvent.objects.bulk_create([
+        StatusEvent(user_id=user_id, booking_id=booking_id, status=status, version=version)
+        for booking_id, status, version, *user_ids in rows
+        for user_id in {user_id for user_id in user_ids if user_id}
+    ])
+    transaction.on_commit(hub.wake)
+
+
+def purge_events():
+    """Delete the events older than ``RETENTION``."""
+    return StatusEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()[0]
+
+
+def _latest_id():
+    return StatusEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _events_after(last_id, gaps):
+    events = StatusEvent.objects.filter(Q(id__gt=last_id) | Q(id__in=gaps))
+    return list(events.order_by('id').values_list('id', 'user_id', 'booking_id', 'status', 'version'))
+
+
+def _missed(user_id, last_id):
+    events = StatusEvent.objects.filter(user_id=user_id, id__gt=last_id).order_by('id')
+    return list(events.values_list('id', 'user_id', 'booking_id', 'status', 'version')[:REPLAY_LIMIT])
+
+
+class Hub:
+    """Polls for new events on behalf of every stream in this process."""
+
+    def __init__(self):
+        self.streams = defaultdict(set)  # user id -> queues
+        self.loop = None
+        self.poller = None
+        self.wakeup = None
+        self.start_lock = None
+
+    async def subscribe(self, user_id):
+        """Queue for ``user_id``'s events from now on."""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.poller = loop, None
+            self.wakeup, self.start_lock = asyncio.Event(), asyncio.Lock()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        async with self.start_lock:
+            if self.poller is None or self.poller.done():
+                # Read before the stream queries what it missed, so nothing
+                # falls between the two
+                last_id = await sync_to_async(_latest_id)()
+                self.poller = loop.create_task(self._poll(last_id))
+        self.streams[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.streams.get(user_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.streams.pop(user_id, None)
+
+    def wake(self):
+        """Poll now rather than at the next interval. Safe to call from any thread."""
+        loop, wakeup = self.loop, self.wakeup
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _poll(self, last_id):
+        gaps = {}  # missing id -> when to stop looking for it
+        while self.streams:
+            now = time.monotonic()
+            gaps = {event_id: until for event_id, until in gaps.items() if until > now}
+            events = await sync_to_async(_events_after)(last_id, list(gaps))
+            for event in events:
+                event_id, user_id = event[0], event[1]
+                gaps.pop(event_id, None)
+                if event_id > last_id:
+                    gaps.update(dict.fromkeys(range(last_id + 1, event_id), now + GAP_SECONDS))
+                    last_id = event_id
+                for queue in list(self.streams.get(user_id, ())):
+                    self._put(user_id, queue, event)
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _put(self, user_id, queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream (None) and let it reconnect
+            self.unsubscribe(user_id, queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+hub = Hub()
+
+
+def _format(event, cursor):
+    event_id, _, booking_id, status, version = event
+    data = json.dumps({
+        'booking': booking_id, 'status': status, 'label': STATUS_LABELS.get(status, status), 'version': version,
+    })
+    return f'id: {cursor}\nevent: status\ndata: {data}\n\n'
+
+
+async def _stream(user_id, last_id, disconnected):
+    queue = await hub.subscribe(user_id)
+    try:
+        yield 'retry: 5000\n\n'
+        # Sent as the id of every event: the highest id seen, so that a
+        # reconnect asks for what came after it
+        cursor = last_id or 0
+        if last_id is not None:
+            for event in await sync_to_async(_missed)(user_id, last_id):
+                cursor = max(cursor, event[0])
+                yield _format(event, cursor)
+
+        deadline = time.monotonic() + STREAM_SECONDS
+        while not disconnected.is_set():
+            timeout = min(KEEPALIVE_SECONDS, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                break
+            cursor = max(cursor, event[0])
+            yield _format(event, cursor)
+    finally:
+        hub.unsubscribe(user_id, queue)
+
+
+def stream_response(request, user_id):
+    """Streaming response with ``user_id``'s status changes, starting
+    after the browser's ``Last-Event-ID`` if it sent one.
+    """
+    try:
+        last_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_id = None
+    disconnected = request.scope.get('disconnected') or asyncio.Event()
+    response = StreamingHttpResponse(_stream(user_id, last_id, disconnected), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Don't let a proxy buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def watch_disconnect(application):
+    """ASGI middleware that puts an ``asyncio.Event`` under ``disconnected``
+    in the scope of ``booking_events`` requests and sets it when the
+    browser goes away. Django 4.2 doesn't tell a streaming response, and
+    writing to a closed connection doesn't fail, so without it a closed
+    page's stream would only end after ``STREAM_SECONDS``.
+    """
+    async def middleware(scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != reverse('booking_events'):
+            return await application(scope, receive, send)
+
+        disconnected = asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def listen():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message['type'] == 'http.disconnect':
+                    disconnected.set()
+                    return
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await application(dict(scope, disconnected=disconnected), messages.get, send)
+        finally:
+            listener.cancel()
+
+    return middleware
@@ -0,0 +1,145 @@
+"""Streaming CSV/JSON Lines exports of bookings and invoices.
+
+Each export is one query with the related names joined in SQL and read
+with ``QuerySet.iterator()`` (a server-side cursor on PostgreSQL, chunked
+fetches elsewhere), and written out row by row. Nothing holds more than
+one chunk of rows, so memory stays flat however long the export is. Used
+by the ``export_data`` view (as a ``StreamingHttpResponse``) and the
+``export_data`` management command.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Booking, Invoice
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+# Characters of output handed to the response or file at a time
+BLOCK_SIZE = 64 * 1024
+
+# Export name -> (model, ordering, [(column, field path)])
+EXPORTS = {
+    'bookings': (Booking, ('booking_date', 'id'), [
+        ('id', 'id'),
+        ('service_center', 'service_center__name'),
+        ('booking_date', 'booking_date'),
+        ('booking_time', 'booking_time'),
+        ('status', 'status'),
+        ('service_category', 'service_category__name'),
+        ('registration_number', 'vehicle__registration_number'),
+        ('owner', 'vehicle__owner__username'),
+        ('owner_email', 'vehicle__owner__email'),
+        ('mechanic', 'mechanic__user__username'),
+        ('estimated_cost', 'estimated_cost'),
+        ('actual_cost', 'actual_cost'),
+        ('created_at', 'created_at'),
+        ('completed_at', 'completed_at'),
+        ('invoice_number', 'invoice__invoice_number'),
+    ]),
+    'invoices': (Invoice, ('created_at', 'id'), [
+        ('invoice_number', 'invoice_number'),
+        ('booking_id', 'booking_id'),
+        ('service_center', 'booking__service_center__name'),
+        ('booking_date', 'booking__booking_date'),
+        ('owner', 'booking__vehicle__owner__username'),
+        ('subtotal', 'subtotal'),
+        ('tax', 'tax'),
+        ('total', 'total'),
+        ('payment_status', 'payment_status'),
+        ('created_at', 'created_at'),
+        ('paid_at', 'paid_at'),
+    ]),
+}
+
+
+def export_rows(name, service_center_id=None, month=None):
+    """``(columns, rows)`` of an export: bookings by booking date or
+    invoices by creation date, optionally of one center and of the month
+    ``month`` (a date in it) only. ``rows`` is a lazy iterator of tuples.
+    """
+    model, ordering, columns = EXPORTS[name]
+    rows = model.objects.order_by(*ordering)
+    if service_center_id is not None:
+        center_field = 'service_center_id' if model is Booking else 'booking__service_center_id'
+        rows = rows.filter(**{center_field: service_center_id})
+    if month is not None:
+        start = month.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        if model is Booking:
+            rows = rows.filter(booking_date__gte=start, booking_date__lt=end)
+        else:
+            tz = timezone.get_current_timezone()
+            rows = rows.filter(
+                created_at__gte=timezone.make_aware(datetime.combine(start, time.min), tz),
+                created_at__lt=timezone.make_aware(datetime.combine(end, time.min), tz),
+            )
+    rows = rows.values_list(*(path for _, path in columns)).iterator(chunk_size=CHUNK_SIZE)
+    return [column for column, _ in columns], rows
+
+
+class _Line:
+    """File-like object whose ``write`` hands back what it was given, so
+    ``csv.writer`` can produce one line at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _lines(columns, rows, fmt):
+    if fmt == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for row in rows:
+            yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def export_stream(name, fmt, **filters):
+    """Yield an export in ``fmt`` (a key of ``FORMATS``) as blocks of
+    about ``BLOCK_SIZE`` characters.
+    """
+    columns, rows = export_rows(name, **filters)
+    block, size = [], 0
+    for line in _lines(columns, rows, fmt):
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield ''.join(block)
+            block, size = [], 0
+    if block:
+        yield ''.join(block)
+
+
+async def aexport_stream(name, fmt, **filters):
+    """``export_stream`` for responses served by the ASGI server. Django
+    4.2 collects a sync iterator into a list before sending any of it
+    there; this produces one block at a time on the sync thread instead.
+    """
+    blocks = export_stream(name, fmt, **filters)
+    next_block = sync_to_async(next)
+    try:
+        while True:
+            block = await next_block(blocks, None)
+            if block is None:
+                return
+            yield block
+    finally:
+        await sync_to_async(blocks.close)()
+
+
+def export_filename(name, fmt, service_center_id=None, month=None):
+    parts = [name]
+    if service_center_id is not None:
+        parts.append(f'center-{service_center_id}')
+    if month is not None:
+        parts.append(month.strftime('%Y-%m'))
+    return '-'.join(parts) + '.' + fmt
@@ -1,6 +1,11 @@
+import copy
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, PasswordChangeForm
+from django.forms.models import ModelChoiceIterator
 from .models import User, Vehicle, ServiceCenter, Mechanic, Booking, ServiceCategory, Feedback, Inventory
+from .reference import reference_data
+from .slots import SlotUnavailable, slot_start
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -105,7 +110,10 @@ class VehicleForm(forms.ModelForm):
 class ServiceCenterForm(forms.ModelForm):
     class Meta:
         model = ServiceCenter
-        fields = ['name', 'description', 'address', 'phone', 'email', 'opening_time', 'closing_time']
+        fields = [
+            'name', 'description', 'address', 'phone', 'email', 'opening_time', 'closing_time',
+            'bays', 'slot_minutes', 'latitude', 'longitude',
+        ]
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -114,22 +122,116 @@ class ServiceCenterForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'opening_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'closing_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'bays': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'slot_minutes': forms.NumberInput(attrs={'class': 'form-control', 'min': 5, 'step': 5}),
+            'latitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any', 'placeholder': 'e.g. 12.9716'}),
+            'longitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any', 'placeholder': 'e.g. 77.5946'}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        opening = cleaned_data.get('opening_time')
+        closing = cleaned_data.get('closing_time')
+        slot_minutes = cleaned_data.get('slot_minutes')
+        if opening and closing and slot_minutes:
+            from .slots import MAX_SLOTS_PER_DAY, day_slots
+            slots = day_slots(ServiceCenter(opening_time=opening, closing_time=closing, slot_minutes=slot_minutes))
+            if not slots:
+                raise forms.ValidationError('Opening hours must fit at least one booking slot.')
+            if len(slots) > MAX_SLOTS_PER_DAY:
+                raise forms.ValidationError(f'At most {MAX_SLOTS_PER_DAY} booking slots per day are supported; use longer slots.')
+        if (cleaned_data.get('latitude') is None) != (cleaned_data.get('longitude') is None):
+            raise forms.ValidationError('Enter both latitude and longitude, or neither.')
+        return cleaned_data
+
+
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.objects()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.objects())
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """Choice of one of the ``attr`` objects of the cached reference data
+    (booking/reference.py): renders and validates without querying the
+    model.
+    """
+    iterator = ReferenceChoiceIterator
+
+    def __init__(self, attr, model, **kwargs):
+        self.attr = attr
+        super().__init__(queryset=model.objects.none(), **kwargs)
+
+    def objects(self):
+        return getattr(reference_data(), self.attr)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        for obj in self.objects():
+            if str(obj.pk) == str(value):
+                # A copy, so the form's instance never changes the shared one
+                return copy.copy(obj)
+        raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
 
 class BookingForm(forms.ModelForm):
+    service_center = ReferenceChoiceField('active_centers', ServiceCenter,
+                                          widget=forms.Select(attrs={'class': 'form-control'}))
+    service_category = ReferenceChoiceField('categories', ServiceCategory,
+                                            widget=forms.Select(attrs={'class': 'form-control'}))
+
     class Meta:
         model = Booking
         fields = ['vehicle', 'service_center', 'service_category', 'booking_date', 'booking_time', 'service_description']
         widgets = {
             'vehicle': forms.Select(attrs={'class': 'form-control'}),
-            'service_center': forms.Select(attrs={'class': 'form-control'}),
-            'service_category': forms.Select(attrs={'class': 'form-control'}),
             'booking_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'booking_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'service_description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        service_center = cleaned_data.get('service_center')
+        service_category = cleaned_data.get('service_category')
+        booking_time = cleaned_data.get('booking_time')
+        # The choices come from the cached reference data; make sure they
+        # are still open and take the current price
+        if service_center and not ServiceCenter.objects.filter(pk=service_center.pk, is_active=True).exists():
+            self.add_error('service_center', f'{service_center.name} is not taking bookings at the moment.')
+            service_center = None
+        if service_category:
+            price = ServiceCategory.objects.filter(
+                pk=service_category.pk, is_active=True,
+            ).values_list('base_price', flat=True).first()
+            if price is None:
+                self.add_error('service_category', f'{service_category.name} is no longer offered.')
+            else:
+                service_category.base_price = price
+        if service_center and booking_time:
+            # Bookings take whole slots: don't quietly move an off-grid
+            # time to the start of its slot
+            try:
+                start = slot_start(service_center, booking_time)
+            except SlotUnavailable as exc:
+                self.add_error('booking_time', str(exc))
+            else:
+                if start != booking_time:
+                    self.add_error('booking_time', (
+                        f'{service_center.name} takes bookings in {service_center.slot_minutes}-minute '
+                        f'slots; please choose a slot start time such as {start:%H:%M}.'
+                    ))
+        return cleaned_data
+
 
 class FeedbackForm(forms.ModelForm):
     class Meta:
@@ -154,6 +256,10 @@ class InventoryForm(forms.ModelForm):
         }
 
 
+class ImportFileForm(forms.Form):
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}))
+
+
 class CustomPasswordChangeForm(PasswordChangeForm):
     old_password = forms.CharField(
         widget=forms.PasswordInput(attrs={'class': 'form-control'}),
@@ -0,0 +1,245 @@
+"""Nearest open service center search.
+
+Active centers with a location are kept in an in-process grid index at
+several resolutions: the map is cut into square cells (about 1 km across,
+then doubling up to about 140 km) and each cell holds the centers inside
+it. A search walks rings of cells outwards from the caller on the finest
+grid and stops as soon as no unvisited cell can be closer than the N-th
+open center found. If that takes more than a few rings (a sparse area, or
+most centers nearby are closed) it continues on the next coarser grid
+instead of walking many empty cells, so a search only ever looks at a few
+cells.
+
+The index is loaded lazily and kept current incrementally: saving or
+deleting a ``ServiceCenter`` bumps a change stamp in the shared ``stamps``
+cache (see booking/signals.py), and the next search of every process
+re-reads only the centers whose ``updated_at`` moved since its last sync,
+or reloads everything after a delete.
+"""
+import bisect
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import stamps
+from .models import ServiceCenter
+
+# Cell sizes in degrees, finest first, and how many rings a search walks
+# on one grid before moving to the next coarser one.
+CELL_DEGREES = tuple(0.01 * 2 ** level for level in range(8))
+MAX_RINGS = 4
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+CHANGED_KEY = 'service-centers:changed'
+DELETED_KEY = 'service-centers:deleted'
+# Re-read centers saved this long before the last sync, in case their
+# transaction committed after it.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+FIELDS = ('id', 'name', 'latitude', 'longitude', 'opening_time', 'closing_time', 'is_active')
+
+
+def is_open(center, at):
+    """Whether ``center`` (a ``CenterIndex`` record) is open at time ``at``."""
+    if center['opening_time'] <= center['closing_time']:
+        return center['opening_time'] <= at < center['closing_time']
+    # Open past midnight
+    return at >= center['opening_time'] or at < center['closing_time']
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _Grid:
+    """Centers bucketed by cells of ``size`` degrees."""
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = {}
+        # Bounding box of the cells ever used: (min_i, max_i, min_j, max_j)
+        self.bounds = None
+        self._owned = set()
+
+    def copy(self):
+        clone = _Grid(self.size)
+        clone.cells = dict(self.cells)
+        clone.bounds = self.bounds
+        return clone
+
+    def cell(self, lat, lon):
+        return math.floor(lat / self.size), math.floor(lon / self.size)
+
+    def _cell_for_update(self, key):
+        # Cells may be shared with the index this one was copied from.
+        if key not in self._owned:
+            self.cells[key] = dict(self.cells.get(key, {}))
+            self._owned.add(key)
+        return self.cells[key]
+
+    def add(self, record):
+        i, j = key = self.cell(record['latitude'], record['longitude'])
+        self._cell_for_update(key)[record['id']] = record
+        if self.bounds is None:
+            self.bounds = (i, i, j, j)
+        else:
+            min_i, max_i, min_j, max_j = self.bounds
+            self.bounds = (min(min_i, i), max(max_i, i), min(min_j, j), max(max_j, j))
+
+    def remove(self, record):
+        key = self.cell(record['latitude'], record['longitude'])
+        cell = self._cell_for_update(key)
+        cell.pop(record['id'], None)
+        if not cell:
+            del self.cells[key]
+            self._owned.discard(key)
+
+    def search(self, lat, lon, limit, at, max_km, max_rings=None):
+        """Nearest ``limit`` open centers as sorted ``(distance, id, record)``
+        and whether the result is final (False if ``max_rings`` ran out
+        before it could be proven).
+        """
+        ci, cj = self.cell(lat, lon)
+        min_i, max_i, min_j, max_j = self.bounds
+        last_ring = max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+        found = []
+        cutoff = math.inf if max_km is None else max_km
+
+        for ring in range(last_ring + 1):
+            # Every cell of this ring is at least (ring - 1) cell steps away;
+            # a step along a parallel shrinks with the cosine of the latitude.
+            far_lat = min(abs(lat) + (ring + 1) * self.size, 90)
+            bound = max(ring - 1, 0) * self.size * KM_PER_DEGREE * math.cos(math.radians(far_lat))
+            if bound > cutoff:
+                return found, True
+            if max_rings is not None and ring >= max_rings:
+                return found, False
+            for key in _ring(ci, cj, ring):
+                for record in self.cells.get(key, {}).values():
+                    if at is not None and not is_open(record, at):
+                        continue
+                    distance = distance_km(lat, lon, record['latitude'], record['longitude'])
+                    if distance <= cutoff:
+                        bisect.insort(found, (distance, record['id'], record))
+                        if len(found) > limit:
+                            found.pop()
+                        if len(found) == limit:
+                            cutoff = found[-1][0]
+        return found, True
+
+
+def _ring(ci, cj, ring):
+    if ring == 0:
+        yield ci, cj
+        return
+    for j in range(cj - ring, cj + ring + 1):
+        yield ci - ring, j
+        yield ci + ring, j
+    for i in range(ci - ring + 1, ci + ring):
+        yield i, cj - ring
+        yield i, cj + ring
+
+
+class CenterIndex:
+    """Multi-resolution grid index of center records (dicts with
+    ``FIELDS``) by location.
+    """
+
+    def __init__(self):
+        self.centers = {}
+        self.grids = [_Grid(size) for size in CELL_DEGREES]
+
+    def __len__(self):
+        return len(self.centers)
+
+    def copy(self):
+        """A copy that can be changed while searches still read this one."""
+        clone = CenterIndex()
+        clone.centers = dict(self.centers)
+        clone.grids = [grid.copy() for grid in self.grids]
+        return clone
+
+    def upsert(self, record):
+        self.remove(record['id'])
+        if record['is_active'] and record['latitude'] is not None and record['longitude'] is not None:
+            self.centers[record['id']] = record
+            for grid in self.grids:
+                grid.add(record)
+
+    def remove(self, center_id):
+        record = self.centers.pop(center_id, None)
+        if record:
+            for grid in self.grids:
+                grid.remove(record)
+
+    def nearest(self, lat, lon, limit, at=None, max_km=None):
+        """Up to ``limit`` ``(distance_km, record)`` pairs, nearest first,
+        of centers open at ``at`` (any time if None) within ``max_km``.
+        """
+        if not self.centers or limit <= 0:
+            return []
+        for grid in self.grids:
+            coarsest = grid is self.grids[-1]
+            found, final = grid.search(lat, lon, limit, at, max_km, max_rings=None if coarsest else MAX_RINGS)
+            if final:
+                return [(distance, record) for distance, _, record in found]
+
+
+# The current index; replaced (never changed in place) when it is synced,
+# so searches running meanwhile keep a consistent view.
+_index = CenterIndex()
+_state = {'loaded': False, 'changed': None, 'deleted': None, 'synced_at': None}
+_lock = threading.Lock()
+
+
+def centers_changed(deleted=False):
+    """Tell every process's index that centers changed (after commit)."""
+    key = DELETED_KEY if deleted else CHANGED_KEY
+    transaction.on_commit(lambda: stamps.set(key, time.time_ns()))
+
+
+def sync_index():
+    """Bring this process's index up to date and return it."""
+    global _index
+    current = stamps.get_many([CHANGED_KEY, DELETED_KEY])
+    if len(current) < 2:
+        # Missing or culled: draw new ones, so that the index syncs
+        for key in {CHANGED_KEY, DELETED_KEY} - current.keys():
+            stamps.add(key, time.time_ns())
+        current = stamps.get_many([CHANGED_KEY, DELETED_KEY])
+    changed, deleted = current.get(CHANGED_KEY), current.get(DELETED_KEY)
+    if _state['loaded'] and changed == _state['changed'] and deleted == _state['deleted']:
+        return _index
+    with _lock:
+        if _state['loaded'] and changed == _state['changed'] and deleted == _state['deleted']:
+            return _index
+        now = timezone.now()
+        centers = ServiceCenter.objects.order_by()
+        if _state['loaded'] and deleted == _state['deleted']:
+            index = _index.copy()
+            centers = centers.filter(updated_at__gte=_state['synced_at'] - SYNC_OVERLAP)
+        else:
+            index = CenterIndex()
+        for record in centers.values(*FIELDS):
+            index.upsert(record)
+        _index = index
+        _state.update(loaded=True, changed=changed, deleted=deleted, synced_at=now)
+    return index
+
+
+def nearest_open_centers(lat, lon, limit=5, at=None, max_km=None):
+    """The ``limit`` nearest active centers that are open at ``at`` (local
+    time, default now), as ``(distance_km, record)`` pairs.
+    """
+    if at is None:
+        at = timezone.localtime().time()
+    return sync_index().nearest(lat, lon, limit, at=at, max_km=max_km)
@@ -0,0 +1,228 @@
+"""CSV import of vehicles (for an owner) and inventory items (for a
+service center).
+
+The file is read one row at a time and each row is validated with the
+same form as the one-at-a-time pages (``VehicleForm``, ``InventoryForm``).
+Valid rows are inserted with ``bulk_create`` every ``batch_size`` rows;
+registration numbers are checked against the database with one query per
+batch instead of one per row, and against the rest of the file as it is
+read. Invalid rows are skipped and reported with their line numbers.
+Each row costs the same whatever came before it, so import time grows
+linearly with the file, and apart from the registration numbers already
+seen, memory is bounded by the batch.
+"""
+import csv
+import io
+
+from django.db import IntegrityError, transaction
+
+from .cache import invalidate_user
+from .forms import InventoryForm, VehicleForm
+from .models import Inventory, Vehicle
+
+BATCH_SIZE = 500
+# Errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class InvalidImportFile(Exception):
+    """Raised when an uploaded file is not a CSV file with the expected columns."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        # [(line number, message)] of the first MAX_REPORTED_ERRORS failures
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+class _BulkUniqueMixin:
+    def validate_unique(self):
+        # Checked per batch with one query (see VehicleImporter.check_batch)
+        pass
+
+
+class VehicleImportForm(_BulkUniqueMixin, VehicleForm):
+    pass
+
+
+class _Importer:
+    form_class = None
+    model = None
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def columns(self):
+        return list(self.form_class.base_fields)
+
+    def required_columns(self):
+        return [name for name, field in self.form_class.base_fields.items() if field.required]
+
+    def build(self, form):
+        """The unsaved object for a valid row's form."""
+        raise NotImplementedError
+
+    def accept(self, line, obj, result):
+        """Whether ``obj`` may be imported as far as the rest of the file
+        is concerned; reports the reason to ``result`` if not.
+        """
+        return True
+
+    def check_batch(self, batch, result):
+        """Drop the ``(line, obj)`` pairs the database won't take, reporting
+        them to ``result``; returns the rest.
+        """
+        return batch
+
+    def finished(self, result):
+        pass
+
+    def run(self, f):
+        """Import the rows of the text file ``f``; returns an ``ImportResult``.
+
+        A line that can't be decoded ends the import; the rows before it
+        are still imported and the problem is reported for that line.
+        """
+        reader = csv.DictReader(f)
+        try:
+            header = [name.strip().lower() for name in reader.fieldnames or []]
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise InvalidImportFile(f'Could not read the file: {exc}')
+        missing = [name for name in self.required_columns() if name not in header]
+        if missing:
+            raise InvalidImportFile(f'Missing column(s): {", ".join(missing)}. Expected: {", ".join(self.columns())}.')
+        reader.fieldnames = header
+        columns = [name for name in self.columns() if name in header]
+
+        result = ImportResult()
+        batch = []
+        rows = iter(reader)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            except (csv.Error, UnicodeDecodeError) as exc:
+                result.add_error(reader.line_num + 1, f'Could not read the rest of the file: {exc}')
+                break
+            form = self.form_class({name: (row[name] or '').strip() for name in columns})
+            if not form.is_valid():
+                result.add_error(reader.line_num, '; '.join(
+                    ' '.join(errors) if name == '__all__' else f'{name}: {" ".join(errors)}'
+                    for name, errors in form.errors.items()
+                ))
+                continue
+            obj = self.build(form)
+            if self.accept(reader.line_num, obj, result):
+                batch.append((reader.line_num, obj))
+            if len(batch) >= self.batch_size:
+                self._insert(batch, result)
+                batch = []
+        self._insert(batch, result)
+        self.finished(result)
+        result.errors.sort()
+        return result
+
+    def _insert(self, batch, result):
+        rows = self.check_batch(batch, result)
+        if not rows:
+            return
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create([obj for _, obj in rows], batch_size=self.batch_size)
+        except IntegrityError:
+            # Something was added concurrently since the check: check again.
+            rows = self.check_batch(rows, result)
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_create([obj for _, obj in rows], batch_size=self.batch_size)
+            except IntegrityError:
+                # Still conflicting: find the rows that are
+                rows = self._insert_each(rows, result)
+        result.created += len(rows)
+
+    def _insert_each(self, rows, result):
+        """Insert ``rows`` one at a time, reporting each one the database
+        won't take to ``result``; returns the rows inserted.
+        """
+        inserted = []
+        for line, obj in rows:
+            if not self.check_batch([(line, obj)], result):
+                continue
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_create([obj])
+            except IntegrityError as exc:
+                result.add_error(line, f'Could not be saved: {exc}')
+            else:
+                inserted.append((line, obj))
+        return inserted
+
+
+class VehicleImporter(_Importer):
+    form_class = VehicleImportForm
+    model = Vehicle
+
+    def __init__(self, owner, **kwargs):
+        super().__init__(**kwargs)
+        self.owner = owner
+        self.seen = set()
+
+    def build(self, form):
+        vehicle = form.save(commit=False)
+        vehicle.owner = self.owner
+        return vehicle
+
+    def accept(self, line, vehicle, result):
+        number = vehicle.registration_number
+        if number in self.seen:
+            result.add_error(line, f'registration_number: {number} appears more than once in the file.')
+            return False
+        self.seen.add(number)
+        return True
+
+    def check_batch(self, batch, result):
+        existing = set(
+            Vehicle.objects.filter(registration_number__in=[vehicle.registration_number for _, vehicle in batch])
+            .values_list('registration_number', flat=True)
+        )
+        rows = []
+        for line, vehicle in batch:
+            if vehicle.registration_number in existing:
+                result.add_error(
+                    line, f'registration_number: A vehicle with registration number '
+                          f'{vehicle.registration_number} already exists.',
+                )
+            else:
+                rows.append((line, vehicle))
+        return rows
+
+    def finished(self, result):
+        if result.created:
+            invalidate_user(self.owner.id)
+
+
+class InventoryImporter(_Importer):
+    form_class = InventoryForm
+    model = Inventory
+
+    def __init__(self, service_center, **kwargs):
+        super().__init__(**kwargs)
+        self.service_center = service_center
+
+    def build(self, form):
+        item = form.save(commit=False)
+        item.service_center = self.service_center
+        return item
+
+
+def open_upload(upload):
+    """A text file over an uploaded CSV file, read as it is parsed."""
+    return io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
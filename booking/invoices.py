@@ -0,0 +1,194 @@
+"""Invoice creation.
+
+Every invoice is created here, whether for one booking (``get_or_create_invoice``:
+paying, or a booking being accepted or completed) or for many at once
+(``create_invoices``: bulk status changes and the month-end
+``generate_invoices`` command).
+
+Invoice numbers are ``INV-<year>-<n>`` with ``n`` counting up from 1 each
+year without gaps. ``InvoiceSequence`` holds the last number of each year;
+numbers are taken from it with an F() update in the transaction that
+creates the invoices, so a rolled back transaction gives its numbers back.
+That update locks the year's row until the transaction ends, so it is the
+last step: the invoice rows are inserted first under a per-booking draft
+number, which also settles which of two concurrent requests creates a
+booking's invoice before either touches the sequence. A block of numbers
+for a whole batch costs the same single update.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import invalidate_center, invalidate_user
+from .models import Booking, Invoice, InvoiceSequence
+from .notifications import notify
+
+TAX_RATE = Decimal('0.18')
+
+# Statuses on which a booking gets its invoice, so owners can pay early
+INVOICE_STATUSES = ('accepted', 'completed')
+
+# Statuses of bookings whose work is done and must be invoiced by month end
+BILLABLE_STATUSES = ('completed', 'ready_for_delivery')
+
+
+def invoice_amounts(cost):
+    """``(subtotal, tax, total)`` for a booking that costs ``cost``."""
+    subtotal = Decimal(cost).quantize(Decimal('0.01'))
+    tax = (subtotal * TAX_RATE).quantize(Decimal('0.01'))
+    return subtotal, tax, subtotal + tax
+
+
+def invoice_number(year, n):
+    return f'INV-{year}-{n:06d}'
+
+
+def _draft_number(booking_id):
+    # Unique per booking and never committed: replaced in the same transaction.
+    return f'DRAFT-{booking_id}'
+
+
+def _allocate(year, count):
+    """Take ``count`` consecutive numbers of ``year``; returns the first."""
+    sequence = InvoiceSequence.objects.filter(year=year)
+    if not sequence.update(last=F('last') + count):
+        with transaction.atomic():
+            InvoiceSequence.objects.get_or_create(year=year)
+        sequence.update(last=F('last') + count)
+    return sequence.values_list('last', flat=True).get() - count + 1
+
+
+def _new_invoice(booking_id, cost):
+    subtotal, tax, total = invoice_amounts(cost)
+    return Invoice(
+        booking_id=booking_id,
+        invoice_number=_draft_number(booking_id),
+        subtotal=subtotal,
+        tax=tax,
+        total=total,
+        payment_status='pending',
+    )
+
+
+def get_or_create_invoice(booking):
+    """Return ``(invoice, created)`` for ``booking``, creating the invoice
+    from the booking's actual (or else estimated) cost if it has none.
+
+    Safe to call concurrently for the same booking: exactly one call
+    creates the invoice and the others return it.
+    """
+    try:
+        return booking.invoice, False
+    except Invoice.DoesNotExist:
+        pass
+
+    invoice = _new_invoice(booking.id, booking.actual_cost or booking.estimated_cost)
+    try:
+        with transaction.atomic():
+            invoice.save(force_insert=True)
+            year = timezone.localdate().year
+            invoice.invoice_number = invoice_number(year, _allocate(year, 1))
+            Invoice.objects.filter(pk=invoice.pk).update(invoice_number=invoice.invoice_number)
+    except IntegrityError:
+        # Created by a concurrent request in the meantime
+        invoice = Invoice.objects.get(booking_id=booking.id)
+        booking.invoice = invoice
+        return invoice, False
+    booking.invoice = invoice
+    return invoice, True
+
+
+def create_invoices(costs):
+    """Create the missing invoices of many bookings at once.
+
+    ``costs`` maps booking ids to the amount to invoice. Bookings that
+    already have an invoice (or get one concurrently) are skipped. Returns
+    the invoices created. Makes a constant number of queries however many
+    bookings are passed; callers invalidate the cached pages of the
+    centers and owners involved, since no signals are sent.
+    """
+    if not costs:
+        return []
+    with transaction.atomic():
+        Invoice.objects.bulk_create(
+            [_new_invoice(booking_id, cost) for booking_id, cost in costs.items()],
+            ignore_conflicts=True,
+        )
+        # The drafts left are the rows this transaction inserted.
+        invoices = list(
+            Invoice.objects.filter(invoice_number__in=[_draft_number(booking_id) for booking_id in costs])
+            .order_by('booking_id')
+        )
+        if not invoices:
+            return []
+        year = timezone.localdate().year
+        first = _allocate(year, len(invoices))
+        for n, invoice in enumerate(invoices, start=first):
+            invoice.invoice_number = invoice_number(year, n)
+        Invoice.objects.bulk_update(invoices, ['invoice_number'])
+    return invoices
+
+
+def invoice_completed_bookings(month=None, batch_size=500):
+    """Create the invoices missing for completed bookings, ``batch_size``
+    bookings per transaction; with ``month`` (a date in it), only for
+    bookings completed in that month. Returns the number created.
+    """
+    bookings = Booking.objects.filter(status__in=BILLABLE_STATUSES, invoice__isnull=True).order_by('id')
+    if month is not None:
+        start = month.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        tz = timezone.get_current_timezone()
+        bookings = bookings.filter(
+            completed_at__gte=timezone.make_aware(datetime.combine(start, time.min), tz),
+            completed_at__lt=timezone.make_aware(datetime.combine(end, time.min), tz),
+        )
+
+    created = 0
+    last_id = 0
+    while True:
+        rows = list(
+            bookings.filter(id__gt=last_id)
+            .values_list('id', 'actual_cost', 'estimated_cost', 'service_center_id', 'vehicle__owner_id')[:batch_size]
+        )
+        if not rows:
+            return created
+        last_id = rows[-1][0]
+        with transaction.atomic():
+            created += len(create_invoices({row[0]: row[1] or row[2] for row in rows}))
+            for center_id in {row[3] for row in rows}:
+                invalidate_center(center_id)
+            for owner_id in {row[4] for row in rows}:
+                invalidate_user(owner_id)
+
+
+def notify_invoices_created(invoices):
+    """Tell the owners of ``invoices`` about them by email, through the
+    outbox (see booking/notifications.py); call in the transaction that
+    created them.
+    """
+    if not invoices:
+        return
+    owners = dict(
+        Booking.objects.filter(id__in=[invoice.booking_id for invoice in invoices])
+        .values_list('id', 'vehicle__owner_id')
+    )
+    notify(
+        (
+            owners[invoice.booking_id],
+            f"Invoice {invoice.invoice_number} created for your booking",
+            f"An invoice (#{invoice.invoice_number}) has been generated for your booking #{invoice.booking_id}. "
+            f"Total: ₹{invoice.total}. Please pay using your account.",
+        )
+        for invoice in invoices
+    )
+
+
+def send_invoice_emails(invoice_ids):
+    """Job queued before invoice emails went through the outbox: moves
+    them there.
+    """
+    notify_invoices_created(list(Invoice.objects.filter(id__in=invoice_ids).order_by('id')))
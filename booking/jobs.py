@@ -0,0 +1,183 @@
+"""Database-backed queue for work that shouldn't hold up a request, such
+as sending email.
+
+``enqueue(func, **kwargs)`` adds a ``Job`` row in the current transaction,
+so a job exists exactly when the change that asked for it is committed,
+and the request doesn't wait for it to run. The ``run_workers`` command
+polls for due jobs and runs them on a pool of threads.
+
+Delivery is at least once:
+
+- A job is claimed with a conditional UPDATE, using SKIP LOCKED where the
+  database supports it.
+- It is marked done after it has run.
+- If its worker dies, the job is put back on the queue once the claim is
+  older than ``CLAIM_TIMEOUT``.
+- A job that raises is retried after a delay that doubles each attempt.
+  After ``max_attempts`` tries it is left ``dead`` for an admin to look
+  at and requeue.
+
+So jobs must be safe to run more than once.
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .events import purge_events
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Retry delays: 30 s, 1 min, 2 min, ... up to an hour, with some jitter
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# A running job whose claim is older than this is assumed to be orphaned
+CLAIM_TIMEOUT = timedelta(minutes=5)
+# Done jobs are kept this long, then deleted
+DONE_RETENTION = timedelta(days=7)
+# How often a worker process requeues orphaned jobs and purges done ones
+# (and old status events, see booking/events.py)
+HOUSEKEEPING_SECONDS = 60
+
+
+def enqueue(func, *, delay=None, max_attempts=MAX_ATTEMPTS, **kwargs):
+    """Run ``func(**kwargs)`` in a worker once the current transaction
+    commits. ``func`` must be a module-level function and ``kwargs``
+    JSON-serializable.
+    """
+    return Job.objects.create(
+        task=f'{func.__module__}.{func.__qualname__}',
+        kwargs=kwargs,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def backoff(attempts):
+    """Delay before retrying a job that has failed ``attempts`` times."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.75, 1))
+
+
+def claim_jobs(limit):
+    """Claim up to ``limit`` due jobs for this worker and return them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+    claim = {
+        'status': 'running', 'claim': token, 'claimed_at': now, 'attempts': F('attempts') + 1, 'updated_at': now,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            if not ids:
+                return []
+            Job.objects.filter(id__in=ids).update(**claim)
+    else:
+        # One statement, so SQLite takes its write lock up front rather than
+        # upgrading a read lock, which fails at once under contention.
+        if not Job.objects.filter(id__in=due.values('id')[:limit], status='queued').update(**claim):
+            return []
+    return list(Job.objects.filter(claim=token, status='running').order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns whether it succeeded."""
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        # Only if the claim is still ours, i.e. it didn't expire meanwhile
+        mine = Job.objects.filter(pk=job.pk, claim=job.claim)
+        if job.attempts >= job.max_attempts:
+            mine.update(status='dead', claim='', last_error=error, updated_at=now)
+            logger.error('Job %s (%s) failed for the last time:\n%s', job.pk, job.task, error)
+        else:
+            mine.update(
+                status='queued', claim='', run_at=now + backoff(job.attempts), last_error=error, updated_at=now,
+            )
+            logger.warning('Job %s (%s) failed, will retry:\n%s', job.pk, job.task, error)
+        return False
+    Job.objects.filter(pk=job.pk, claim=job.claim).update(status='done', claim='', updated_at=timezone.now())
+    return True
+
+
+def requeue_orphaned():
+    """Put back jobs whose worker stopped while running them."""
+    now = timezone.now()
+    orphaned = Job.objects.filter(status='running', claimed_at__lt=now - CLAIM_TIMEOUT)
+    orphaned.filter(attempts__gte=F('max_attempts')).update(
+        status='dead', claim='', last_error='The worker stopped while running the job.', updated_at=now,
+    )
+    return orphaned.update(status='queued', claim='', run_at=now, updated_at=now)
+
+
+def requeue_dead(jobs):
+    """Give dead ``jobs`` (a queryset) a fresh set of attempts."""
+    now = timezone.now()
+    return jobs.filter(status='dead').update(status='queued', attempts=0, run_at=now, updated_at=now)
+
+
+def purge_done():
+    return Job.objects.filter(status='done', updated_at__lt=timezone.now() - DONE_RETENTION).delete()[0]
+
+
+def _run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        connections.close_all()
+
+
+def work(workers=4, poll_seconds=1.0, until_empty=False, stop=None):
+    """Claim due jobs and run them on ``workers`` threads until ``stop``
+    (a ``threading.Event``) is set, or with ``until_empty`` until no job
+    is due. Returns ``(succeeded, failed)``.
+    """
+    stop = stop or threading.Event()
+    succeeded = failed = 0
+    next_housekeeping = 0
+    running = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-worker') as pool:
+        while not stop.is_set():
+            if time.monotonic() >= next_housekeeping:
+                requeue_orphaned()
+                purge_done()
+                purge_events()
+                next_housekeeping = time.monotonic() + HOUSEKEEPING_SECONDS
+
+            jobs = claim_jobs(workers - len(running)) if len(running) < workers else []
+            running.update(pool.submit(_run_in_thread, job) for job in jobs)
+            if not running:
+                if until_empty:
+                    break
+                stop.wait(poll_seconds)
+                continue
+            # Wait for a free thread, or poll again for new jobs if some are free
+            done, running = wait(running, timeout=None if len(running) == workers else poll_seconds,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    succeeded += 1
+                else:
+                    failed += 1
+        for future in running:
+            # Claimed jobs are finished before stopping
+            if future.result():
+                succeeded += 1
+            else:
+                failed += 1
+    connections.close_all()
+    return succeeded, failed
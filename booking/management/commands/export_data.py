@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from booking.exports import EXPORTS, FORMATS, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings or invoices as CSV or JSON Lines, per center and/or month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--center', type=int, help='Only this service center (id)')
+        parser.add_argument('--month', help='Only this month, as YYYY-MM')
+        parser.add_argument('--output', help='File to write to (default: standard output)')
+
+    def handle(self, *args, **options):
+        month = None
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--month must be given as YYYY-MM.')
+        blocks = export_stream(options['name'], options['format'], service_center_id=options['center'], month=month)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(blocks)
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending='')
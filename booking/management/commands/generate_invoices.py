@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from booking.invoices import invoice_completed_bookings
+
+
+class Command(BaseCommand):
+    help = 'Create the invoices missing for completed bookings (month-end close)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Only bookings completed in this month, as YYYY-MM',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Bookings invoiced per transaction',
+        )
+
+    def handle(self, *args, **options):
+        month = None
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--month must be given as YYYY-MM.')
+        created = invoice_completed_bookings(month=month, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} invoice(s).'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from booking.imports import BATCH_SIZE, InvalidImportFile, InventoryImporter, VehicleImporter
+from booking.models import ServiceCenter, User
+
+
+class Command(BaseCommand):
+    help = 'Import vehicles for an owner or inventory items for a service center from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=['inventory', 'vehicles'])
+        parser.add_argument('path', help='CSV file with a header line')
+        parser.add_argument('--owner', help='Username of the owner the vehicles belong to')
+        parser.add_argument('--center', type=int, help='Id of the service center the inventory belongs to')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        if options['name'] == 'vehicles':
+            try:
+                owner = User.objects.get(username=options['owner'], role='owner')
+            except User.DoesNotExist:
+                raise CommandError('--owner must be the username of a vehicle owner.')
+            importer = VehicleImporter(owner, batch_size=options['batch_size'])
+        else:
+            try:
+                center = ServiceCenter.objects.get(pk=options['center'])
+            except ServiceCenter.DoesNotExist:
+                raise CommandError('--center must be the id of a service center.')
+            importer = InventoryImporter(center, batch_size=options['batch_size'])
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                result = importer.run(f)
+        except (OSError, InvalidImportFile) as exc:
+            raise CommandError(str(exc))
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'line {line}: {message}'))
+        if result.failed > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'... and {result.failed - len(result.errors)} more'))
+        self.stdout.write(self.style.SUCCESS(f'Imported {result.created} row(s), skipped {result.failed}.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from booking.stats import rebuild_stats, verify_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-center and per-owner booking counters, or verify them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only compare the stored counters with the bookings and invoices; exit non-zero on drift',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            problems = verify_stats()
+            for problem in problems:
+                self.stdout.write(self.style.WARNING(problem))
+            if problems:
+                raise CommandError(f'{len(problems)} counter(s) out of date; run rebuild_booking_stats to repair.')
+            self.stdout.write(self.style.SUCCESS('Booking counters are up to date.'))
+            return
+
+        rebuild_stats()
+        self.stdout.write(self.style.SUCCESS('Rebuilt booking counters.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from booking.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Refresh the analytics rollups from bookings and invoices changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild all rollups from scratch (e.g. after bookings or invoices were deleted)',
+        )
+
+    def handle(self, *args, **options):
+        days, months = refresh_rollups(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {days} center-day(s) and {months} center-month(s) of analytics rollups.')
+        )
@@ -0,0 +1,34 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from booking.jobs import work
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails and other slow side effects) on a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run at the same time')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between polls when the queue is idle')
+        parser.add_argument(
+            '--until-empty',
+            action='store_true',
+            help='Exit once no job is due instead of waiting for more (e.g. from cron)',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+
+        def shut_down(signum, frame):
+            # Finish the jobs already claimed, then exit
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shut_down)
+        signal.signal(signal.SIGINT, shut_down)
+        succeeded, failed = work(
+            workers=options['workers'], poll_seconds=options['poll'], until_empty=options['until_empty'], stop=stop,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Ran {succeeded + failed} job(s): {succeeded} succeeded, {failed} failed.')
+        )
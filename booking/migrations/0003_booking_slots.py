@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_mechanicrequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicecenter',
+            name='bays',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='servicecenter',
+            name='slot_minutes',
+            field=models.PositiveIntegerField(default=60),
+        ),
+        migrations.CreateModel(
+            name='BookingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('service_center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='booking.servicecenter')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='booking.bookingslot'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingslot',
+            constraint=models.UniqueConstraint(fields=('service_center', 'date', 'start_time'), name='unique_center_slot'),
+        ),
+    ]
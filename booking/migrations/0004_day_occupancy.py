@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_booking_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('full_mask', models.BigIntegerField(default=0)),
+                ('service_center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='booking.servicecenter')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dayoccupancy',
+            constraint=models.UniqueConstraint(fields=('date', 'service_center'), name='unique_day_occupancy'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:34
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_open_bookings(apps, schema_editor):
+    Mechanic = apps.get_model('booking', 'Mechanic')
+    mechanics = Mechanic.objects.annotate(
+        open_count=Count('bookings', filter=Q(bookings__status__in=['accepted', 'in_progress'])),
+    ).filter(open_count__gt=0)
+    for mechanic in mechanics:
+        Mechanic.objects.filter(pk=mechanic.pk).update(open_bookings=mechanic.open_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_day_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mechanic',
+            name='open_bookings',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_open_bookings, migrations.RunPython.noop),
+    ]
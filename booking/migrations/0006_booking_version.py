@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_mechanic_open_bookings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_booking_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service_center', '-created_at'], name='booking_center_created'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service_center', 'status', '-created_at'], name='booking_center_status'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service_center', 'booking_date'], name='booking_center_date'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vehicle', '-created_at'], name='booking_vehicle_created'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vehicle', 'status'], name='booking_vehicle_status'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['mechanic', '-created_at'], name='booking_mechanic_created'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['mechanic', 'status', 'completed_at'], name='booking_mechanic_status'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['accepted', 'in_progress'])), fields=['mechanic', '-created_at'], name='booking_mechanic_open'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['payment_status', 'created_at'], name='invoice_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-created_at'], name='invoice_created'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_booking_invoice_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicecenter',
+            index=models.Index(fields=['-created_at'], name='servicecenter_created'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-date_joined'], name='user_date_joined'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', '-date_joined'], name='user_role_date_joined'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    from booking.stats import rebuild_stats
+    rebuild_stats(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceCenterStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('in_progress', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('ready_for_delivery', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('service_center', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='booking.servicecenter')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ServiceCenterDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('service_center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_stats', to='booking.servicecenter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OwnerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('accepted', models.PositiveIntegerField(default=0)),
+                ('in_progress', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('ready_for_delivery', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='servicecenterdaystats',
+            constraint=models.UniqueConstraint(fields=('service_center', 'date'), name='unique_center_day_stats'),
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
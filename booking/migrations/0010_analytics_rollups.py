@@ -0,0 +1,97 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_booking_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCustomerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MonthlyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='booking_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['updated_at'], name='invoice_updated'),
+        ),
+        migrations.AddField(
+            model_name='monthlyrevenuerollup',
+            name='service_center',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='booking.servicecenter'),
+        ),
+        migrations.AddField(
+            model_name='dailycustomerrollup',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='dailycustomerrollup',
+            name='service_center',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_rollups', to='booking.servicecenter'),
+        ),
+        migrations.AddField(
+            model_name='dailycategoryrollup',
+            name='service_category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.servicecategory'),
+        ),
+        migrations.AddField(
+            model_name='dailycategoryrollup',
+            name='service_center',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_rollups', to='booking.servicecenter'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrevenuerollup',
+            constraint=models.UniqueConstraint(fields=('service_center', 'month'), name='unique_revenue_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycustomerrollup',
+            constraint=models.UniqueConstraint(fields=('service_center', 'day', 'owner'), name='unique_customer_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategoryrollup',
+            constraint=models.UniqueConstraint(fields=('service_center', 'day', 'service_category'), name='unique_category_rollup'),
+        ),
+    ]
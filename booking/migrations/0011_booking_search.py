@@ -0,0 +1,103 @@
+"""FTS5 full-text index over bookings (SQLite only, see booking/search.py).
+
+``booking_search`` has one row per booking (rowid = booking id). Triggers
+keep it in sync with inserts, updates and deletes of bookings and with
+changes to the vehicle registration and owner name/phone it copies, so
+``save()``, ``QuerySet.update()`` and ``bulk_create()`` are all covered.
+"""
+from django.db import migrations
+
+# Columns of booking_search for booking ``b`` with vehicle ``v`` and owner
+# ``u``. Registration and phone are also stored without separators so
+# "KA01AB1234" finds "KA-01-AB-1234", and the phone's last ten digits so a
+# number is found without its country code.
+SEARCH_ROW = """
+    SELECT b.id,
+           'c' || b.service_center_id,
+           replace(b.status, '_', ''),
+           v.registration_number || ' ' || replace(replace(v.registration_number, '-', ''), ' ', ''),
+           u.username || ' ' || u.first_name || ' ' || u.last_name || ' ' || u.phone || ' '
+               || replace(replace(replace(u.phone, ' ', ''), '-', ''), '+', '') || ' '
+               || substr(replace(replace(replace(u.phone, ' ', ''), '-', ''), '+', ''), -10),
+           b.service_description
+    FROM booking_booking b
+    JOIN booking_vehicle v ON v.id = b.vehicle_id
+    JOIN booking_user u ON u.id = v.owner_id
+"""
+
+INSERT = 'INSERT INTO booking_search(rowid, center, status, registration, owner, description)'
+
+FORWARD = [
+    """
+    CREATE VIRTUAL TABLE booking_search USING fts5(
+        center, status, registration, owner, description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"{INSERT} {SEARCH_ROW}",
+    f"""
+    CREATE TRIGGER booking_search_insert AFTER INSERT ON booking_booking BEGIN
+        {INSERT} {SEARCH_ROW} WHERE b.id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER booking_search_update
+    AFTER UPDATE OF vehicle_id, service_center_id, status, service_description ON booking_booking BEGIN
+        DELETE FROM booking_search WHERE rowid = OLD.id;
+        {INSERT} {SEARCH_ROW} WHERE b.id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER booking_search_delete AFTER DELETE ON booking_booking BEGIN
+        DELETE FROM booking_search WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER booking_search_vehicle AFTER UPDATE OF registration_number, owner_id ON booking_vehicle BEGIN
+        DELETE FROM booking_search WHERE rowid IN (SELECT id FROM booking_booking WHERE vehicle_id = NEW.id);
+        {INSERT} {SEARCH_ROW} WHERE b.vehicle_id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER booking_search_owner AFTER UPDATE OF username, first_name, last_name, phone ON booking_user BEGIN
+        DELETE FROM booking_search WHERE rowid IN (
+            SELECT b.id FROM booking_booking b JOIN booking_vehicle v ON v.id = b.vehicle_id WHERE v.owner_id = NEW.id
+        );
+        {INSERT} {SEARCH_ROW} WHERE v.owner_id = NEW.id;
+    END
+    """,
+]
+
+BACKWARD = [
+    'DROP TRIGGER IF EXISTS booking_search_owner',
+    'DROP TRIGGER IF EXISTS booking_search_vehicle',
+    'DROP TRIGGER IF EXISTS booking_search_delete',
+    'DROP TRIGGER IF EXISTS booking_search_update',
+    'DROP TRIGGER IF EXISTS booking_search_insert',
+    'DROP TABLE IF EXISTS booking_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FORWARD:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in BACKWARD:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
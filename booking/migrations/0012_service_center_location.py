@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_booking_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicecenter',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='servicecenter',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddField(
+            model_name='servicecenter',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='servicecenter',
+            index=models.Index(fields=['updated_at'], name='servicecenter_updated'),
+        ),
+    ]
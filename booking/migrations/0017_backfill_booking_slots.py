@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:05
+
+from django.db import migrations
+
+
+def backfill_slots(apps, schema_editor):
+    from booking.slots import backfill_slots
+    backfill_slots(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_status_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+    ]
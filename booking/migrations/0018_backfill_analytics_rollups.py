@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:20
+
+from django.db import migrations
+
+
+def build_rollups(apps, schema_editor):
+    from booking.rollups import refresh_rollups
+    refresh_rollups(full=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0017_backfill_booking_slots'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:05
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # The 'stamps' cache is a database table unless REDIS_URL is set
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0018_backfill_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
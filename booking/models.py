@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models import F
 from django.utils import timezone
 
 
@@ -15,6 +17,13 @@ class User(AbstractUser):
     phone = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Admin user list pages on (date_joined, id), optionally by role
+            models.Index(fields=['-date_joined'], name='user_date_joined'),
+            models.Index(fields=['role', '-date_joined'], name='user_role_date_joined'),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
@@ -29,8 +38,22 @@ class ServiceCenter(models.Model):
     email = models.EmailField()
     opening_time = models.TimeField(default='09:00')
     closing_time = models.TimeField(default='18:00')
+    # Slot capacity: how many vehicles the center can take in parallel and
+    # how long one booking slot lasts.
+    bays = models.PositiveIntegerField(default=1)
+    slot_minutes = models.PositiveIntegerField(default=60)
+    # Location for the nearest-center search (booking/geo.py)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='servicecenter_created'),
+            models.Index(fields=['updated_at'], name='servicecenter_updated'),
+        ]
     
     def __str__(self):
         return self.name
@@ -64,6 +87,9 @@ class Mechanic(models.Model):
     service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='mechanics')
     specialization = models.CharField(max_length=200, blank=True)
     experience_years = models.IntegerField(default=0)
+    # Assigned bookings that are accepted or in progress; maintained by
+    # booking/assignment.py.
+    open_bookings = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -81,6 +107,86 @@ class ServiceCategory(models.Model):
         return self.name
 
 
+class BookingSlot(models.Model):
+    """Bays taken at a service center for one slot of one day. Rows are
+    created the first time a slot is booked and ``booked`` is only changed
+    with conditional UPDATEs (see booking/slots.py).
+    """
+    service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='slots')
+    date = models.DateField()
+    start_time = models.TimeField()
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_center', 'date', 'start_time'], name='unique_center_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.service_center.name} {self.date} {self.start_time} ({self.booked} booked)"
+
+
+class DayOccupancy(models.Model):
+    """Bitmap of the fully booked slots of a service center on one day.
+
+    Bit ``i`` of ``full_mask`` is set when the center's ``i``-th slot of the
+    day (counted from ``opening_time``) has no free bay. Kept up to date by
+    booking/slots.py and used to search for free slots without touching
+    bookings.
+    """
+    service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='occupancy')
+    date = models.DateField()
+    full_mask = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'service_center'], name='unique_day_occupancy'),
+        ]
+
+    def __str__(self):
+        return f"{self.service_center.name} {self.date} ({self.full_mask:b})"
+
+
+class BookingQuerySet(models.QuerySet):
+    def for_list(self):
+        """Bookings with everything the list templates show, in one query.
+
+        Only the columns those templates read are loaded; add a field here
+        before using it in a booking list or every row costs a query.
+        """
+        return self.select_related(
+            'vehicle__owner', 'service_center', 'service_category', 'mechanic__user',
+        ).only(
+            'id', 'status', 'booking_date', 'booking_time', 'estimated_cost', 'actual_cost',
+            'created_at', 'version',
+            'vehicle__brand', 'vehicle__model', 'vehicle__registration_number', 'vehicle__owner__username',
+            'service_center__name', 'service_category__name', 'mechanic__user__username',
+        )
+
+    def for_detail(self):
+        """Bookings with the related rows the detail pages and their access
+        checks need."""
+        return self.select_related(
+            'vehicle__owner', 'service_center__user', 'service_category', 'mechanic__user',
+        )
+
+
+class InvoiceQuerySet(models.QuerySet):
+    def for_list(self):
+        return self.select_related('booking__service_center').only(
+            'id', 'invoice_number', 'total', 'payment_status', 'paid_at', 'created_at',
+            'booking__id', 'booking__service_center__name',
+        )
+
+
+class InvalidTransition(Exception):
+    """Raised when a booking cannot move to the requested status."""
+
+
+class StaleBooking(Exception):
+    """Raised when a booking was changed by someone else since it was read."""
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -90,11 +196,22 @@ class Booking(models.Model):
         ('ready_for_delivery', 'Ready for Delivery'),
         ('cancelled', 'Cancelled'),
     ]
+
+    # Allowed status changes: current status -> statuses it may move to.
+    TRANSITIONS = {
+        'pending': ('accepted', 'cancelled'),
+        'accepted': ('in_progress', 'completed', 'cancelled'),
+        'in_progress': ('completed',),
+        'completed': ('ready_for_delivery',),
+        'ready_for_delivery': (),
+        'cancelled': (),
+    }
     
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='bookings')
     service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='bookings')
     service_category = models.ForeignKey(ServiceCategory, on_delete=models.CASCADE, related_name='bookings')
     mechanic = models.ForeignKey(Mechanic, on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings')
+    slot = models.ForeignKey(BookingSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings')
     
     booking_date = models.DateField()
     booking_time = models.TimeField()
@@ -107,13 +224,85 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every change made through apply_changes() for optimistic locking
+    version = models.PositiveIntegerField(default=0)
+
+    objects = BookingQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Service center lists, status filters and dashboard counts
+            models.Index(fields=['service_center', '-created_at'], name='booking_center_created'),
+            models.Index(fields=['service_center', 'status', '-created_at'], name='booking_center_status'),
+            models.Index(fields=['service_center', 'booking_date'], name='booking_center_date'),
+            # Owner pages reach bookings through their vehicles
+            models.Index(fields=['vehicle', '-created_at'], name='booking_vehicle_created'),
+            models.Index(fields=['vehicle', 'status'], name='booking_vehicle_status'),
+            # Mechanic task lists and "completed today"
+            models.Index(fields=['mechanic', '-created_at'], name='booking_mechanic_created'),
+            models.Index(fields=['mechanic', 'status', 'completed_at'], name='booking_mechanic_status'),
+            # Open work only: small, and what the mechanic dashboard reads
+            models.Index(
+                fields=['mechanic', '-created_at'], name='booking_mechanic_open',
+                condition=models.Q(status__in=['accepted', 'in_progress']),
+            ),
+            # Incremental analytics refresh (booking/rollups.py)
+            models.Index(fields=['updated_at'], name='booking_updated'),
+        ]
     
     def __str__(self):
         return f"Booking #{self.id} - {self.vehicle.registration_number}"
 
+    def can_transition(self, new_status):
+        return new_status in self.TRANSITIONS.get(self.status, ())
+
+    def apply_changes(self, status=None, expected_version=None, **fields):
+        """Change status and/or other fields with one conditional UPDATE.
+
+        The UPDATE only matches while the row still has the status and
+        version this instance was read with (or ``expected_version`` if
+        given, e.g. the version a form was rendered with), and only writes
+        the changed columns. Raises InvalidTransition for a status change
+        the state machine doesn't allow and StaleBooking if someone else
+        changed the booking first.
+        """
+        version = self.version if expected_version is None else expected_version
+        if version != self.version:
+            raise StaleBooking('This booking was changed by someone else. Please review it and try again.')
+        if status is not None and status != self.status:
+            if not self.can_transition(status):
+                raise InvalidTransition(
+                    f"Cannot change booking from {self.get_status_display()} to "
+                    f"{dict(self.STATUS_CHOICES).get(status, status)}."
+                )
+            fields['status'] = status
+            if status == 'completed':
+                fields.setdefault('completed_at', timezone.now())
+        if not fields:
+            return False
+
+        fields['updated_at'] = timezone.now()
+        old_status = self.status
+        with transaction.atomic():
+            updated = Booking.objects.filter(pk=self.pk, status=old_status, version=version).update(
+                version=F('version') + 1, **fields
+            )
+            if not updated:
+                raise StaleBooking('This booking was changed by someone else. Please review it and try again.')
+            if 'status' in fields:
+                from .stats import record_status_change
+                from .events import publish_status_changes
+                record_status_change(self, old_status, fields['status'])
+                publish_status_changes([self.pk])
+            from .cache import invalidate_center, invalidate_user
+            invalidate_center(self.service_center_id)
+            invalidate_user(self.vehicle.owner_id)
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.version = version + 1
+        return True
+
 
 class Invoice(models.Model):
     PAYMENT_STATUS_CHOICES = [
@@ -129,12 +318,125 @@ class Invoice(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(null=True, blank=True)
+
+    objects = InvoiceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Revenue totals and monthly revenue grouping
+            models.Index(fields=['payment_status', 'created_at'], name='invoice_status_created'),
+            models.Index(fields=['-created_at'], name='invoice_created'),
+            models.Index(fields=['updated_at'], name='invoice_updated'),
+        ]
     
     def __str__(self):
         return f"Invoice {self.invoice_number}"
 
 
+class InvoiceSequence(models.Model):
+    """Last invoice number handed out in a year (see booking/invoices.py)."""
+    year = models.PositiveIntegerField(unique=True)
+    last = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last}"
+
+
+class BookingCounters(models.Model):
+    """Booking totals by status plus paid revenue, maintained incrementally
+    by booking/stats.py so dashboards read one row instead of counting.
+    """
+    total = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    in_progress = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    ready_for_delivery = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ServiceCenterStats(BookingCounters):
+    service_center = models.OneToOneField(ServiceCenter, on_delete=models.CASCADE, related_name='stats')
+
+    def __str__(self):
+        return f"Stats for {self.service_center.name}"
+
+
+class OwnerStats(BookingCounters):
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, related_name='booking_stats')
+
+    def __str__(self):
+        return f"Stats for {self.owner.username}"
+
+
+class ServiceCenterDayStats(models.Model):
+    """Number of bookings a service center has for one booking date."""
+    service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='day_stats')
+    date = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_center', 'date'], name='unique_center_day_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.service_center.name} {self.date}: {self.bookings}"
+
+
+class DailyCategoryRollup(models.Model):
+    """Bookings a service center received on one day for one category."""
+    service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='category_rollups')
+    day = models.DateField()
+    service_category = models.ForeignKey(ServiceCategory, on_delete=models.CASCADE, related_name='+')
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_center', 'day', 'service_category'], name='unique_category_rollup'),
+        ]
+
+
+class DailyCustomerRollup(models.Model):
+    """Bookings a service center received on one day from one owner."""
+    service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='customer_rollups')
+    day = models.DateField()
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_center', 'day', 'owner'], name='unique_customer_rollup'),
+        ]
+
+
+class MonthlyRevenueRollup(models.Model):
+    """Paid invoice total of a service center for one month (first day)."""
+    service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='revenue_rollups')
+    month = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_center', 'month'], name='unique_revenue_rollup'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """How far (by ``updated_at``) the analytics rollups have been refreshed."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
 class Inventory(models.Model):
     service_center = models.ForeignKey(ServiceCenter, on_delete=models.CASCADE, related_name='inventory_items')
     item_name = models.CharField(max_length=200)
@@ -183,4 +485,82 @@ class MechanicRequest(models.Model):
         return f"MechanicRequest by {self.user.username} for {sc}"
 
 
+class Job(models.Model):
+    """A unit of background work, run by ``run_workers`` (see booking/jobs.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),
+    ]
+
+    # Dotted path of the function to call with ``kwargs``
+    task = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Set while running: which claim holds the job and since when
+    claim = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # What workers poll for, and expired claims
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at'),
+            models.Index(fields=['claim'], name='job_claim'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
 
+class Notification(models.Model):
+    """An email to a user waiting in the outbox (see booking/notifications.py)."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set while a sender is emailing it, so two senders don't both send it
+    claim = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The outbox: unsent notifications by recipient
+            models.Index(
+                fields=['recipient', 'created_at'], name='notification_unsent',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+            models.Index(fields=['claim'], name='notification_claim'),
+            # Purging old sent notifications
+            models.Index(fields=['sent_at'], name='notification_sent'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient.username}"
+
+
+class StatusEvent(models.Model):
+    """A booking status change for one user's open pages (see booking/events.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='status_events')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    version = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # What a reconnecting page missed
+            models.Index(fields=['user', 'id'], name='status_event_user'),
+            # Purging old events
+            models.Index(fields=['created_at'], name='status_event_created'),
+        ]
+
+    def __str__(self):
+        return f"Booking #{self.booking_id} {self.status} for {self.user_id}"
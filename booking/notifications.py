@@ -0,0 +1,122 @@
+"""Outbox for emails to users.
+
+``notify()`` writes notifications to the ``Notification`` table in the
+caller's transaction and makes sure a ``send_notifications`` job is
+queued (see booking/jobs.py). The job sends everything that is due over
+a single SMTP connection. Notifications for the same user are held for
+``NOTIFICATION_DIGEST_SECONDS`` after the first one and then go out
+together as one digest, so a center accepting 200 bookings at the start
+of a shift costs one connection and one email per owner rather than a
+connection per booking.
+
+Each batch of recipients is claimed before it is sent, so two senders
+never email the same notifications. A claim left by a sender that died
+expires after ``CLAIM_TIMEOUT``, and those notifications are sent again.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .jobs import CLAIM_TIMEOUT, enqueue
+from .models import Job, Notification
+
+# Recipients emailed per claim
+BATCH_SIZE = 100
+SENT_RETENTION = timedelta(days=7)
+# A queued sender due this long after it is needed still counts as
+# sending in time
+SCHEDULE_SLACK = timedelta(seconds=5)
+
+
+def digest_window():
+    return timedelta(seconds=settings.NOTIFICATION_DIGEST_SECONDS)
+
+
+def notify(messages):
+    """Queue ``[(recipient_id, subject, body)]`` for emailing."""
+    messages = list(messages)
+    if not messages:
+        return
+    Notification.objects.bulk_create([
+        Notification(recipient_id=recipient_id, subject=subject, body=body)
+        for recipient_id, subject, body in messages
+    ])
+    _schedule(digest_window())
+
+
+def _schedule(delay):
+    """Make sure a ``send_notifications`` job runs within ``delay``. One
+    that is queued for later (e.g. backing off after a failure) doesn't
+    count, so it can't hold up new notifications.
+    """
+    task = f'{send_notifications.__module__}.{send_notifications.__qualname__}'
+    due_by = timezone.now() + delay + SCHEDULE_SLACK
+    if not Job.objects.filter(task=task, status='queued', run_at__lte=due_by).exists():
+        enqueue(send_notifications, delay=delay)
+
+
+def _digest(recipient, notifications):
+    """One email with all of ``notifications``."""
+    if len(notifications) == 1:
+        subject, text = notifications[0].subject, notifications[0].body
+    else:
+        subject = f'{len(notifications)} updates on your bookings'
+        text = '\n\n'.join(f'{n.subject}:\n{n.body}' for n in notifications)
+    body = f'Dear {recipient.get_full_name() or recipient.username},\n\n{text}\n\nThank you.'
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient.email])
+
+
+def send_notifications():
+    """Job: email every recipient whose oldest unsent notification is
+    older than the digest window, one email each, then schedule the next
+    run for the notifications still waiting. Returns the number of emails
+    sent.
+    """
+    window = digest_window()
+    now = timezone.now()
+    unsent = Notification.objects.filter(sent_at__isnull=True)
+    free = unsent.filter(Q(claim='') | Q(claimed_at__lt=now - CLAIM_TIMEOUT))
+    due = list(
+        free.values('recipient_id').annotate(first=Min('created_at')).filter(first__lte=now - window)
+        .order_by('first').values_list('recipient_id', flat=True)
+    )
+
+    sent = 0
+    if due:
+        with get_connection() as connection:
+            for start in range(0, len(due), BATCH_SIZE):
+                sent += _send_batch(connection, free, due[start:start + BATCH_SIZE])
+
+    Notification.objects.filter(sent_at__lt=now - SENT_RETENTION).delete()
+    first_waiting = unsent.filter(claim='').aggregate(first=Min('created_at'))['first']
+    if first_waiting is not None:
+        _schedule(max(first_waiting + window - timezone.now(), timedelta()))
+    return sent
+
+
+def _send_batch(connection, free, recipient_ids):
+    token = uuid.uuid4().hex
+    free.filter(recipient_id__in=recipient_ids).update(claim=token, claimed_at=timezone.now())
+    claimed = Notification.objects.filter(claim=token, sent_at__isnull=True)
+    by_recipient = {}
+    for notification in claimed.select_related('recipient').order_by('recipient_id', 'created_at'):
+        by_recipient.setdefault(notification.recipient, []).append(notification)
+
+    done = []
+    sent = 0
+    try:
+        for recipient, notifications in by_recipient.items():
+            if recipient.email:
+                connection.send_messages([_digest(recipient, notifications)])
+                sent += 1
+            done.extend(n.pk for n in notifications)
+    finally:
+        # What went out is marked sent even if a later email failed (the
+        # job is then retried); the rest is released for the retry.
+        Notification.objects.filter(pk__in=done).update(sent_at=timezone.now(), claim='')
+        claimed.exclude(pk__in=done).update(claim='', claimed_at=None)
+    return sent
@@ -0,0 +1,82 @@
+"""Keyset (cursor) pagination for the long list pages.
+
+Pages are ordered newest first on ``(<field>, id)`` and a cursor is the
+position of the last (``after``) or first (``before``) row of the page the
+user came from. Every page is a range read of ``per_page + 1`` rows from
+an index, so page N costs the same as page 1, and rows inserted meanwhile
+never shift an item onto two pages.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+PER_PAGE = 25
+
+
+class KeysetPage:
+    def __init__(self, items, has_next, has_previous, field, params):
+        self.items = items
+        self.has_next = has_next and bool(items)
+        self.has_previous = has_previous and bool(items)
+        self._field = field
+        self._params = params
+
+    def _url(self, direction, item):
+        params = self._params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[direction] = encode_cursor(getattr(item, self._field), item.pk)
+        return f'?{params.urlencode()}'
+
+    @property
+    def next_url(self):
+        return self._url('after', self.items[-1]) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url('before', self.items[0]) if self.has_previous else None
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)`` or None for a missing or tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_paginate(request, queryset, field='created_at', per_page=PER_PAGE):
+    """Return the ``KeysetPage`` of ``queryset`` selected by the request's
+    ``after``/``before`` cursor. Other query parameters (filters) are kept
+    in the next/previous links.
+    """
+    after = decode_cursor(request.GET.get('after'))
+    before = None if after else decode_cursor(request.GET.get('before'))
+
+    if before:
+        value, pk = before
+        rows = list(
+            queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+            .order_by(field, 'pk')[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        return KeysetPage(items, True, has_previous, field, request.GET)
+
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    if after:
+        value, pk = after
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    rows = list(queryset[:per_page + 1])
+    return KeysetPage(rows[:per_page], len(rows) > per_page, bool(after), field, request.GET)
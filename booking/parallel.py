@@ -0,0 +1,99 @@
+"""Run a page's independent queries at the same time.
+
+Django runs sync ORM code, including its async ORM methods, on the one
+thread a process shares for sync code, so a view's queries go one after
+another and the page waits for the sum of their round trips. These
+helpers instead run each callable on a thread of a small pool, each with
+its own database connection, so the page waits about as long as its
+slowest query.
+
+``DB_QUERY_THREADS`` sets the size of the pool. With 0, or when the
+caller is in a transaction (whose changes other connections can't see
+yet, e.g. in tests), the callables run one after another on the caller's
+connection instead.
+
+Each pool thread keeps its connection for ``POOL_CONN_MAX_AGE`` seconds
+(or longer if ``CONN_MAX_AGE`` says so), since opening one per query
+would cost more than the query saves. As with requests, a connection
+that broke is dropped before the next callable.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+
+POOL_CONN_MAX_AGE = 300
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers != settings.DB_QUERY_THREADS:
+            if _pool is not None:
+                _shutdown(_pool)
+            opened = []
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.DB_QUERY_THREADS, thread_name_prefix='db-query',
+                initializer=lambda: opened.extend(connections.all()),
+            )
+            _pool.db_connections = opened
+        return _pool
+
+
+def _shutdown(pool):
+    """Stop ``pool``'s threads and close their database connections."""
+    pool.shutdown(wait=True)
+    for wrapper in pool.db_connections:
+        # The thread that owned it is gone
+        wrapper.inc_thread_sharing()
+        try:
+            wrapper.close()
+        finally:
+            wrapper.dec_thread_sharing()
+
+
+def _call(query):
+    connection.close_if_unusable_or_obsolete()
+    fresh = connection.connection is None
+    try:
+        return query()
+    finally:
+        if fresh and connection.close_at is not None:
+            connection.close_at = max(connection.close_at, time.monotonic() + POOL_CONN_MAX_AGE)
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+def _one_by_one(queries):
+    return {name: query() for name, query in queries.items()}
+
+
+def run_queries(queries):
+    """Call each callable in ``queries`` (a dict) at the same time and
+    return a dict of their results under the same keys.
+    """
+    if not settings.DB_QUERY_THREADS or _in_transaction():
+        return _one_by_one(queries)
+    pool = _executor()
+    futures = {name: pool.submit(_call, query) for name, query in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+async def gather_queries(queries):
+    """``run_queries`` for async views."""
+    if not settings.DB_QUERY_THREADS or await sync_to_async(_in_transaction)():
+        return await sync_to_async(_one_by_one)(queries)
+    pool = _executor()
+    results = await asyncio.gather(*(
+        asyncio.wrap_future(pool.submit(_call, query)) for query in queries.values()
+    ))
+    return dict(zip(queries, results))
@@ -0,0 +1,79 @@
+"""Process-local cache of reference data: service centers and active
+service categories.
+
+Almost every owner page lists the same few centers and categories, and
+they change a few times a day. Each process keeps them in memory together
+with the version they were loaded at; saving or deleting a center or a
+category bumps a version stamp in the ``stamps`` cache, which all
+processes share (see booking/signals.py), so a request costs one stamp
+read and the lists are only re-queried after they actually changed.
+Forms still check the chosen center and category against the database
+before saving (see ``BookingForm.clean``).
+
+The objects are shared by every request of the process: treat them as
+read-only.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.db import transaction
+
+from .cache import stamps
+from .models import ServiceCategory, ServiceCenter
+
+VERSION_KEY = 'reference-data:version'
+
+
+class ReferenceData:
+    def __init__(self, version, centers, categories):
+        self.version = version
+        # All centers, by name
+        self.centers = centers
+        self.active_centers = [center for center in centers if center.is_active]
+        # Active categories, by name
+        self.categories = categories
+        self.centers_by_id = {center.pk: center for center in centers}
+        self.categories_by_id = {category.pk: category for category in categories}
+        # Ids of the active centers with bays, by (opening_time,
+        # closing_time, slot_minutes), for the earliest-free-slot search
+        self.schedules = defaultdict(list)
+        for center in sorted(self.active_centers, key=lambda center: center.pk):
+            if center.bays:
+                self.schedules[center.opening_time, center.closing_time, center.slot_minutes].append(center.pk)
+
+
+_data = None
+_lock = threading.Lock()
+
+
+def reference_changed():
+    """Make every process reload the reference data (after commit)."""
+    transaction.on_commit(lambda: stamps.set(VERSION_KEY, time.time_ns()))
+
+
+def reference_version():
+    """Stamp that moves whenever centers or categories change."""
+    version = stamps.get(VERSION_KEY)
+    if version is None:
+        stamps.add(VERSION_KEY, time.time_ns())
+        version = stamps.get(VERSION_KEY)
+    return version
+
+
+def reference_data():
+    """The current ``ReferenceData``, reloaded if its version moved."""
+    global _data
+    version = reference_version()
+    data = _data
+    if data is not None and data.version == version:
+        return data
+    with _lock:
+        if _data is not None and _data.version == version:
+            return _data
+        _data = ReferenceData(
+            version,
+            list(ServiceCenter.objects.order_by('name', 'id')),
+            list(ServiceCategory.objects.filter(is_active=True).order_by('name', 'id')),
+        )
+        return _data
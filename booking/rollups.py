@@ -0,0 +1,161 @@
+"""Pre-aggregated rollups behind the service center analytics page.
+
+``DailyCategoryRollup`` and ``DailyCustomerRollup`` count bookings per
+(center, day of ``created_at``, category / owner) and
+``MonthlyRevenueRollup`` sums paid invoices per (center, month of the
+invoice's ``created_at``). The analytics view only reads these tables.
+
+``refresh_rollups`` is run periodically by the ``refresh_analytics_rollups``
+management command. It looks at the bookings and invoices whose
+``updated_at`` moved past the stored watermark, and recomputes just the
+(center, day) and (center, month) rows they belong to. Recomputing instead
+of incrementing makes a refresh idempotent, so overlapping windows and
+re-runs are harmless.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.apps import apps as global_apps
+from django.db import models, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .cache import invalidate_center
+
+WATERMARK = 'analytics'
+
+# The most requested services and most frequent customers are ranked
+# over bookings made in this many days.
+RANKING_DAYS = 365
+
+# A transaction that commits after a refresh started may carry an
+# ``updated_at`` from before it; re-reading this much history covers it.
+OVERLAP = timedelta(minutes=5)
+
+# Days/months recomputed per query.
+CHUNK = 500
+
+
+def refresh_rollups(full=False, apps=global_apps):
+    """Bring the rollups up to date and return the number of (center, day)
+    and (center, month) keys recomputed. ``full`` rebuilds everything.
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    Invoice = apps.get_model('booking', 'Invoice')
+    DailyCategoryRollup = apps.get_model('booking', 'DailyCategoryRollup')
+    DailyCustomerRollup = apps.get_model('booking', 'DailyCustomerRollup')
+    MonthlyRevenueRollup = apps.get_model('booking', 'MonthlyRevenueRollup')
+    RollupWatermark = apps.get_model('booking', 'RollupWatermark')
+    started = timezone.now()
+    bookings = Booking.objects.all()
+    invoices = Invoice.objects.all()
+    watermark = None if full else last_refreshed(apps)
+    if watermark:
+        bookings = bookings.filter(updated_at__gte=watermark - OVERLAP)
+        invoices = invoices.filter(updated_at__gte=watermark - OVERLAP)
+
+    days = _group(
+        bookings.annotate(day=TruncDate('created_at')).values_list('service_center_id', 'day').distinct().order_by()
+    )
+    months = _group(
+        invoices.annotate(month=TruncMonth('created_at', output_field=models.DateField()))
+        .values_list('booking__service_center_id', 'month').distinct().order_by()
+    )
+
+    with transaction.atomic():
+        if full:
+            DailyCategoryRollup.objects.all().delete()
+            DailyCustomerRollup.objects.all().delete()
+            MonthlyRevenueRollup.objects.all().delete()
+        for center_id, center_days in days.items():
+            for chunk in _chunks(center_days):
+                _refresh_days(apps, center_id, chunk)
+        for center_id, center_months in months.items():
+            for chunk in _chunks(center_months):
+                _refresh_months(apps, center_id, chunk)
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': started})
+        for center_id in set(days) | set(months):
+            invalidate_center(center_id)
+
+    return sum(map(len, days.values())), sum(map(len, months.values()))
+
+
+def last_refreshed(apps=global_apps):
+    """When the rollups were last refreshed, or None if never."""
+    RollupWatermark = apps.get_model('booking', 'RollupWatermark')
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('value', flat=True).first()
+
+
+def _group(pairs):
+    grouped = defaultdict(list)
+    for center_id, key in pairs:
+        grouped[center_id].append(key)
+    return grouped
+
+
+def _chunks(keys):
+    keys = sorted(keys)
+    for i in range(0, len(keys), CHUNK):
+        yield keys[i:i + CHUNK]
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _refresh_days(apps, center_id, days):
+    """Recompute both daily rollups of ``center_id`` for ``days`` (sorted)."""
+    Booking = apps.get_model('booking', 'Booking')
+    DailyCategoryRollup = apps.get_model('booking', 'DailyCategoryRollup')
+    DailyCustomerRollup = apps.get_model('booking', 'DailyCustomerRollup')
+    # The created_at range lets the (service_center, created_at) index do
+    # the work; the day list then drops days in between that didn't change.
+    bookings = (
+        Booking.objects.filter(
+            service_center_id=center_id,
+            created_at__gte=_day_start(days[0]),
+            created_at__lt=_day_start(days[-1] + timedelta(days=1)),
+        )
+        .annotate(day=TruncDate('created_at'))
+        .filter(day__in=days)
+        .order_by()
+    )
+    DailyCategoryRollup.objects.filter(service_center_id=center_id, day__in=days).delete()
+    DailyCustomerRollup.objects.filter(service_center_id=center_id, day__in=days).delete()
+    DailyCategoryRollup.objects.bulk_create([
+        DailyCategoryRollup(service_center_id=center_id, day=row['day'],
+                            service_category_id=row['service_category_id'], bookings=row['n'])
+        for row in bookings.values('day', 'service_category_id').annotate(n=Count('id'))
+    ])
+    DailyCustomerRollup.objects.bulk_create([
+        DailyCustomerRollup(service_center_id=center_id, day=row['day'],
+                            owner_id=row['vehicle__owner_id'], bookings=row['n'])
+        for row in bookings.values('day', 'vehicle__owner_id').annotate(n=Count('id'))
+    ])
+
+
+def _refresh_months(apps, center_id, months):
+    """Recompute the revenue rollup of ``center_id`` for ``months`` (sorted)."""
+    Invoice = apps.get_model('booking', 'Invoice')
+    MonthlyRevenueRollup = apps.get_model('booking', 'MonthlyRevenueRollup')
+    last = months[-1]
+    end = last.replace(year=last.year + 1, month=1) if last.month == 12 else last.replace(month=last.month + 1)
+    paid = (
+        Invoice.objects.filter(
+            booking__service_center_id=center_id,
+            payment_status='paid',
+            created_at__gte=_day_start(months[0]),
+            created_at__lt=_day_start(end),
+        )
+        .annotate(month=TruncMonth('created_at', output_field=models.DateField()))
+        .filter(month__in=months)
+        .values('month')
+        .annotate(revenue=Sum('total'))
+        .order_by()
+    )
+    MonthlyRevenueRollup.objects.filter(service_center_id=center_id, month__in=months).delete()
+    MonthlyRevenueRollup.objects.bulk_create([
+        MonthlyRevenueRollup(service_center_id=center_id, month=row['month'], revenue=row['revenue'])
+        for row in paid
+    ])
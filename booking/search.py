@@ -0,0 +1,131 @@
+"""Booking search for service centers.
+
+On SQLite, bookings are found through the ``booking_search`` FTS5 table
+(created and kept in sync by triggers, see migration 0011): each search
+term is a prefix match against the registration number, the owner's name
+and phone, and the service description, and results are ranked with bm25.
+The center (and optional status) is part of the MATCH expression, so the
+index only ever walks the caller's own bookings. Other databases, and
+expressions FTS5 can't parse, fall back to ``icontains`` filters ordered
+by recency.
+"""
+import logging
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import Q
+
+from .models import Booking
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 25
+
+# bm25 weights for (center, status, registration, owner, description)
+RANK = 'bm25(booking_search, 0, 0, 10, 5, 1)'
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchPage:
+    """One page of ranked results with the same interface as
+    ``pagination.KeysetPage``, so the list templates and pager work as is.
+    """
+    previous_label = 'Previous'
+    next_label = 'Next'
+
+    def __init__(self, items, number, has_next, params):
+        self.items = items
+        self.number = number
+        self.has_next = has_next
+        self.has_previous = number > 1
+        self._params = params
+
+    def _url(self, number):
+        params = self._params.copy()
+        params['page'] = number
+        return f'?{params.urlencode()}'
+
+    @property
+    def next_url(self):
+        return self._url(self.number + 1) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url(self.number - 1) if self.has_previous else None
+
+
+def search_terms(query):
+    return _TERM.findall(query.lower())[:10]
+
+
+def _quote(value):
+    """``value`` as an FTS5 string, which can't change the expression."""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def match_expression(service_center_id, terms, status=None):
+    """FTS5 MATCH expression for ``terms`` within one center's bookings.
+    ``status`` must be one of ``Booking.STATUS_CHOICES``.
+    """
+    expression = f'center:{_quote(f"c{service_center_id}")}'
+    if status:
+        expression += f' AND status:{_quote(status.replace("_", ""))}'
+    prefixes = ' AND '.join(f'{_quote(term)}*' for term in terms)
+    return f'{expression} AND {{registration owner description}} : ({prefixes})'
+
+
+def search_bookings(request, service_center, query, status=None, per_page=PER_PAGE):
+    """Return the ``SearchPage`` of ``service_center``'s bookings matching
+    ``query``, best match first; the page number comes from ``?page=``.
+    An unknown ``status`` is ignored.
+    """
+    if status not in dict(Booking.STATUS_CHOICES):
+        status = None
+    try:
+        number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        number = 1
+    terms = search_terms(query)
+    if not terms:
+        return SearchPage([], 1, False, request.GET)
+
+    offset = (number - 1) * per_page
+    ids = _fts_ids(service_center.id, terms, status, per_page + 1, offset) if connection.vendor == 'sqlite' else None
+    if ids is not None:
+        # Scoped to the center as well, whatever the index returned
+        bookings = Booking.objects.for_list().filter(service_center=service_center).in_bulk(ids[:per_page])
+        items = [bookings[pk] for pk in ids[:per_page] if pk in bookings]
+        return SearchPage(items, number, len(ids) > per_page, request.GET)
+
+    bookings = Booking.objects.for_list().filter(service_center=service_center)
+    if status:
+        bookings = bookings.filter(status=status)
+    for term in terms:
+        bookings = bookings.filter(
+            Q(vehicle__registration_number__icontains=term)
+            | Q(vehicle__owner__username__icontains=term)
+            | Q(vehicle__owner__first_name__icontains=term)
+            | Q(vehicle__owner__last_name__icontains=term)
+            | Q(vehicle__owner__phone__icontains=term)
+            | Q(service_description__icontains=term)
+        )
+    rows = list(bookings.order_by('-created_at', '-pk')[offset:offset + per_page + 1])
+    return SearchPage(rows[:per_page], number, len(rows) > per_page, request.GET)
+
+
+def _fts_ids(service_center_id, terms, status, limit, offset):
+    """Ids of one page of matches, best first, or None if FTS5 can't
+    parse the expression.
+    """
+    sql = f'SELECT rowid FROM booking_search WHERE booking_search MATCH %s ORDER BY {RANK} LIMIT %s OFFSET %s'
+    expression = match_expression(service_center_id, terms, status)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [expression, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+    except OperationalError as exc:
+        if not str(exc).startswith('fts5: syntax error'):
+            raise
+        logger.warning('Booking search fell back to icontains for %r: %s', expression, exc)
+        return None
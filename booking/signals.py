@@ -0,0 +1,59 @@
+"""Invalidate cached data when the models it is computed from change.
+
+Only ``save()``/``delete()`` send these signals; code that changes
+bookings with ``QuerySet.update()`` calls ``invalidate_center`` and
+``invalidate_user`` itself.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_center, invalidate_user
+from .geo import centers_changed
+from .models import Booking, Feedback, Invoice, ServiceCategory, ServiceCenter, Vehicle
+from .reference import reference_changed
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    invalidate_center(instance.service_center_id)
+    if Booking.vehicle.is_cached(instance):
+        invalidate_user(instance.vehicle.owner_id)
+    else:
+        invalidate_user(Vehicle.objects.filter(pk=instance.vehicle_id).values_list('owner_id', flat=True).first())
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Feedback)
+@receiver(post_delete, sender=Feedback)
+def booking_child_changed(sender, instance, **kwargs):
+    center_id, owner_id = Booking.objects.filter(pk=instance.booking_id).values_list(
+        'service_center_id', 'vehicle__owner_id',
+    ).first() or (None, None)
+    invalidate_center(center_id)
+    invalidate_user(owner_id)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def vehicle_changed(sender, instance, **kwargs):
+    invalidate_user(instance.owner_id)
+
+
+@receiver(post_save, sender=ServiceCenter)
+def service_center_saved(sender, instance, **kwargs):
+    centers_changed()
+    reference_changed()
+
+
+@receiver(post_delete, sender=ServiceCenter)
+def service_center_deleted(sender, instance, **kwargs):
+    centers_changed(deleted=True)
+    reference_changed()
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+def service_category_changed(sender, instance, **kwargs):
+    reference_changed()
@@ -0,0 +1,253 @@
+"""Slot capacity for service centers.
+
+A center's day is split into slots of ``slot_minutes`` between
+``opening_time`` and ``closing_time``, and each slot can hold ``bays``
+bookings. Reservations are counted in ``BookingSlot`` rows which are looked
+up through the (service_center, date, start_time) unique index and only
+incremented with a conditional UPDATE, so two concurrent requests can never
+both take the last bay.
+
+Whenever a slot fills up or frees again the matching bit of the center's
+``DayOccupancy`` bitmap is flipped, which is what the earliest-free-slot
+search reads.
+"""
+import heapq
+import itertools
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BookingSlot, DayOccupancy
+from .reference import reference_data
+
+# full_mask is a signed 64-bit column
+MAX_SLOTS_PER_DAY = 63
+
+
+class SlotUnavailable(Exception):
+    """Raised when a booking cannot be placed in the requested slot."""
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _as_time(value):
+    # opening_time/closing_time are plain strings on unsaved instances
+    # that still carry the field defaults.
+    if isinstance(value, str):
+        return datetime.strptime(value, '%H:%M').time()
+    return value
+
+
+def _day_slots(opening, closing, slot_minutes):
+    step = max(slot_minutes, 1)
+    opening, closing = _minutes(_as_time(opening)), _minutes(_as_time(closing))
+    return [time(m // 60, m % 60) for m in range(opening, closing - step + 1, step)]
+
+
+def day_slots(service_center):
+    """Return the start times of every slot in a center's working day."""
+    return _day_slots(service_center.opening_time, service_center.closing_time, service_center.slot_minutes)
+
+
+def slot_index(service_center, start):
+    """Return the bit of ``DayOccupancy.full_mask`` used for a slot."""
+    opening = _minutes(_as_time(service_center.opening_time))
+    return (_minutes(start) - opening) // max(service_center.slot_minutes, 1)
+
+
+def slot_start(service_center, booking_time):
+    """Return the start of the slot containing ``booking_time``.
+
+    Raises SlotUnavailable if the time is outside the center's opening hours
+    or the last slot would run past closing time.
+    """
+    opening = _minutes(_as_time(service_center.opening_time))
+    closing = _minutes(_as_time(service_center.closing_time))
+    step = max(service_center.slot_minutes, 1)
+    minute = _minutes(booking_time)
+    if minute < opening or minute >= closing:
+        raise SlotUnavailable('The selected time is outside the service center opening hours.')
+    start = opening + (minute - opening) // step * step
+    if start + step > closing:
+        raise SlotUnavailable('The selected time is too close to closing time.')
+    return time(start // 60, start % 60)
+
+
+def slot_end(service_center, start):
+    end = datetime.combine(datetime.min, start) + timedelta(minutes=service_center.slot_minutes)
+    return end.time()
+
+
+def reserve_slot(service_center, booking_date, booking_time):
+    """Take one bay in the slot containing ``booking_time`` and return the
+    ``BookingSlot``. Must be called inside the transaction that saves the
+    booking so a failed save gives the bay back.
+    """
+    start = slot_start(service_center, booking_time)
+    capacity = service_center.bays
+    if capacity < 1:
+        raise SlotUnavailable('This service center is not taking bookings.')
+
+    with transaction.atomic():
+        slots = BookingSlot.objects.filter(
+            service_center=service_center, date=booking_date, start_time=start,
+        )
+        # The conditional UPDATE is the reservation: it only matches while a
+        # bay is free, and the row lock it takes orders concurrent bookings.
+        if slots.filter(booked__lt=capacity).update(booked=F('booked') + 1):
+            slot = slots.get()
+        else:
+            slot, created = BookingSlot.objects.get_or_create(
+                service_center=service_center, date=booking_date, start_time=start,
+                defaults={'booked': 1},
+            )
+            # If another request created the row between our UPDATE and
+            # INSERT, try the conditional UPDATE once more against it.
+            if not created:
+                if not BookingSlot.objects.filter(pk=slot.pk, booked__lt=capacity).update(booked=F('booked') + 1):
+                    raise SlotUnavailable('This time slot is fully booked. Please choose another time.')
+                slot.refresh_from_db(fields=['booked'])
+
+        if slot.booked >= capacity:
+            _set_full(service_center, booking_date, start, True)
+    return slot
+
+
+def release_slot(booking):
+    """Give back the bay held by ``booking`` (e.g. when it is cancelled)."""
+    if not booking.slot_id:
+        return
+    service_center = booking.service_center
+    with transaction.atomic():
+        BookingSlot.objects.filter(pk=booking.slot_id, booked__gt=0).update(booked=F('booked') - 1)
+        slot = BookingSlot.objects.only('date', 'start_time', 'booked').get(pk=booking.slot_id)
+        if slot.booked < service_center.bays:
+            _set_full(service_center, slot.date, slot.start_time, False)
+    booking.slot = None
+
+
+def _set_full(service_center, day, start, full):
+    """Set or clear the occupancy bit of one slot."""
+    index = slot_index(service_center, start)
+    if not 0 <= index < MAX_SLOTS_PER_DAY:
+        return
+    bit = 1 << index
+    rows = DayOccupancy.objects.filter(service_center=service_center, date=day)
+    if full:
+        if not rows.update(full_mask=F('full_mask').bitor(bit)):
+            occupancy, created = DayOccupancy.objects.get_or_create(
+                service_center=service_center, date=day, defaults={'full_mask': bit},
+            )
+            if not created:
+                rows.update(full_mask=F('full_mask').bitor(bit))
+    else:
+        rows.update(full_mask=F('full_mask').bitand(~bit))
+
+
+def rebuild_occupancy(service_center, since=None, apps=global_apps):
+    """Recompute a center's occupancy bitmaps from its ``BookingSlot`` rows.
+
+    Needed after the center changes its hours, slot length or bays, since
+    those change which bit a slot maps to and when it counts as full.
+    """
+    BookingSlot = apps.get_model('booking', 'BookingSlot')
+    DayOccupancy = apps.get_model('booking', 'DayOccupancy')
+    since = since or timezone.localdate()
+    masks = {}
+    slots = BookingSlot.objects.filter(
+        service_center=service_center, date__gte=since, booked__gte=max(service_center.bays, 1),
+    ).values_list('date', 'start_time')
+    for day, start in slots:
+        index = slot_index(service_center, start)
+        if 0 <= index < MAX_SLOTS_PER_DAY:
+            masks[day] = masks.get(day, 0) | (1 << index)
+
+    with transaction.atomic():
+        DayOccupancy.objects.filter(service_center=service_center, date__gte=since).delete()
+        DayOccupancy.objects.bulk_create([
+            DayOccupancy(service_center=service_center, date=day, full_mask=mask)
+            for day, mask in masks.items()
+        ])
+
+
+def backfill_slots(apps=global_apps, since=None):
+    """Count upcoming bookings that hold no slot (made before slots were
+    counted) in their slots, and rebuild the occupancy bitmaps of their
+    centers. Bookings at a time outside the center's hours keep no slot.
+    Returns how many bookings got one.
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    BookingSlot = apps.get_model('booking', 'BookingSlot')
+    ServiceCenter = apps.get_model('booking', 'ServiceCenter')
+    since = since or timezone.localdate()
+    bookings = Booking.objects.filter(slot__isnull=True, booking_date__gte=since).exclude(status='cancelled')
+    rows = list(bookings.values_list('id', 'service_center_id', 'booking_date', 'booking_time'))
+    centers = ServiceCenter.objects.in_bulk({center_id for _, center_id, _, _ in rows})
+
+    slots = defaultdict(list)
+    for booking_id, center_id, day, at in rows:
+        try:
+            slots[center_id, day, slot_start(centers[center_id], at)].append(booking_id)
+        except SlotUnavailable:
+            pass
+
+    with transaction.atomic():
+        for (center_id, day, start), booking_ids in slots.items():
+            slot, _ = BookingSlot.objects.get_or_create(service_center_id=center_id, date=day, start_time=start)
+            BookingSlot.objects.filter(pk=slot.pk).update(booked=F('booked') + len(booking_ids))
+            Booking.objects.filter(id__in=booking_ids).update(slot=slot)
+        for center in centers.values():
+            rebuild_occupancy(center, since, apps)
+    return sum(len(booking_ids) for booking_ids in slots.values())
+
+
+def earliest_free_slots(start_date, end_date, limit=10):
+    """Return up to ``limit`` free slots across all active service centers,
+    earliest first, as ``(date, start_time, center_id, center_name)`` tuples.
+
+    Centers sharing the same hours and slot length are grouped (in the
+    cached reference data) so each day only walks slot times until
+    ``limit`` candidates are found, and the only query is for the occupancy
+    bitmaps of each date.
+    """
+    reference = reference_data()
+    schedules = [
+        (_day_slots(opening, closing, slot_minutes)[:MAX_SLOTS_PER_DAY], ids)
+        for (opening, closing, slot_minutes), ids in reference.schedules.items()
+    ]
+
+    now = timezone.localtime()
+    results = []
+    day = max(start_date, now.date())
+    while day <= end_date and len(results) < limit:
+        masks = dict(
+            DayOccupancy.objects.filter(date=day).exclude(full_mask=0).values_list('service_center_id', 'full_mask')
+        )
+        wanted = limit - len(results)
+        per_group = []
+        for times, ids in schedules:
+            found = []
+            for index, start in enumerate(times):
+                if day == now.date() and start <= now.time():
+                    continue
+                bit = 1 << index
+                for center_id in ids:
+                    if not masks.get(center_id, 0) & bit:
+                        found.append((start, center_id))
+                        if len(found) == wanted:
+                            break
+                if len(found) == wanted:
+                    break
+            per_group.append(found)
+        results.extend((day, start, center_id) for start, center_id in itertools.islice(heapq.merge(*per_group), wanted))
+        day += timedelta(days=1)
+
+    return [
+        (day, start, center_id, reference.centers_by_id[center_id].name) for day, start, center_id in results
+    ]
@@ -0,0 +1,221 @@
+"""Incrementally maintained booking counters.
+
+``ServiceCenterStats`` and ``OwnerStats`` hold booking totals by status and
+the paid invoice revenue of a service center / vehicle owner, and
+``ServiceCenterDayStats`` the number of bookings per booking date. They are
+adjusted with F() updates in the same transaction as the write that changes
+them (booking created, status changed, invoice paid or cancelled), so the
+dashboards read single rows instead of counting bookings and summing
+invoices on every page view.
+
+``rebuild_stats`` recomputes everything from the bookings and invoices; the
+``rebuild_booking_stats`` management command uses it to repair or verify
+the counters.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+
+from .models import Invoice, OwnerStats, ServiceCenterDayStats, ServiceCenterStats
+
+STATUSES = ('pending', 'accepted', 'in_progress', 'completed', 'ready_for_delivery', 'cancelled')
+COUNTER_FIELDS = ('total',) + STATUSES + ('paid_revenue',)
+
+
+def _bump(model, key, deltas):
+    """Add ``deltas`` to the counters of the row of ``model`` matching
+    ``key``, creating the row first if it doesn't exist yet.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Counts never go below zero, even if they drifted (see verify_stats).
+    changes = {
+        name: Greatest(F(name) + delta, 0) if delta < 0 and name != 'paid_revenue' else F(name) + delta
+        for name, delta in deltas.items()
+    }
+    if model.objects.filter(**key).update(**changes):
+        return
+    with transaction.atomic():
+        model.objects.get_or_create(**key)
+    model.objects.filter(**key).update(**changes)
+
+
+def _bump_both(center_id, owner_id, deltas):
+    _bump(ServiceCenterStats, {'service_center_id': center_id}, deltas)
+    _bump(OwnerStats, {'owner_id': owner_id}, deltas)
+
+
+def record_booking_created(booking):
+    """Count a newly created booking."""
+    with transaction.atomic():
+        _bump_both(booking.service_center_id, booking.vehicle.owner_id, {'total': 1, booking.status: 1})
+        _bump(ServiceCenterDayStats, {'service_center_id': booking.service_center_id, 'date': booking.booking_date},
+              {'bookings': 1})
+
+
+def record_booking_deleted(booking):
+    """Uncount a booking, and its invoice if paid, before it is deleted."""
+    paid = Invoice.objects.filter(booking=booking, payment_status='paid').values_list('total', flat=True).first()
+    with transaction.atomic():
+        _bump_both(booking.service_center_id, booking.vehicle.owner_id,
+                   {'total': -1, booking.status: -1, 'paid_revenue': -(paid or 0)})
+        _bump(ServiceCenterDayStats, {'service_center_id': booking.service_center_id, 'date': booking.booking_date},
+              {'bookings': -1})
+
+
+def record_status_change(booking, old_status, new_status):
+    """Move a booking from the ``old_status`` to the ``new_status`` counter."""
+    if old_status == new_status:
+        return
+    with transaction.atomic():
+        _bump_both(booking.service_center_id, booking.vehicle.owner_id, {old_status: -1, new_status: 1})
+
+
+def record_bulk_status_change(changes):
+    """Apply many ``(center_id, owner_id, old_status, new_status)`` changes
+    with one UPDATE per affected center and owner.
+    """
+    centers = defaultdict(lambda: defaultdict(int))
+    owners = defaultdict(lambda: defaultdict(int))
+    for center_id, owner_id, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        for deltas in (centers[center_id], owners[owner_id]):
+            deltas[old_status] -= 1
+            deltas[new_status] += 1
+
+    with transaction.atomic():
+        for center_id, deltas in centers.items():
+            _bump(ServiceCenterStats, {'service_center_id': center_id}, deltas)
+        for owner_id, deltas in owners.items():
+            _bump(OwnerStats, {'owner_id': owner_id}, deltas)
+
+
+def record_payment_change(invoice, old_status, new_status):
+    """Add or remove an invoice's total from the paid revenue when its
+    payment status moves to or away from ``paid``.
+    """
+    paid_delta = (new_status == 'paid') - (old_status == 'paid')
+    if not paid_delta:
+        return
+    booking = invoice.booking
+    with transaction.atomic():
+        _bump_both(booking.service_center_id, booking.vehicle.owner_id, {'paid_revenue': invoice.total * paid_delta})
+
+
+def compute_stats(apps=global_apps):
+    """Return ``(centers, owners, days)`` counters computed from scratch:
+    ``{center_id: {field: value}}``, ``{owner_id: {field: value}}`` and
+    ``{(center_id, date): bookings}``.
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    Invoice = apps.get_model('booking', 'Invoice')
+
+    def empty():
+        counters = dict.fromkeys(COUNTER_FIELDS, 0)
+        counters['paid_revenue'] = Decimal('0')
+        return counters
+
+    centers = defaultdict(empty)
+    owners = defaultdict(empty)
+    rows = (
+        Booking.objects.values('service_center_id', 'vehicle__owner_id', 'status')
+        .annotate(n=Count('id')).order_by()
+    )
+    for row in rows:
+        for counters in (centers[row['service_center_id']], owners[row['vehicle__owner_id']]):
+            counters['total'] += row['n']
+            counters[row['status']] += row['n']
+
+    revenue = (
+        Invoice.objects.filter(payment_status='paid')
+        .values('booking__service_center_id', 'booking__vehicle__owner_id')
+        .annotate(amount=Sum('total')).order_by()
+    )
+    for row in revenue:
+        centers[row['booking__service_center_id']]['paid_revenue'] += row['amount']
+        owners[row['booking__vehicle__owner_id']]['paid_revenue'] += row['amount']
+
+    days = {
+        (row['service_center_id'], row['booking_date']): row['n']
+        for row in Booking.objects.values('service_center_id', 'booking_date').annotate(n=Count('id')).order_by()
+    }
+    return dict(centers), dict(owners), days
+
+
+def rebuild_stats(apps=global_apps):
+    """Replace all counters with freshly computed ones."""
+    ServiceCenterStats = apps.get_model('booking', 'ServiceCenterStats')
+    OwnerStats = apps.get_model('booking', 'OwnerStats')
+    ServiceCenterDayStats = apps.get_model('booking', 'ServiceCenterDayStats')
+    centers, owners, days = compute_stats(apps)
+
+    with transaction.atomic():
+        ServiceCenterStats.objects.all().delete()
+        OwnerStats.objects.all().delete()
+        ServiceCenterDayStats.objects.all().delete()
+        ServiceCenterStats.objects.bulk_create(
+            [ServiceCenterStats(service_center_id=pk, **counters) for pk, counters in centers.items()],
+            batch_size=1000,
+        )
+        OwnerStats.objects.bulk_create(
+            [OwnerStats(owner_id=pk, **counters) for pk, counters in owners.items()],
+            batch_size=1000,
+        )
+        ServiceCenterDayStats.objects.bulk_create(
+            [ServiceCenterDayStats(service_center_id=pk, date=day, bookings=n) for (pk, day), n in days.items()],
+            batch_size=1000,
+        )
+
+
+def verify_stats(apps=global_apps):
+    """Return a list of human readable mismatches between the stored and
+    freshly computed counters (empty when they agree).
+    """
+    ServiceCenterStats = apps.get_model('booking', 'ServiceCenterStats')
+    OwnerStats = apps.get_model('booking', 'OwnerStats')
+    ServiceCenterDayStats = apps.get_model('booking', 'ServiceCenterDayStats')
+    centers, owners, days = compute_stats(apps)
+
+    problems = []
+    for label, model, key, expected in (
+        ('center', ServiceCenterStats, 'service_center_id', centers),
+        ('owner', OwnerStats, 'owner_id', owners),
+    ):
+        stored = {row[key]: row for row in model.objects.values(key, *COUNTER_FIELDS)}
+        for pk in sorted(set(stored) | set(expected)):
+            have = stored.get(pk, {})
+            want = expected.get(pk, {})
+            for field in COUNTER_FIELDS:
+                if have.get(field, 0) != want.get(field, 0):
+                    problems.append(f'{label} {pk} {field}: stored {have.get(field, 0)}, actual {want.get(field, 0)}')
+
+    stored_days = {
+        (row['service_center_id'], row['date']): row['bookings']
+        for row in ServiceCenterDayStats.objects.values('service_center_id', 'date', 'bookings')
+    }
+    for key in sorted(set(stored_days) | set(days)):
+        if stored_days.get(key, 0) != days.get(key, 0):
+            problems.append(
+                f'center {key[0]} bookings on {key[1]}: stored {stored_days.get(key, 0)}, actual {days.get(key, 0)}'
+            )
+    return problems
+
+
+def center_stats(service_center):
+    return ServiceCenterStats.objects.filter(service_center=service_center).first() or ServiceCenterStats()
+
+
+def center_day_bookings(service_center, day):
+    """Number of bookings of ``service_center`` on ``day``."""
+    day_stats = ServiceCenterDayStats.objects.filter(service_center=service_center, date=day).first()
+    return day_stats.bookings if day_stats else 0
+
+
+def owner_counters(owner):
+    return OwnerStats.objects.filter(owner=owner).first() or OwnerStats()
@@ -0,0 +1,75 @@
+"""Invoice creation: one invoice per booking, numbered without gaps."""
+from datetime import date, time
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from booking.invoices import (
+    create_invoices, get_or_create_invoice, invoice_completed_bookings, invoice_number,
+)
+from booking.models import Booking, Invoice, InvoiceSequence, ServiceCategory, ServiceCenter, User, Vehicle
+
+
+class InvoiceNumberingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', role='owner')
+        center = ServiceCenter.objects.create(
+            user=User.objects.create_user('center', role='service_center'),
+            name='Center', address='-', phone='-', email='c@example.com',
+        )
+        category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+        vehicle = Vehicle.objects.create(owner=owner, vehicle_type='car', brand='B', model='M', year=2020,
+                                         registration_number='INV-1')
+        cls.bookings = Booking.objects.bulk_create([
+            Booking(vehicle=vehicle, service_center=center, service_category=category, booking_date=date.today(),
+                    booking_time=time(10), service_description='-', status='completed',
+                    estimated_cost=Decimal('100.00') + i, completed_at=timezone.now())
+            for i in range(12)
+        ])
+        cls.year = timezone.localdate().year
+
+    def assertNumbersWithoutGaps(self):
+        numbers = sorted(Invoice.objects.values_list('invoice_number', flat=True))
+        self.assertEqual(numbers, [invoice_number(self.year, n) for n in range(1, len(numbers) + 1)])
+        self.assertEqual(InvoiceSequence.objects.get(year=self.year).last, len(numbers))
+
+    def test_get_or_create_invoice_creates_one_invoice(self):
+        booking = self.bookings[0]
+        invoice, created = get_or_create_invoice(booking)
+        self.assertTrue(created)
+        self.assertEqual(invoice.invoice_number, invoice_number(self.year, 1))
+        self.assertEqual((invoice.subtotal, invoice.tax, invoice.total),
+                         (Decimal('100.00'), Decimal('18.00'), Decimal('118.00')))
+        self.assertEqual(get_or_create_invoice(booking), (invoice, False))
+
+    def test_concurrent_creation_returns_the_existing_invoice(self):
+        invoice, _ = get_or_create_invoice(Booking.objects.get(pk=self.bookings[0].pk))
+        # Read (with no invoice yet) before another request created it
+        stale = Booking.objects.get(pk=self.bookings[0].pk)
+        Booking.invoice.related.set_cached_value(stale, None)
+        found, created = get_or_create_invoice(stale)
+        self.assertEqual((found.pk, created), (invoice.pk, False))
+        self.assertNumbersWithoutGaps()
+
+    def test_rolled_back_numbers_are_reused(self):
+        try:
+            with transaction.atomic():
+                get_or_create_invoice(self.bookings[0])
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        invoice, _ = get_or_create_invoice(Booking.objects.get(pk=self.bookings[1].pk))
+        self.assertEqual(invoice.invoice_number, invoice_number(self.year, 1))
+
+    def test_batches_skip_invoiced_bookings_and_continue_the_sequence(self):
+        get_or_create_invoice(self.bookings[3])
+        created = create_invoices({booking.id: booking.estimated_cost for booking in self.bookings[:5]})
+        self.assertEqual([invoice.booking_id for invoice in created],
+                         [booking.id for booking in self.bookings[:5] if booking != self.bookings[3]])
+        self.assertEqual(invoice_completed_bookings(batch_size=3), 7)
+        self.assertEqual(invoice_completed_bookings(batch_size=3), 0)
+        self.assertEqual(Invoice.objects.count(), len(self.bookings))
+        self.assertNumbersWithoutGaps()
@@ -0,0 +1,73 @@
+"""Keyset pagination: cursors walk every row exactly once in both directions."""
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from booking.models import User
+from booking.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now().replace(microsecond=0)
+        # Pairs of users share a timestamp so pages have to break ties on id
+        User.objects.bulk_create([
+            User(username=f'user{i:02}', role='owner' if i % 3 else 'mechanic',
+                 date_joined=now - timedelta(minutes=i // 2))
+            for i in range(23)
+        ])
+        cls.expected = list(User.objects.order_by('-date_joined', '-pk').values_list('pk', flat=True))
+
+    def page(self, url='', queryset=None, per_page=5):
+        request = RequestFactory().get(f'/users/{url}')
+        return keyset_paginate(request, queryset or User.objects.all(), field='date_joined', per_page=per_page)
+
+    def walk_forward(self, url='', **kwargs):
+        pages = [self.page(url, **kwargs)]
+        while pages[-1].next_url:
+            pages.append(self.page(pages[-1].next_url, **kwargs))
+        return pages
+
+    def test_next_links_cover_every_row_once(self):
+        pages = self.walk_forward()
+        self.assertEqual([len(page.items) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual([user.pk for page in pages for user in page.items], self.expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertIsNone(pages[-1].next_url)
+
+    def test_previous_links_return_the_same_pages(self):
+        pages = self.walk_forward()
+        page = pages[-1]
+        for earlier in reversed(pages[:-1]):
+            page = self.page(page.previous_url)
+            self.assertEqual([user.pk for user in page.items], [user.pk for user in earlier.items])
+            self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+    def test_rows_added_meanwhile_do_not_shift_pages(self):
+        first = self.page()
+        User.objects.create(username='newcomer', role='owner')
+        second = self.page(first.next_url)
+        self.assertEqual([user.pk for user in second.items], self.expected[5:10])
+
+    def test_filters_are_kept_in_links(self):
+        owners = User.objects.filter(role='owner')
+        pages = self.walk_forward('?role=owner', queryset=owners)
+        self.assertEqual(parse_qs(urlparse(pages[0].next_url).query)['role'], ['owner'])
+        self.assertEqual([user.pk for page in pages for user in page.items],
+                         list(owners.order_by('-date_joined', '-pk').values_list('pk', flat=True)))
+
+    def test_cursor_round_trip(self):
+        value = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(value, 42)), (value, 42))
+
+    def test_tampered_cursor_starts_from_the_first_page(self):
+        for cursor in ('not-a-cursor', encode_cursor(timezone.now(), 1)[:-3], 'W10'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                page = self.page(f'?after={cursor}')
+                self.assertEqual([user.pk for user in page.items], self.expected[:5])
+                self.assertFalse(page.has_previous)
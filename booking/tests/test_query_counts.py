@@ -0,0 +1,140 @@
+"""Every list view runs a constant number of queries.
+
+Each view is rendered once with a few rows and again after many more rows
+were added; the query counts must match, otherwise a template is doing a
+query per row (N+1). No view may look up the user's service center or
+mechanic profile on its own either: it comes with ``request.user`` (see
+booking/auth.py).
+"""
+import re
+from datetime import date, time, timedelta
+from decimal import Decimal
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, resolve, reverse
+
+from booking.models import (
+    Booking, Inventory, Invoice, Mechanic, ServiceCategory, ServiceCenter, User, Vehicle,
+)
+
+# role -> (url name, query string) rendered as that role
+VIEWS = {
+    'owner': [('dashboard', ''), ('my_bookings', ''), ('my_vehicles', ''), ('book_service', '')],
+    'service_center': [
+        ('dashboard', ''), ('manage_bookings', ''), ('manage_bookings', 'status=accepted'),
+        ('manage_mechanics', ''), ('manage_inventory', ''), ('analytics', ''),
+    ],
+    'mechanic': [('dashboard', ''), ('mechanic_tasks', ''), ('request_mechanic_profile', '')],
+    'admin': [
+        ('dashboard', ''), ('admin_manage_users', ''), ('admin_manage_users', 'role=owner'),
+        ('admin_manage_centers', ''), ('admin_manage_categories', ''),
+    ],
+    None: [('home', '')],
+}
+
+# A query for the current user's role profile by itself
+PROFILE_LOOKUP = re.compile(r'FROM "booking_(servicecenter|mechanic)" .*WHERE "booking_\1"."user_id" = ')
+
+
+def _view(name):
+    for pattern in get_resolver().url_patterns:
+        for sub in getattr(pattern, 'url_patterns', [pattern]):
+            if getattr(sub, 'name', None) == name:
+                return sub.callback
+    raise LookupError(name)
+
+
+# Run every query on the connection being counted (see booking/parallel.py)
+@override_settings(DB_QUERY_THREADS=0)
+class ListViewQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            role: User.objects.create_user(f'qc_{role}', role=role)
+            for role in ('owner', 'service_center', 'mechanic', 'admin')
+        }
+        cls.center = ServiceCenter.objects.create(
+            user=cls.users['service_center'], name='QC Center', address='-', phone='-', email='c@example.com',
+        )
+        cls.mechanic = Mechanic.objects.create(user=cls.users['mechanic'], service_center=cls.center)
+        cls.category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+
+    def setUp(self):
+        self.seq = count()
+
+    def add_rows(self, n):
+        """Add ``n`` rows to everything the views list."""
+        # Run the cache invalidations as a commit would
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(n):
+                i = next(self.seq)
+                vehicle = Vehicle.objects.create(
+                    owner=self.users['owner'], vehicle_type='car', brand='Brand', model='Model', year=2020,
+                    registration_number=f'QC-{i}',
+                )
+                booking = Booking.objects.create(
+                    vehicle=vehicle, service_center=self.center, service_category=self.category,
+                    mechanic=self.mechanic, booking_date=date.today() + timedelta(days=i % 5), booking_time=time(10),
+                    service_description='query count', status='accepted', estimated_cost=Decimal('100.00'),
+                )
+                Invoice.objects.create(
+                    booking=booking, invoice_number=f'QC-INV-{i}', subtotal=Decimal('100.00'),
+                    tax=Decimal('18.00'), total=Decimal('118.00'), payment_status='paid' if i % 2 else 'pending',
+                )
+                Inventory.objects.create(service_center=self.center, item_name=f'Part {i}', quantity=i % 20)
+                Mechanic.objects.create(
+                    user=User.objects.create_user(f'qc_mech_{i}', role='mechanic'), service_center=self.center,
+                )
+                ServiceCenter.objects.create(
+                    user=User.objects.create_user(f'qc_center_{i}', role='service_center'),
+                    name=f'Center {i}', address='-', phone='-', email='c@example.com',
+                )
+                ServiceCategory.objects.create(name=f'Category {i}')
+
+    def get(self, role, name, query):
+        path = reverse(name)
+        if resolve(path).url_name == name:
+            self.client.logout()
+            if role:
+                self.client.force_login(self.users[role])
+            return self.client.get(f'{path}?{query}')
+        # The /admin/... pages of the booking app are shadowed by the Django
+        # admin include, so call those views directly.
+        request = RequestFactory().get(path, QUERY_STRING=query)
+        request.user = self.users[role]
+        return _view(name)(request)
+
+    def query_counts(self):
+        """``{(role, name, query): (queries, profile lookups)}``, each page
+        rendered with nothing cached."""
+        counts = {}
+        for role, views in VIEWS.items():
+            for name, query in views:
+                cache.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.get(role, name, query)
+                self.assertEqual(response.status_code, 200, (role, name, query))
+                counts[role, name, query] = (
+                    len(ctx.captured_queries),
+                    sum(bool(PROFILE_LOOKUP.search(q['sql'])) for q in ctx.captured_queries),
+                )
+        return counts
+
+    def test_list_views_run_a_constant_number_of_queries(self):
+        self.add_rows(2)
+        small = self.query_counts()
+        self.add_rows(25)
+        large = self.query_counts()
+        for key, (queries, _) in small.items():
+            with self.subTest(role=key[0], view=key[1], query=key[2]):
+                self.assertEqual(large[key][0], queries)
+
+    def test_views_do_not_look_up_the_role_profile(self):
+        self.add_rows(2)
+        for key, (_, profile_lookups) in self.query_counts().items():
+            with self.subTest(role=key[0], view=key[1], query=key[2]):
+                self.assertEqual(profile_lookups, 0)
@@ -0,0 +1,110 @@
+"""Booking status changes: the transition table and optimistic locking."""
+from datetime import date, time
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from booking.models import (
+    Booking, InvalidTransition, ServiceCategory, ServiceCenter, StaleBooking, User, Vehicle,
+)
+from booking.stats import center_stats
+
+
+@override_settings(DB_QUERY_THREADS=0)
+class ApplyChangesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', role='owner')
+        cls.center = ServiceCenter.objects.create(
+            user=User.objects.create_user('center', role='service_center'),
+            name='Center', address='-', phone='-', email='c@example.com',
+        )
+        cls.category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+        cls.vehicle = Vehicle.objects.create(owner=owner, vehicle_type='car', brand='B', model='M', year=2020,
+                                             registration_number='SM-1')
+
+    def make_booking(self, status='pending'):
+        return Booking.objects.create(
+            vehicle=self.vehicle, service_center=self.center, service_category=self.category,
+            booking_date=date.today(), booking_time=time(10), service_description='-', status=status,
+        )
+
+    def test_transition_table_covers_every_status(self):
+        statuses = {value for value, _ in Booking.STATUS_CHOICES}
+        self.assertEqual(set(Booking.TRANSITIONS), statuses)
+        for allowed in Booking.TRANSITIONS.values():
+            self.assertLessEqual(set(allowed), statuses)
+
+    def test_can_transition(self):
+        booking = Booking(status='pending')
+        self.assertTrue(booking.can_transition('accepted'))
+        self.assertTrue(booking.can_transition('cancelled'))
+        self.assertFalse(booking.can_transition('completed'))
+        self.assertFalse(Booking(status='cancelled').can_transition('pending'))
+
+    def test_allowed_change_bumps_version(self):
+        booking = self.make_booking()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(booking.apply_changes(status='accepted'))
+        self.assertEqual((booking.status, booking.version), ('accepted', 1))
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ('accepted', 1))
+
+    def test_completion_sets_completed_at(self):
+        booking = self.make_booking('in_progress')
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.apply_changes(status='completed')
+        booking.refresh_from_db()
+        self.assertIsNotNone(booking.completed_at)
+
+    def test_disallowed_change_raises(self):
+        booking = self.make_booking()
+        with self.assertRaises(InvalidTransition):
+            booking.apply_changes(status='completed')
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ('pending', 0))
+
+    def test_no_change_writes_nothing(self):
+        booking = self.make_booking()
+        with self.assertNumQueries(0):
+            self.assertFalse(booking.apply_changes(status='pending'))
+
+    def test_field_change_is_one_update(self):
+        booking = self.make_booking()
+        booking.vehicle  # load the owner id used for invalidation up front
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            booking.apply_changes(actual_cost=Decimal('80.00'))
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+        booking.refresh_from_db()
+        self.assertEqual((booking.actual_cost, booking.version), (Decimal('80.00'), 1))
+
+    def test_expected_version_mismatch_raises(self):
+        booking = self.make_booking()
+        with self.assertRaises(StaleBooking):
+            booking.apply_changes(status='accepted', expected_version=3)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+
+    def test_concurrent_change_raises(self):
+        booking = self.make_booking()
+        other = Booking.objects.get(pk=booking.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.apply_changes(status='cancelled')
+        with self.assertRaises(StaleBooking):
+            booking.apply_changes(status='accepted')
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ('cancelled', 1))
+
+    def test_losing_writer_leaves_counters_alone(self):
+        booking = self.make_booking()
+        other = Booking.objects.get(pk=booking.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.apply_changes(status='accepted')
+        with self.assertRaises(StaleBooking):
+            booking.apply_changes(status='cancelled')
+        stats = center_stats(self.center)
+        self.assertEqual((stats.accepted, stats.cancelled), (1, 0))
@@ -17,6 +17,8 @@ urlpatterns = [
     path('vehicles/add/', views.add_vehicle, name='add_vehicle'),
     path('vehicles/', views.my_vehicles, name='my_vehicles'),
     path('book-service/', views.book_service, name='book_service'),
+    path('book-service/availability/', views.availability_search, name='availability_search'),
+    path('centers/nearest/', views.nearest_centers, name='nearest_centers'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
     path('booking/<int:booking_id>/', views.booking_detail, name='booking_detail'),
     path('booking/<int:booking_id>/feedback/', views.add_feedback, name='add_feedback'),
@@ -27,10 +29,15 @@ urlpatterns = [
     path('service-center/profile/', views.service_center_profile, name='service_center_profile'),
     path('service-center/bookings/', views.manage_bookings, name='manage_bookings'),
     path('service-center/booking/<int:booking_id>/update/', views.update_booking_status, name='update_booking_status'),
+    path('service-center/bookings/bulk-update/', views.bulk_update_booking_status, name='bulk_update_booking_status'),
+    path('service-center/bookings/auto-assign/', views.auto_assign_mechanics, name='auto_assign_mechanics'),
     path('service-center/mechanics/', views.manage_mechanics, name='manage_mechanics'),
     path('service-center/mechanics/add/', views.add_mechanic, name='add_mechanic'),
     path('service-center/inventory/', views.manage_inventory, name='manage_inventory'),
     path('service-center/analytics/', views.analytics, name='analytics'),
+    path('export/<str:name>/', views.export_data, name='export_data'),
+    path('import/<str:name>/', views.import_data, name='import_data'),
+    path('events/', views.booking_events, name='booking_events'),
     
     # Mechanic URLs
     path('mechanic/tasks/', views.mechanic_tasks, name='mechanic_tasks'),
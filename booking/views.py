@@ -4,23 +4,43 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.utils.functional import SimpleLazyObject
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta
 import json
-from django.db.models.functions import TruncMonth
 from decimal import Decimal
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
 
 from .models import (
     User, Vehicle, ServiceCenter, Mechanic, Booking,
-    ServiceCategory, Invoice, Inventory, Feedback
+    ServiceCategory, Invoice, Inventory, Feedback,
+    DailyCategoryRollup, DailyCustomerRollup, MonthlyRevenueRollup,
+    InvalidTransition, StaleBooking
 )
 from .forms import (
     UserRegistrationForm, VehicleForm, BookingForm,
-    FeedbackForm, InventoryForm, CustomPasswordChangeForm
+    FeedbackForm, InventoryForm, ImportFileForm, CustomPasswordChangeForm
 )
+from .slots import SlotUnavailable, reserve_slot, release_slot, rebuild_occupancy, earliest_free_slots
+from .assignment import OPEN_STATUSES, update_workload, pick_mechanic, candidate_mechanics, assign_backlog
+from .bulk import BULK_TRANSITIONS, bulk_transition
+from .invoices import INVOICE_STATUSES, get_or_create_invoice, notify_invoices_created
+from .pagination import keyset_paginate
+from .search import search_bookings
+from .geo import nearest_open_centers
+from .reference import reference_data
+from .rollups import RANKING_DAYS, last_refreshed
+from .imports import InvalidImportFile, InventoryImporter, VehicleImporter, open_upload
+from .exports import EXPORTS, FORMATS, aexport_stream, export_filename, export_stream
+from .events import stream_response
+from .conditional import conditional_page, booking_page_state, my_bookings_state, mechanic_tasks_state
+from .cache import cached_context, cache_stats, fragment_cached, fragment_version
+from .stats import record_booking_created, record_payment_change, center_stats, center_day_bookings, owner_counters
+from .parallel import gather_queries, run_queries
+from .auth import async_login_required
 
 
 @login_required
@@ -32,33 +52,19 @@ def pay_invoice(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id)
 
     # Only the vehicle owner may pay
-    if booking.vehicle.owner != request.user:
+    if booking.vehicle.owner_id != request.user.id:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
 
-    try:
-        invoice = booking.invoice
-    except Invoice.DoesNotExist:
-        # Create invoice if missing
-        invoice_number = f"INV-{booking.id}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        # Ensure Decimal arithmetic (booking fields are DecimalFields)
-        subtotal = booking.actual_cost or booking.estimated_cost
-        subtotal = Decimal(subtotal)
-        tax = (subtotal * Decimal('0.18')).quantize(Decimal('0.01'))
-        total = (subtotal + tax).quantize(Decimal('0.01'))
-        invoice = Invoice.objects.create(
-            booking=booking,
-            invoice_number=invoice_number,
-            subtotal=subtotal,
-            tax=tax,
-            total=total,
-            payment_status='pending'
-        )
+    invoice, _ = get_or_create_invoice(booking)
 
     # Simulate payment success
-    invoice.payment_status = 'paid'
-    invoice.paid_at = timezone.now()
-    invoice.save()
+    with transaction.atomic():
+        old_payment_status = invoice.payment_status
+        invoice.payment_status = 'paid'
+        invoice.paid_at = timezone.now()
+        invoice.save()
+        record_payment_change(invoice, old_payment_status, 'paid')
 
     messages.success(request, 'Payment received. Thank you!')
     return redirect('view_invoice', booking_id=booking.id)
@@ -75,8 +81,8 @@ def request_mechanic_profile(request):
         sc = None
         if sc_id:
             try:
-                sc = ServiceCenter.objects.get(id=int(sc_id))
-            except (ValueError, ServiceCenter.DoesNotExist):
+                sc = reference_data().centers_by_id.get(int(sc_id))
+            except ValueError:
                 sc = None
 
         # Create a MechanicRequest record
@@ -86,13 +92,13 @@ def request_mechanic_profile(request):
         return redirect('dashboard')
 
     # GET: show a small form listing available service centers
-    service_centers = ServiceCenter.objects.all().order_by('name')
+    service_centers = reference_data().centers
     return render(request, 'booking/mechanic/request_profile.html', {'service_centers': service_centers})
 
 
 def home(request):
     """Home page"""
-    service_centers = ServiceCenter.objects.filter(is_active=True)[:6]
+    service_centers = reference_data().active_centers[:6]
     return render(request, 'booking/home.html', {'service_centers': service_centers})
 
 
@@ -128,96 +134,116 @@ def user_login(request):
     return render(request, 'booking/login.html')
 
 
-@login_required
-def dashboard(request):
-    """Dashboard based on user role"""
+async def _fragment_context(fragment_name, vary_on, queries):
+    """Context for a template that only uses ``queries`` inside the cached
+    fragment ``fragment_name``: none of them runs on a cache hit, and all
+    of them at once on a miss.
+    """
+    if await sync_to_async(fragment_cached)(fragment_name, vary_on):
+        return {name: SimpleLazyObject(query) for name, query in queries.items()}
+    return await gather_queries(queries)
+
+
+@async_login_required
+async def dashboard(request):
+    """Dashboard based on user role. Each role's independent queries run
+    at the same time (see booking/parallel.py)."""
     user = request.user
     
     if user.role == 'owner':
-        vehicles = Vehicle.objects.filter(owner=user)
-        bookings = Booking.objects.filter(vehicle__owner=user).order_by('-created_at')[:10]
-        # Owner invoices: all invoices for bookings belonging to this owner's vehicles
-        invoices = Invoice.objects.filter(booking__vehicle__owner=user).order_by('-created_at')
+        version = await sync_to_async(fragment_version)(user_id=user.id)
         context = {
-            'vehicles': vehicles,
-            'bookings': bookings,
-            'invoices': invoices,
-            'total_bookings': Booking.objects.filter(vehicle__owner=user).count(),
-            'pending_bookings': Booking.objects.filter(vehicle__owner=user, status='pending').count(),
-            'completed_bookings': Booking.objects.filter(vehicle__owner=user, status='completed').count(),
+            'fragment_version': version,
+            **await _fragment_context('owner_dashboard', [user.pk, version], {
+                'vehicles': lambda: list(Vehicle.objects.filter(owner=user)),
+                'bookings': lambda: list(
+                    Booking.objects.for_list().filter(vehicle__owner=user).order_by('-created_at')[:10]
+                ),
+                # Owner invoices: all invoices for bookings belonging to this owner's vehicles
+                'invoices': lambda: list(
+                    Invoice.objects.for_list().filter(booking__vehicle__owner=user).order_by('-created_at')
+                ),
+                'stats': lambda: owner_counters(user),
+            }),
         }
-        return render(request, 'booking/owner/dashboard.html', context)
+        return await sync_to_async(render)(request, 'booking/owner/dashboard.html', context)
     
     elif user.role == 'service_center':
         try:
             service_center = user.service_center
-            today = timezone.now().date()
-            bookings = Booking.objects.filter(service_center=service_center).order_by('-created_at')[:10]
-            
-            # Analytics
-            total_bookings = Booking.objects.filter(service_center=service_center).count()
-            today_bookings = Booking.objects.filter(service_center=service_center, booking_date=today).count()
-            pending_bookings = Booking.objects.filter(service_center=service_center, status='pending').count()
-            in_progress = Booking.objects.filter(service_center=service_center, status='in_progress').count()
-            
-            # Revenue
-            total_revenue = Invoice.objects.filter(
-                booking__service_center=service_center,
-                payment_status='paid'
-            ).aggregate(total=Sum('total'))['total'] or 0
-            
-            context = {
-                'service_center': service_center,
-                'bookings': bookings,
-                'total_bookings': total_bookings,
-                'today_bookings': today_bookings,
-                'pending_bookings': pending_bookings,
-                'in_progress': in_progress,
-                'total_revenue': total_revenue,
-            }
-            return render(request, 'booking/service_center/dashboard.html', context)
         except ServiceCenter.DoesNotExist:
             messages.warning(request, 'Please complete your service center profile.')
             return redirect('service_center_profile')
+        today = timezone.now().date()
+        
+        def compute():
+            results = run_queries({
+                'bookings': lambda: list(
+                    Booking.objects.for_list().filter(service_center=service_center).order_by('-created_at')[:10]
+                ),
+                # Analytics and revenue from the maintained counters
+                'stats': lambda: center_stats(service_center),
+                'today_bookings': lambda: center_day_bookings(service_center, today),
+            })
+            stats = results['stats']
+            return {
+                'bookings': results['bookings'],
+                'total_bookings': stats.total,
+                'today_bookings': results['today_bookings'],
+                'pending_bookings': stats.pending,
+                'in_progress': stats.in_progress,
+                'total_revenue': stats.paid_revenue,
+            }
+        
+        context = {
+            'service_center': service_center,
+            **await sync_to_async(cached_context)('dashboard', service_center.id, compute, variant=today.isoformat()),
+        }
+        return await sync_to_async(render)(request, 'booking/service_center/dashboard.html', context)
     
     elif user.role == 'mechanic':
         try:
             mechanic = user.mechanic
-            assigned_bookings = Booking.objects.filter(
-                mechanic=mechanic,
-                status__in=['accepted', 'in_progress']
-            ).order_by('-created_at')
-            
-            completed_today = Booking.objects.filter(
-                mechanic=mechanic,
-                status='completed',
-                completed_at__date=timezone.now().date()
-            ).count()
-            
-            context = {
-                'mechanic': mechanic,
-                'assigned_bookings': assigned_bookings,
-                'completed_today': completed_today,
-            }
-            return render(request, 'booking/mechanic/dashboard.html', context)
         except Mechanic.DoesNotExist:
-            # Mechanic object not found for this user — show a helpful page
             # Render a dedicated page with instructions instead of a brief warning
-            return render(request, 'booking/mechanic/profile_missing.html', {'user': request.user})
-    
-    elif user.role == 'admin':
-        total_users = User.objects.count()
-        total_centers = ServiceCenter.objects.count()
-        total_bookings = Booking.objects.count()
-        total_revenue = Invoice.objects.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
+            return await sync_to_async(render)(request, 'booking/mechanic/profile_missing.html', {'user': user})
         
+        day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        # All of a mechanic's bookings belong to their center, so its
+        # version covers them.
+        version = await sync_to_async(fragment_version)(center_id=mechanic.service_center_id)
+        version = f'{version}-{day_start.date().isoformat()}'
         context = {
-            'total_users': total_users,
-            'total_centers': total_centers,
-            'total_bookings': total_bookings,
-            'total_revenue': total_revenue,
+            'mechanic': mechanic,
+            'fragment_version': version,
+            **await _fragment_context('mechanic_dashboard', [user.pk, version], {
+                'assigned_bookings': lambda: list(Booking.objects.for_list().filter(
+                    mechanic=mechanic,
+                    status__in=['accepted', 'in_progress']
+                ).order_by('-created_at')),
+                # A range on completed_at can use the (mechanic, status,
+                # completed_at) index; completed_at__date cannot.
+                'completed_today': lambda: Booking.objects.filter(
+                    mechanic=mechanic,
+                    status='completed',
+                    completed_at__gte=day_start,
+                    completed_at__lt=day_start + timedelta(days=1),
+                ).count(),
+            }),
         }
-        return render(request, 'booking/admin/dashboard.html', context)
+        return await sync_to_async(render)(request, 'booking/mechanic/dashboard.html', context)
+    
+    elif user.role == 'admin':
+        context = await gather_queries({
+            'total_users': User.objects.count,
+            'total_centers': ServiceCenter.objects.count,
+            'total_bookings': Booking.objects.count,
+            'total_revenue': lambda: (
+                Invoice.objects.filter(payment_status='paid').aggregate(total=Sum('total'))['total'] or 0
+            ),
+            'cache_stats': cache_stats,
+        })
+        return await sync_to_async(render)(request, 'booking/admin/dashboard.html', context)
     
     return redirect('home')
 
@@ -280,54 +306,122 @@ def book_service(request):
         if form.is_valid():
             booking = form.save(commit=False)
             booking.vehicle = form.cleaned_data['vehicle']
-            if booking.vehicle.owner != request.user:
+            if booking.vehicle.owner_id != request.user.id:
                 messages.error(request, 'Invalid vehicle selection.')
                 return redirect('book_service')
             
             # Set estimated cost
             booking.estimated_cost = booking.service_category.base_price
-            booking.save()
-            messages.success(request, 'Service booked successfully!')
-            return redirect('my_bookings')
+            try:
+                with transaction.atomic():
+                    booking.slot = reserve_slot(booking.service_center, booking.booking_date, booking.booking_time)
+                    booking.save()
+                    record_booking_created(booking)
+            except SlotUnavailable as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, 'Service booked successfully!')
+                return redirect('my_bookings')
     else:
         form = BookingForm()
         form.fields['vehicle'].queryset = Vehicle.objects.filter(owner=request.user)
     
-    service_centers = ServiceCenter.objects.filter(is_active=True)
-    service_categories = ServiceCategory.objects.filter(is_active=True)
+    reference = reference_data()
     
     return render(request, 'booking/owner/book_service.html', {
         'form': form,
-        'service_centers': service_centers,
-        'service_categories': service_categories,
+        'service_centers': reference.active_centers,
+        'service_categories': reference.categories,
+    })
+
+
+@login_required
+def availability_search(request):
+    """Earliest free slots across all active service centers (JSON). Every
+    center takes every service category, so the search doesn't take one.
+
+    Query parameters: ``start`` (YYYY-MM-DD, defaults to today), ``days``
+    (window length, max 60) and ``limit`` (max 50).
+    """
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else timezone.localdate()
+        days = min(max(int(request.GET.get('days', 7)), 1), 60)
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start, days or limit.'}, status=400)
+
+    slots = earliest_free_slots(start, start + timedelta(days=days - 1), limit=limit)
+    return JsonResponse({
+        'slots': [
+            {
+                'service_center_id': center_id,
+                'service_center': name,
+                'date': day.isoformat(),
+                'time': start_time.strftime('%H:%M'),
+            }
+            for day, start_time, center_id, name in slots
+        ],
+    })
+
+
+def nearest_centers(request):
+    """Nearest active service centers that are open right now (JSON).
+
+    Query parameters: ``lat`` and ``lon`` (required), ``limit`` (max 20)
+    and ``radius`` in km (default 50, max 500).
+    """
+    try:
+        lat = float(request.GET['lat'])
+        lon = float(request.GET['lon'])
+        limit = min(max(int(request.GET.get('limit', 5)), 1), 20)
+        radius = min(max(float(request.GET.get('radius', 50)), 1), 500)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'lat and lon are required; limit and radius must be numbers.'}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return JsonResponse({'error': 'lat/lon out of range.'}, status=400)
+
+    centers = nearest_open_centers(lat, lon, limit=limit, max_km=radius)
+    return JsonResponse({
+        'centers': [
+            {
+                'id': center['id'],
+                'name': center['name'],
+                'distance_km': round(distance, 2),
+                'opening_time': center['opening_time'].strftime('%H:%M'),
+                'closing_time': center['closing_time'].strftime('%H:%M'),
+            }
+            for distance, center in centers
+        ],
     })
 
 
 @login_required
+@conditional_page(my_bookings_state)
 def my_bookings(request):
     """List all bookings of the owner"""
     if request.user.role != 'owner':
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
-    bookings = Booking.objects.filter(vehicle__owner=request.user).order_by('-created_at')
-    return render(request, 'booking/owner/my_bookings.html', {'bookings': bookings})
+    page = keyset_paginate(request, Booking.objects.for_list().filter(vehicle__owner=request.user))
+    return render(request, 'booking/owner/my_bookings.html', {'bookings': page.items, 'page': page})
 
 
 @login_required
+@conditional_page(booking_page_state)
 def booking_detail(request, booking_id):
     """View booking details"""
-    booking = get_object_or_404(Booking, id=booking_id)
+    booking = get_object_or_404(Booking.objects.for_detail(), id=booking_id)
     
     # Check access
-    if request.user.role == 'owner' and booking.vehicle.owner != request.user:
+    if request.user.role == 'owner' and booking.vehicle.owner_id != request.user.id:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
-    elif request.user.role == 'service_center' and booking.service_center.user != request.user:
+    elif request.user.role == 'service_center' and booking.service_center.user_id != request.user.id:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     elif request.user.role == 'mechanic':
-        if not booking.mechanic or booking.mechanic.user != request.user:
+        if not booking.mechanic or booking.mechanic.user_id != request.user.id:
             messages.error(request, 'Access denied.')
             return redirect('dashboard')
     
@@ -346,6 +440,8 @@ def booking_detail(request, booking_id):
         'invoice': invoice,
         'feedback': feedback,
     }
+    if request.user.role == 'service_center':
+        context['mechanics'] = candidate_mechanics(booking.service_center, booking.service_category)
     
     if request.user.role == 'owner':
         return render(request, 'booking/owner/booking_detail.html', context)
@@ -410,6 +506,8 @@ def service_center_profile(request):
             service_center = form.save(commit=False)
             service_center.user = request.user
             service_center.save()
+            if is_update and {'opening_time', 'closing_time', 'slot_minutes', 'bays'} & set(form.changed_data):
+                rebuild_occupancy(service_center)
             messages.success(request, 'Profile updated successfully!' if is_update else 'Profile created successfully!')
             return redirect('dashboard')
     else:
@@ -433,16 +531,27 @@ def manage_bookings(request):
     
     try:
         service_center = request.user.service_center
-        bookings = Booking.objects.filter(service_center=service_center).order_by('-created_at')
+        bookings = Booking.objects.for_list().filter(service_center=service_center)
         
-        # Filter by status if provided
+        # Filter by status if provided (and known)
         status_filter = request.GET.get('status')
-        if status_filter:
-            bookings = bookings.filter(status=status_filter)
+        if status_filter not in dict(Booking.STATUS_CHOICES):
+            status_filter = None
+        query = request.GET.get('q', '').strip()
+        if query:
+            # Ranked full-text search (registration, owner, description)
+            page = search_bookings(request, service_center, query, status=status_filter)
+        else:
+            if status_filter:
+                bookings = bookings.filter(status=status_filter)
+            page = keyset_paginate(request, bookings)
         
         return render(request, 'booking/service_center/manage_bookings.html', {
-            'bookings': bookings,
+            'bookings': page.items,
+            'page': page,
             'status_filter': status_filter,
+            'query': query,
+            'bulk_statuses': [(value, label) for value, label in Booking.STATUS_CHOICES if value in BULK_TRANSITIONS],
         })
     except ServiceCenter.DoesNotExist:
         messages.warning(request, 'Please complete your service center profile.')
@@ -459,85 +568,141 @@ def update_booking_status(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id, service_center__user=request.user)
     
     if request.method == 'POST':
+        old_mechanic_id, old_status = booking.mechanic_id, booking.status
+        changes = {}
+
         new_status = request.POST.get('status')
-        if new_status in dict(Booking.STATUS_CHOICES):
-            booking.status = new_status
-            
-            # Create an invoice when booking is accepted so owners can pay early
-            if new_status == 'accepted':
-                # Create invoice if not exists (owner can pay while work hasn't started)
-                try:
-                    _ = booking.invoice
-                except Invoice.DoesNotExist:
-                    invoice_number = f"INV-{booking.id}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                    subtotal = booking.actual_cost or booking.estimated_cost
-                    subtotal = Decimal(subtotal)
-                    tax = (subtotal * Decimal('0.18')).quantize(Decimal('0.01'))
-                    total = (subtotal + tax).quantize(Decimal('0.01'))
-                    invoice = Invoice.objects.create(
-                        booking=booking,
-                        invoice_number=invoice_number,
-                        subtotal=subtotal,
-                        tax=tax,
-                        total=total,
-                        payment_status='pending'
-                    )
-                    # Send a simple notification email to the owner if email is configured
-                    try:
-                        if booking.vehicle.owner.email:
-                            subject = f"Invoice {invoice.invoice_number} created for your booking"
-                            message = f"Dear {booking.vehicle.owner.get_full_name() or booking.vehicle.owner.username},\n\nAn invoice (\#{invoice.invoice_number}) has been generated for your booking #{booking.id}. Total: ₹{invoice.total}. Please pay using your account.\n\nThank you."
-                            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [booking.vehicle.owner.email], fail_silently=True)
-                    except Exception:
-                        # Silently ignore email failures in dev
-                        pass
-
-            if new_status == 'completed':
-                booking.completed_at = timezone.now()
-                # Create invoice if not exists
-                try:
-                    _ = booking.invoice
-                except Invoice.DoesNotExist:
-                    invoice_number = f"INV-{booking.id}-{datetime.now().strftime('%Y%m%d')}"
-                    subtotal = booking.actual_cost or booking.estimated_cost
-                    subtotal = Decimal(subtotal)
-                    tax = (subtotal * Decimal('0.18')).quantize(Decimal('0.01'))
-                    total = (subtotal + tax).quantize(Decimal('0.01'))
-                    invoice = Invoice.objects.create(
-                        booking=booking,
-                        invoice_number=invoice_number,
-                        subtotal=subtotal,
-                        tax=tax,
-                        total=total,
-                    )
-            
-            booking.save()
-            messages.success(request, f'Booking status updated to {booking.get_status_display()}.')
+        if new_status not in dict(Booking.STATUS_CHOICES) or new_status == booking.status:
+            new_status = None
+        status_after = new_status or booking.status
         
-        # Handle mechanic assignment
+        # Handle mechanic assignment; only an explicit 'auto' picks the
+        # least-loaded active mechanic, and nothing (the default, also
+        # for the current mechanic) leaves it.
         mechanic_id = request.POST.get('mechanic_id')
-        if mechanic_id:
+        if mechanic_id == 'auto':
+            if booking.mechanic is None and status_after in OPEN_STATUSES:
+                mechanic = pick_mechanic(booking)
+                if mechanic:
+                    changes['mechanic'] = mechanic
+                else:
+                    messages.warning(request, 'No active mechanics available for automatic assignment.')
+        elif mechanic_id and mechanic_id != str(booking.mechanic_id):
             try:
-                mechanic = Mechanic.objects.get(id=mechanic_id, service_center=booking.service_center)
-                booking.mechanic = mechanic
-                booking.save()
-                messages.success(request, 'Mechanic assigned successfully.')
-            except Mechanic.DoesNotExist:
+                changes['mechanic'] = Mechanic.objects.get(id=mechanic_id, service_center=booking.service_center)
+            except (ValueError, Mechanic.DoesNotExist):
                 messages.error(request, 'Invalid mechanic selection.')
         
         # Handle cost update
         actual_cost = request.POST.get('actual_cost')
         if actual_cost:
             try:
-                booking.actual_cost = float(actual_cost)
-                booking.save()
-                messages.success(request, 'Cost updated successfully.')
-            except ValueError:
+                actual_cost = Decimal(actual_cost).quantize(Decimal('0.01'))
+                if actual_cost != booking.actual_cost:
+                    changes['actual_cost'] = actual_cost
+            except ArithmeticError:
                 messages.error(request, 'Invalid cost value.')
+
+        try:
+            expected_version = int(request.POST.get('version', booking.version))
+        except ValueError:
+            expected_version = booking.version
+
+        try:
+            with transaction.atomic():
+                if new_status == 'cancelled':
+                    release_slot(booking)
+                    changes['slot'] = None
+                if not booking.apply_changes(status=new_status, expected_version=expected_version, **changes):
+                    return redirect('booking_detail', booking_id=booking_id)
+                if (booking.mechanic_id, booking.status) != (old_mechanic_id, old_status):
+                    update_workload(old_mechanic_id, old_status, booking.mechanic_id, booking.status)
+
+                # Create an invoice when booking is accepted so owners can pay
+                # early, or at the latest when it is completed.
+                if new_status in INVOICE_STATUSES:
+                    invoice, created = get_or_create_invoice(booking)
+                    if created and new_status == 'accepted':
+                        # Sent by the background workers once this commits
+                        notify_invoices_created([invoice])
+        except (InvalidTransition, StaleBooking) as exc:
+            messages.error(request, str(exc))
+            return redirect('booking_detail', booking_id=booking_id)
+
+        if new_status:
+            messages.success(request, f'Booking status updated to {booking.get_status_display()}.')
+        if 'mechanic' in changes:
+            if mechanic_id == 'auto':
+                messages.success(request, f'Mechanic {booking.mechanic.user.username} assigned automatically.')
+            else:
+                messages.success(request, 'Mechanic assigned successfully.')
+        if 'actual_cost' in changes:
+            messages.success(request, 'Cost updated successfully.')
     
     return redirect('booking_detail', booking_id=booking_id)
 
 
+@login_required
+def bulk_update_booking_status(request):
+    """Move the selected bookings to a new status in one transaction."""
+    if request.user.role != 'service_center':
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+
+    try:
+        service_center = request.user.service_center
+    except ServiceCenter.DoesNotExist:
+        messages.warning(request, 'Please complete your service center profile.')
+        return redirect('service_center_profile')
+
+    if request.method != 'POST':
+        return redirect('manage_bookings')
+
+    new_status = request.POST.get('status')
+    try:
+        booking_ids = [int(i) for i in request.POST.getlist('booking_ids')]
+    except ValueError:
+        booking_ids = []
+    if new_status not in BULK_TRANSITIONS or not booking_ids:
+        messages.error(request, 'Select at least one booking and a valid status.')
+        return redirect('manage_bookings')
+
+    results, updated = bulk_transition(service_center, booking_ids, new_status)
+    if updated:
+        messages.success(request, f'{updated} booking(s) updated.')
+    skipped = [f'#{booking_id}: {result}' for booking_id, result in results.items() if not result.startswith('Updated')]
+    if skipped:
+        messages.warning(request, ' '.join(skipped))
+    return redirect('manage_bookings')
+
+
+@login_required
+def auto_assign_mechanics(request):
+    """Assign mechanics to all accepted, unassigned bookings of one day."""
+    if request.user.role != 'service_center':
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+
+    try:
+        service_center = request.user.service_center
+    except ServiceCenter.DoesNotExist:
+        messages.warning(request, 'Please complete your service center profile.')
+        return redirect('service_center_profile')
+
+    if request.method == 'POST':
+        try:
+            day = datetime.strptime(request.POST.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            day = timezone.localdate()
+        assigned = assign_backlog(service_center, day)
+        if assigned:
+            messages.success(request, f'Assigned mechanics to {assigned} booking(s) for {day}.')
+        else:
+            messages.info(request, f'No unassigned accepted bookings (or no active mechanics) for {day}.')
+
+    return redirect('manage_bookings')
+
+
 @login_required
 def manage_mechanics(request):
     """Manage mechanics for service center"""
@@ -547,7 +712,7 @@ def manage_mechanics(request):
     
     try:
         service_center = request.user.service_center
-        mechanics = Mechanic.objects.filter(service_center=service_center)
+        mechanics = Mechanic.objects.filter(service_center=service_center).select_related('user')
         return render(request, 'booking/service_center/manage_mechanics.html', {'mechanics': mechanics})
     except ServiceCenter.DoesNotExist:
         messages.warning(request, 'Please complete your service center profile.')
@@ -613,54 +778,143 @@ def manage_inventory(request):
 
 
 @login_required
-def analytics(request):
-    """Service center analytics"""
+def import_data(request, name):
+    """Add vehicles (owners) or inventory items (service centers) from an
+    uploaded CSV file and report the rows that could not be imported.
+    """
+    if name == 'vehicles' and request.user.role == 'owner':
+        importer = VehicleImporter(request.user)
+        back = 'my_vehicles'
+    elif name == 'inventory' and request.user.role == 'service_center':
+        try:
+            importer = InventoryImporter(request.user.service_center)
+        except ServiceCenter.DoesNotExist:
+            messages.warning(request, 'Please complete your service center profile.')
+            return redirect('service_center_profile')
+        back = 'manage_inventory'
+    else:
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+
+    result = None
+    if request.method == 'POST':
+        form = ImportFileForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = importer.run(open_upload(form.cleaned_data['file']))
+            except InvalidImportFile as exc:
+                form.add_error('file', str(exc))
+            else:
+                if result.created:
+                    messages.success(request, f'{result.created} row(s) imported successfully!')
+    else:
+        form = ImportFileForm()
+    return render(request, 'booking/import.html', {
+        'form': form,
+        'name': name,
+        'columns': importer.columns(),
+        'required_columns': importer.required_columns(),
+        'result': result,
+        'back': back,
+    })
+
+@async_login_required
+async def analytics(request):
+    """Service center analytics; the queries run at the same time"""
     if request.user.role != 'service_center':
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
     try:
         service_center = request.user.service_center
-        
-        # Daily bookings (last 30 days)
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        daily_bookings = Booking.objects.filter(
-            service_center=service_center,
-            created_at__date__gte=thirty_days_ago
-        ).values('created_at__date').annotate(count=Count('id')).order_by('created_at__date')
-        
-        # Most requested services
-        popular_services = Booking.objects.filter(
-            service_center=service_center
-        ).values('service_category__name').annotate(count=Count('id')).order_by('-count')[:5]
-        
-        # Most frequent customers
-        frequent_customers = Booking.objects.filter(
-            service_center=service_center
-        ).values('vehicle__owner__username').annotate(count=Count('id')).order_by('-count')[:5]
-        
-        # Revenue by month
-        # Use TruncMonth to avoid ambiguous column names in SQL joins
-        monthly_revenue = Invoice.objects.filter(
-            booking__service_center=service_center,
-            payment_status='paid'
-        ).annotate(month=TruncMonth('created_at')).values('month').annotate(total=Sum('total')).order_by('month')
-        
-        context = {
-            'daily_bookings': list(daily_bookings),
-            'popular_services': list(popular_services),
-            'frequent_customers': list(frequent_customers),
-            'monthly_revenue': list(monthly_revenue),
-        }
-        
-        return render(request, 'booking/service_center/analytics.html', context)
     except ServiceCenter.DoesNotExist:
         messages.warning(request, 'Please complete your service center profile.')
         return redirect('service_center_profile')
+    
+    def compute():
+        # Everything below reads the rollups kept by refresh_analytics_rollups
+        category_rollups = DailyCategoryRollup.objects.filter(service_center=service_center)
+        thirty_days_ago = timezone.now().date() - timedelta(days=30)
+        ranking_since = timezone.now().date() - timedelta(days=RANKING_DAYS)
+        
+        return run_queries({
+            # Daily bookings (last 30 days)
+            'daily_bookings': lambda: list(category_rollups.filter(
+                day__gte=thirty_days_ago
+            ).values('day').annotate(count=Sum('bookings')).order_by('day')),
+            # Most requested services (last year)
+            'popular_services': lambda: list(category_rollups.filter(
+                day__gte=ranking_since
+            ).values('service_category__name').annotate(count=Sum('bookings')).order_by('-count')[:5]),
+            # Most frequent customers (last year)
+            'frequent_customers': lambda: list(DailyCustomerRollup.objects.filter(
+                service_center=service_center, day__gte=ranking_since
+            ).values('owner__username').annotate(count=Sum('bookings')).order_by('-count')[:5]),
+            # Revenue by month
+            'monthly_revenue': lambda: list(MonthlyRevenueRollup.objects.filter(
+                service_center=service_center
+            ).values('month', 'revenue').order_by('month')),
+            'rollups_refreshed_at': last_refreshed,
+        })
+    
+    context = await sync_to_async(cached_context)(
+        'analytics', service_center.id, compute, variant=timezone.now().date().isoformat(),
+    )
+    return await sync_to_async(render)(request, 'booking/service_center/analytics.html', context)
+
+
+@login_required
+def export_data(request, name):
+    """Download bookings or invoices as CSV or JSON Lines, streamed.
+    Service centers export their own; admins all centers or ``?center=``.
+    Optional ``?month=YYYY-MM`` and ``?format=csv|jsonl``.
+    """
+    if request.user.role == 'service_center':
+        try:
+            service_center_id = request.user.service_center.id
+        except ServiceCenter.DoesNotExist:
+            messages.warning(request, 'Please complete your service center profile.')
+            return redirect('service_center_profile')
+    elif request.user.role == 'admin':
+        service_center_id = request.GET.get('center') or None
+    else:
+        messages.error(request, 'Access denied.')
+        return redirect('dashboard')
+
+    fmt = request.GET.get('format', 'csv')
+    try:
+        month = datetime.strptime(request.GET['month'], '%Y-%m').date() if request.GET.get('month') else None
+        if service_center_id is not None:
+            service_center_id = int(service_center_id)
+    except ValueError:
+        month = fmt = None
+    if name not in EXPORTS or fmt not in FORMATS:
+        messages.error(request, 'Invalid export.')
+        return redirect('dashboard')
+
+    filters = {'service_center_id': service_center_id, 'month': month}
+    stream = aexport_stream if isinstance(request, ASGIRequest) else export_stream
+    response = StreamingHttpResponse(stream(name, fmt, **filters), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(name, fmt, **filters)}"'
+    return response
+
+
+async def booking_events(request):
+    """Server-Sent Events with status changes of the user's bookings,
+    for the live status badges on booking pages."""
+    # Each open page holds its connection; only the ASGI server can afford
+    # that. 204 tells the browser not to retry.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user_id = await sync_to_async(lambda: request.user.pk if request.user.is_authenticated else None)()
+    if user_id is None:
+        return HttpResponse(status=403)
+    return stream_response(request, user_id)
 
 
 # Mechanic Views
 @login_required
+@conditional_page(mechanic_tasks_state)
 def mechanic_tasks(request):
     """View assigned tasks"""
     if request.user.role != 'mechanic':
@@ -669,7 +923,7 @@ def mechanic_tasks(request):
     
     try:
         mechanic = request.user.mechanic
-        bookings = Booking.objects.filter(mechanic=mechanic).order_by('-created_at')
+        bookings = Booking.objects.for_list().filter(mechanic=mechanic).order_by('-created_at')
         return render(request, 'booking/mechanic/tasks.html', {'bookings': bookings})
     except Mechanic.DoesNotExist:
         # Render the missing-profile page with clear instructions
@@ -685,18 +939,26 @@ def update_task_status(request, booking_id):
     
     booking = get_object_or_404(Booking, id=booking_id)
     
-    if booking.mechanic and booking.mechanic.user != request.user:
+    if not booking.mechanic or booking.mechanic.user_id != request.user.id:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
     if request.method == 'POST':
         status = request.POST.get('status')
         if status in ['in_progress', 'completed']:
-            booking.status = status
-            if status == 'completed':
-                booking.completed_at = timezone.now()
-            booking.save()
-            messages.success(request, 'Task status updated successfully!')
+            old_status = booking.status
+            try:
+                expected_version = int(request.POST.get('version', booking.version))
+            except ValueError:
+                expected_version = booking.version
+            try:
+                with transaction.atomic():
+                    booking.apply_changes(status=status, expected_version=expected_version)
+                    update_workload(booking.mechanic_id, old_status, booking.mechanic_id, booking.status)
+            except (InvalidTransition, StaleBooking) as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, 'Task status updated successfully!')
     
     return redirect('mechanic_tasks')
 
@@ -709,8 +971,8 @@ def admin_manage_centers(request):
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
-    centers = ServiceCenter.objects.all().order_by('-created_at')
-    return render(request, 'booking/admin/manage_centers.html', {'centers': centers})
+    page = keyset_paginate(request, ServiceCenter.objects.all())
+    return render(request, 'booking/admin/manage_centers.html', {'centers': page.items, 'page': page})
 
 
 @login_required
@@ -720,13 +982,15 @@ def admin_manage_users(request):
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
-    users = User.objects.all().order_by('-date_joined')
+    users = User.objects.all()
     role_filter = request.GET.get('role')
     if role_filter:
         users = users.filter(role=role_filter)
+    page = keyset_paginate(request, users, field='date_joined')
     
     return render(request, 'booking/admin/manage_users.html', {
-        'users': users,
+        'users': page.items,
+        'page': page,
         'role_filter': role_filter,
     })
 
@@ -757,15 +1021,16 @@ def admin_manage_categories(request):
 
 
 @login_required
+@conditional_page(booking_page_state)
 def view_invoice(request, booking_id):
     """View invoice"""
-    booking = get_object_or_404(Booking, id=booking_id)
+    booking = get_object_or_404(Booking.objects.for_detail(), id=booking_id)
     
     # Check access
-    if request.user.role == 'owner' and booking.vehicle.owner != request.user:
+    if request.user.role == 'owner' and booking.vehicle.owner_id != request.user.id:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
-    elif request.user.role == 'service_center' and booking.service_center.user != request.user:
+    elif request.user.role == 'service_center' and booking.service_center.user_id != request.user.id:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
@@ -795,20 +1060,29 @@ def cancel_booking(request, booking_id):
         return redirect('booking_detail', booking_id=booking_id)
 
     # Only allow cancellation for specific statuses
-    if booking.status not in ['pending', 'accepted']:
+    if not booking.can_transition('cancelled'):
         messages.error(request, 'This booking cannot be cancelled at its current stage.')
         return redirect('booking_detail', booking_id=booking_id)
 
-    # Mark booking cancelled
-    booking.status = 'cancelled'
-    booking.save()
+    # Mark booking cancelled and free its slot
+    try:
+        with transaction.atomic():
+            old_status = booking.status
+            release_slot(booking)
+            booking.apply_changes(status='cancelled', slot=None)
+            update_workload(booking.mechanic_id, old_status, booking.mechanic_id, 'cancelled')
+    except (InvalidTransition, StaleBooking) as exc:
+        messages.error(request, str(exc))
+        return redirect('booking_detail', booking_id=booking_id)
 
     # If invoice exists and was paid, mark it cancelled (demo behaviour)
     try:
         invoice = booking.invoice
         if invoice.payment_status == 'paid':
-            invoice.payment_status = 'cancelled'
-            invoice.save()
+            with transaction.atomic():
+                invoice.payment_status = 'cancelled'
+                invoice.save()
+                record_payment_change(invoice, 'paid', 'cancelled')
     except Invoice.DoesNotExist:
         pass
 
@@ -0,0 +1,107 @@
+"""Time the earliest-free-slot search on a large synthetic dataset.
+
+Seeds a throwaway database with ``--centers`` service centers and the
+occupancy bitmaps that ``--bookings`` single-bay bookings spread over the
+next ``--days`` days would produce, then times ``earliest_free_slots``.
+``--schedules`` spreads the centers over that many different closing
+times (each with the same slots):
+
+    python scripts/bench_availability.py --centers 10000 --bookings 1000000 --schedules 1 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time as clock
+from datetime import time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from booking.models import DayOccupancy, ServiceCenter, User
+from booking.reference import reference_changed
+from booking.slots import day_slots, earliest_free_slots
+
+
+def seed(centers, bookings, days, fill, schedules):
+    users = User.objects.bulk_create([
+        User(username=f'bench_center_{i}', role='service_center') for i in range(centers)
+    ], batch_size=2000)
+    created = ServiceCenter.objects.bulk_create([
+        ServiceCenter(user=u, name=f'Center {i}', address='-', phone='-', email='c@example.com', bays=1,
+                      closing_time=time(18, i % schedules))
+        for i, u in enumerate(users)
+    ], batch_size=2000)
+    slots = len(day_slots(created[0]))
+
+    # Each single-bay booking fills one slot; the first `fill` fraction of
+    # centers are fully booked so the search has to skip past them.
+    rng = random.Random(0)
+    today = timezone.localdate()
+    full_day = (1 << slots) - 1
+    masks = {}
+    busy = int(centers * fill)
+    for center in created[:busy]:
+        for d in range(days):
+            masks[(center.id, d)] = full_day
+    remaining = max(bookings - busy * days * slots, 0)
+    for _ in range(remaining):
+        key = (rng.choice(created).id, rng.randrange(days))
+        masks[key] = masks.get(key, 0) | (1 << rng.randrange(slots))
+    DayOccupancy.objects.bulk_create([
+        DayOccupancy(service_center_id=center_id, date=today + timedelta(days=d), full_mask=mask)
+        for (center_id, d), mask in masks.items()
+    ], batch_size=5000)
+    return len(masks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--centers', type=int, default=10000)
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--fill', type=float, default=0.2, help='fraction of centers with no free slot at all')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--schedules', type=int, nargs='+', default=[1], help='distinct center hours (max 60)')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        started = clock.perf_counter()
+        rows = seed(args.centers, args.bookings, args.days, args.fill, max(args.schedules))
+        print(f'seeded {args.centers} centers, {rows} occupancy rows in {clock.perf_counter() - started:.1f}s')
+
+        today = timezone.localdate()
+        end = today + timedelta(days=args.days - 1)
+        for schedules in sorted(args.schedules, reverse=True):
+            for minute in range(schedules, max(args.schedules)):
+                ServiceCenter.objects.filter(closing_time=time(18, minute)).update(closing_time=time(18))
+            reference_changed()
+            timings = []
+            for _ in range(args.repeat):
+                started = clock.perf_counter()
+                results = earliest_free_slots(today, end, limit=args.limit)
+                timings.append((clock.perf_counter() - started) * 1000)
+            timings.sort()
+            print(f'{schedules} schedule(s): earliest_free_slots(limit={args.limit}): '
+                  f'median {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms')
+        for day, start, center_id, name in results[:3]:
+            print(f'  {day} {start:%H:%M} {name}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
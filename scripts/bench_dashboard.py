@@ -0,0 +1,167 @@
+"""Time the dashboards and the analytics page with their queries run one
+after another (``DB_QUERY_THREADS = 0``, what the sync views did) and at
+the same time (booking/parallel.py), at a few database round-trip times.
+
+Every query is delayed by ``--rtt`` milliseconds, as it would be by the
+network to a database server, and opening a connection by
+``--connect-rtts`` round trips (TCP, TLS and authentication). Connections
+are kept as the settings say (``CONN_MAX_AGE``), so the request's own is
+opened anew for each request and the pool's are reused. The cache is
+cleared before each request, so every page runs all its queries.
+Requests go through the ASGI handler one at a time. Runs against a
+throwaway database:
+
+    python scripts/bench_dashboard.py --rtt 0 1 5 --requests 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time as clock
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient
+from django.test.utils import setup_test_environment
+
+from booking.models import Booking, Invoice, Mechanic, ServiceCategory, ServiceCenter, User, Vehicle
+from booking.rollups import refresh_rollups
+from booking.stats import rebuild_stats
+
+PAGES = [
+    ('owner', '/dashboard/'),
+    ('service_center', '/dashboard/'),
+    ('service_center', '/service-center/analytics/'),
+    ('mechanic', '/dashboard/'),
+    ('admin', '/dashboard/'),
+]
+
+# Bookings of the bench owner and mechanic
+OWN = 20
+rtt = 0.0
+connect_rtts = 0
+
+
+def delay(execute, sql, params, many, context):
+    if rtt:
+        clock.sleep(rtt)
+    return execute(sql, params, many, context)
+
+
+def add_delay(sender, connection, **kwargs):
+    if rtt:
+        clock.sleep(rtt * connect_rtts)
+    if delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(delay)
+
+
+def seed(bookings):
+    users = {role: User.objects.create_user(f'bench_{role}', role=role) for role in (
+        'owner', 'service_center', 'mechanic', 'admin',
+    )}
+    center = ServiceCenter.objects.create(
+        user=users['service_center'], name='Center', address='-', phone='-', email='c@example.com',
+    )
+    mechanic = Mechanic.objects.create(user=users['mechanic'], service_center=center)
+    category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+    # The bench owner and mechanic have a few bookings; the center has
+    # ``bookings`` from many other owners
+    others = User.objects.bulk_create([User(username=f'bench_other_{i}', role='owner') for i in range(200)])
+    vehicles = Vehicle.objects.bulk_create([
+        Vehicle(owner=owner, vehicle_type='car', brand='Brand', model='Model', year=2020,
+                registration_number=f'BENCH-{i}')
+        for i, owner in enumerate([users['owner']] * 3 + others)
+    ])
+    statuses = ['pending', 'accepted', 'in_progress', 'completed']
+    created = Booking.objects.bulk_create([
+        Booking(
+            vehicle=vehicles[i % 3] if i < OWN else vehicles[3 + i % len(others)], service_center=center,
+            service_category=category, mechanic=mechanic if i < OWN else None,
+            booking_date=date.today() - timedelta(days=i % 60), booking_time=time(10),
+            service_description='-', status=statuses[i % len(statuses)], estimated_cost=Decimal('100.00'),
+        )
+        for i in range(bookings)
+    ], batch_size=2000)
+    Invoice.objects.bulk_create([
+        Invoice(booking=booking, invoice_number=f'BENCH-{booking.id}', subtotal=Decimal('100.00'),
+                tax=Decimal('18.00'), total=Decimal('118.00'), payment_status='paid')
+        for booking in created if booking.status == 'completed'
+    ], batch_size=2000)
+    rebuild_stats()
+    refresh_rollups(full=True)
+    return users
+
+
+async def measure(clients, requests):
+    """Median milliseconds per page."""
+    results = {}
+    for role, url in PAGES:
+        times = []
+        for _ in range(requests):
+            cache.clear()
+            started = clock.perf_counter()
+            response = await clients[role].get(url)
+            times.append(clock.perf_counter() - started)
+            assert response.status_code == 200, (role, url, response.status_code)
+        results[role, url] = statistics.median(times) * 1000
+    return results
+
+
+def main():
+    global rtt, connect_rtts
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt', type=float, nargs='+', default=[0, 1, 5], help='milliseconds per query')
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--connect-rtts', type=int, default=3, help='round trips to open a connection')
+    args = parser.parse_args()
+    connect_rtts = args.connect_rtts
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['testserver']
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'dashboard.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        users = seed(args.bookings)
+        clients = {}
+        for role, user in users.items():
+            clients[role] = AsyncClient()
+            clients[role].force_login(user)
+
+        add_delay(None, connection)
+        connection_created.connect(add_delay)
+        print(f'{args.bookings} bookings, median of {args.requests} requests, cache cleared before each, '
+              f'{args.connect_rtts} round trips per new connection')
+        print(f'{"rtt":>6}  {"page":40} {"one by one":>11} {"concurrent":>11} {"speedup":>8}')
+        for rtt_ms in args.rtt:
+            rtt = rtt_ms / 1000
+            settings.DB_QUERY_THREADS = 0
+            sequential = asyncio.run(measure(clients, args.requests))
+            settings.DB_QUERY_THREADS = args.threads
+            concurrent = asyncio.run(measure(clients, args.requests))
+            for role, url in PAGES:
+                before, after = sequential[role, url], concurrent[role, url]
+                print(f'{rtt_ms:4g}ms  {role + " " + url:40} {before:9.1f}ms {after:9.1f}ms {before / after:7.2f}x')
+        return 0
+    finally:
+        connection_created.disconnect(add_delay)
+        rtt = 0
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Measure export throughput (rows/sec) and peak memory (RSS).
+
+Fills a throwaway database with bookings and invoices, growing it step by
+step, and at each size runs the export in a fresh process so its peak
+RSS is its own. ``--compare`` also runs the way the admin pulled the same
+data: all model instances loaded into a list first.
+
+    python scripts/bench_export.py --rows 10000 100000 --compare
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time as clock
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+
+SEED_BATCH = 5000
+
+
+def peak_rss_mb():
+    # VmHWM starts afresh at exec; ru_maxrss would include the parent's peak
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:')) / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != 'darwin' else 1024 ** 2)
+
+
+def seed(start, stop, center, category, owners):
+    from booking.models import Booking, Invoice, Vehicle
+
+    for lo in range(start, stop, SEED_BATCH):
+        hi = min(lo + SEED_BATCH, stop)
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(owner=owners[i % len(owners)], vehicle_type='car', brand='Brand', model='Model', year=2020,
+                    registration_number=f'EXP-{i}')
+            for i in range(lo, hi)
+        ])
+        bookings = Booking.objects.bulk_create([
+            Booking(vehicle=vehicle, service_center=center, service_category=category,
+                    booking_date=date(2026, 1, 1) + timedelta(days=i % 300), booking_time=time(10),
+                    service_description='Periodic service, oil and filters', status='completed',
+                    estimated_cost=Decimal('1500.00'), actual_cost=Decimal('1725.50'))
+            for i, vehicle in zip(range(lo, hi), vehicles)
+        ])
+        Invoice.objects.bulk_create([
+            Invoice(booking=booking, invoice_number=f'INV-2026-{i:07d}', subtotal=Decimal('1725.50'),
+                    tax=Decimal('310.59'), total=Decimal('2036.09'), payment_status='paid')
+            for i, booking in zip(range(lo, hi), bookings)
+        ])
+
+
+def child(args):
+    """Run one export against ``args.db``; print seconds and RSS before and at peak."""
+    connection.settings_dict['NAME'] = args.db
+    from booking.exports import EXPORTS, export_stream
+
+    baseline = peak_rss_mb()
+    started = clock.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as out:
+        if args.mode == 'stream':
+            for block in export_stream(args.name, args.format):
+                out.write(block)
+        else:
+            model = EXPORTS[args.name][0]
+            rows = list(model.objects.select_related())
+            for obj in rows:
+                out.write(','.join(str(field.value_from_object(obj)) for field in model._meta.concrete_fields))
+    elapsed = clock.perf_counter() - started
+    print(elapsed, baseline, peak_rss_mb())
+
+
+def run_child(db, name, fmt, mode):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', db, '--name', name, '--format', fmt, '--mode', mode],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return [float(value) for value in output[-3:]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--compare', action='store_true', help='also measure loading everything into a list')
+    parser.add_argument('--child', metavar='DB', dest='db', help=argparse.SUPPRESS)
+    parser.add_argument('--name', default='bookings', help=argparse.SUPPRESS)
+    parser.add_argument('--format', default='csv', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', default='stream', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.db:
+        return child(args)
+
+    from django.test.utils import setup_test_environment
+    from booking.models import ServiceCategory, ServiceCenter, User
+
+    setup_test_environment()
+    db_file = os.path.join(tempfile.mkdtemp(), 'export.sqlite3')
+    connection.settings_dict['TEST']['NAME'] = db_file
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        center_user = User.objects.create_user('exp_center', role='service_center')
+        center = ServiceCenter.objects.create(user=center_user, name='Export Center', address='-', phone='-',
+                                              email='e@example.com')
+        category = ServiceCategory.objects.create(name='General', base_price=Decimal('1500.00'))
+        owners = [User.objects.create_user(f'exp_owner{i}', email=f'o{i}@example.com', role='owner')
+                  for i in range(50)]
+
+        modes = [('stream', 'csv'), ('stream', 'jsonl')] + ([('list', 'csv')] if args.compare else [])
+        print(f'{"rows":>9} {"export":9} {"mode":12} {"seconds":>8} {"rows/s":>9} {"base MB":>8} {"peak MB":>8}')
+        seeded = 0
+        for rows in sorted(args.rows):
+            seed(seeded, rows, center, category, owners)
+            seeded = rows
+            connection.close()
+            for name in ('bookings', 'invoices'):
+                for mode, fmt in modes:
+                    elapsed, baseline, peak = run_child(db_file, name, fmt, mode)
+                    label = f'{mode} {fmt}' if mode == 'stream' else 'list (admin)'
+                    print(f'{rows:9} {name:9} {label:12} {elapsed:8.2f} {rows / elapsed:9.0f} '
+                          f'{baseline:8.1f} {peak:8.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
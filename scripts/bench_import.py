@@ -0,0 +1,117 @@
+"""Time CSV imports of vehicles and inventory items at growing sizes.
+
+Generates files where about one row in fifty is invalid or repeats a
+registration number, imports each into a throwaway database and reports
+rows/sec and queries per 1000 rows; both should stay flat as the file
+grows. ``--compare`` also times saving the vehicles one form at a time,
+as ``add_vehicle`` does.
+
+    python scripts/bench_import.py --rows 1000 10000 50000 --compare
+"""
+import argparse
+import io
+import os
+import sys
+import time as clock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from booking.forms import VehicleForm
+from booking.imports import BATCH_SIZE, InventoryImporter, VehicleImporter
+from booking.models import Inventory, ServiceCenter, User, Vehicle
+
+_runs = iter(range(1000000))
+
+
+def vehicles_csv(n):
+    run = next(_runs)
+    lines = ['registration_number,vehicle_type,brand,model,year,color,mileage']
+    for i in range(n):
+        number = f'BI-{run}-{i - 1 if i % 97 == 50 else i}'  # an occasional repeat
+        year = 'abc' if i % 89 == 7 else 2000 + i % 25  # an occasional bad value
+        lines.append(f'{number},car,Brand,Model {i % 40},{year},Blue,{i * 7 % 200000}')
+    return '\n'.join(lines) + '\n'
+
+
+def inventory_csv(n):
+    lines = ['item_name,description,quantity,unit_price,reorder_level']
+    for i in range(n):
+        price = '-' if i % 89 == 7 else f'{i % 500}.50'
+        lines.append(f'Part {i},"Spare part, size {i % 12}",{i % 300},{price},10')
+    return '\n'.join(lines) + '\n'
+
+
+def timed(run):
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(1)
+        return execute(sql, params, many, context)
+
+    started = clock.perf_counter()
+    with connection.execute_wrapper(count):
+        result = run()
+    return result, clock.perf_counter() - started, len(queries)
+
+
+def one_at_a_time(owner, data):
+    import csv
+    created = 0
+    for row in csv.DictReader(io.StringIO(data)):
+        form = VehicleForm(row)
+        if form.is_valid():
+            vehicle = form.save(commit=False)
+            vehicle.owner = owner
+            vehicle.save()
+            created += 1
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--compare', action='store_true', help='also save vehicles one form at a time')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        owner = User.objects.create_user('bi_owner', role='owner')
+        center_user = User.objects.create_user('bi_center', role='service_center')
+        center = ServiceCenter.objects.create(user=center_user, name='Import Center', address='-', phone='-',
+                                              email='i@example.com')
+        print(f'{"rows":>7} {"import":22} {"created":>8} {"skipped":>8} {"seconds":>8} {"rows/s":>8} '
+              f'{"queries/1k":>10}')
+        for n in args.rows:
+            runs = [
+                ('vehicles', lambda: VehicleImporter(owner, batch_size=args.batch_size).run(
+                    io.StringIO(vehicles_csv(n)))),
+                ('inventory', lambda: InventoryImporter(center, batch_size=args.batch_size).run(
+                    io.StringIO(inventory_csv(n)))),
+            ]
+            for label, run in runs:
+                result, elapsed, queries = timed(run)
+                print(f'{n:7} {label:22} {result.created:8} {result.failed:8} {elapsed:8.2f} {n / elapsed:8.0f} '
+                      f'{queries * 1000 / n:10.1f}')
+            if args.compare:
+                data = vehicles_csv(n)
+                created, elapsed, queries = timed(lambda: one_at_a_time(owner, data))
+                print(f'{n:7} {"vehicles, one by one":22} {created:8} {n - created:8} {elapsed:8.2f} '
+                      f'{n / elapsed:8.0f} {queries * 1000 / n:10.1f}')
+            Vehicle.objects.all().delete()
+            Inventory.objects.all().delete()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
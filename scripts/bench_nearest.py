@@ -0,0 +1,91 @@
+"""Time the nearest-open-center search on a large synthetic dataset.
+
+Seeds a throwaway database with ``--centers`` service centers, most of
+them clustered in a few cities and the rest spread over the country, with
+a mix of opening hours. Loads the spatial index once, then times
+``nearest_open_centers`` for random points around the cities:
+
+    python scripts/bench_nearest.py --centers 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time as clock
+from datetime import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from booking.geo import nearest_open_centers, sync_index
+from booking.models import ServiceCenter, User
+
+# (lat, lon) of a few large cities; centers cluster within ~30 km of them
+CITIES = [(12.97, 77.59), (19.08, 72.88), (28.61, 77.21), (13.08, 80.27), (17.39, 78.49), (22.57, 88.36)]
+HOURS = [(time(9), time(18)), (time(8), time(20)), (time(10), time(22)), (time(0), time(23, 59))]
+
+
+def seed(centers, rural):
+    rng = random.Random(0)
+    users = User.objects.bulk_create([
+        User(username=f'bench_center_{i}', role='service_center') for i in range(centers)
+    ], batch_size=5000)
+    rows = []
+    for i, user in enumerate(users):
+        if rng.random() < rural:
+            lat, lon = rng.uniform(8, 32), rng.uniform(70, 92)
+        else:
+            city_lat, city_lon = rng.choice(CITIES)
+            lat, lon = city_lat + rng.gauss(0, 0.12), city_lon + rng.gauss(0, 0.12)
+        opening, closing = rng.choice(HOURS)
+        rows.append(ServiceCenter(
+            user=user, name=f'Center {i}', address='-', phone='-', email='c@example.com',
+            latitude=lat, longitude=lon, opening_time=opening, closing_time=closing,
+            is_active=rng.random() > 0.05,
+        ))
+    ServiceCenter.objects.bulk_create(rows, batch_size=5000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--centers', type=int, default=50000)
+    parser.add_argument('--rural', type=float, default=0.2, help='fraction of centers outside the cities')
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.centers, args.rural)
+        started = clock.perf_counter()
+        index = sync_index()
+        print(f'loaded {len(index)} centers into the index in {(clock.perf_counter() - started) * 1000:.0f} ms')
+
+        rng = random.Random(1)
+        for label, at in (('daytime', time(11)), ('late evening', time(21, 30))):
+            timings = []
+            for _ in range(args.queries):
+                city_lat, city_lon = rng.choice(CITIES)
+                lat, lon = city_lat + rng.gauss(0, 0.2), city_lon + rng.gauss(0, 0.2)
+                started = clock.perf_counter()
+                nearest_open_centers(lat, lon, limit=args.limit, at=at)
+                timings.append((clock.perf_counter() - started) * 1e6)
+            timings.sort()
+            print(f'{label:13} nearest {args.limit}: median {timings[len(timings) // 2]:.0f} us, '
+                  f'p99 {timings[int(len(timings) * 0.99)]:.0f} us, max {timings[-1]:.0f} us')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Compare emailing notifications one ``send_mail`` at a time with sending
+them through the outbox (booking/notifications.py), against a local SMTP
+stand-in that accepts and discards mail.
+
+``--latency`` adds a delay to each new connection, as the greeting and
+handshake with a real remote server would. Runs against a throwaway
+database:
+
+    python scripts/bench_outbox.py --owners 200 --updates 3 --latency 0.05
+"""
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection
+from django.test.utils import setup_test_environment
+
+from booking.models import Notification, User
+from booking.notifications import notify, send_notifications
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.latency = latency
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: every command succeeds."""
+
+    def reply(self, lines):
+        # One write per reply, so Nagle's algorithm doesn't stall the client
+        self.wfile.write(lines.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        time.sleep(server.latency)
+        self.reply('220 sink ready')
+        for raw in self.rfile:
+            command = raw[:4].decode(errors='replace').upper()
+            if command == 'EHLO':
+                self.reply('250-sink\r\n250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                with server.lock:
+                    server.messages += 1
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply('250 ok')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--owners', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=3, help='notifications per owner')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added per connection')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    sink = SMTPSink(args.latency)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    # After setup_test_environment(), which swaps in the locmem backend
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = sink.server_address
+    settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ''
+    settings.EMAIL_USE_TLS = False
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'outbox.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        owners = User.objects.bulk_create(
+            User(username=f'outbox{i}', email=f'o{i}@example.com', role='owner') for i in range(args.owners)
+        )
+        messages = [
+            (owner, f'Update {n} on your booking', 'Your booking has changed.')
+            for n in range(args.updates) for owner in owners
+        ]
+        print(f'{len(messages)} notifications for {args.owners} owners, {args.latency * 1000:.0f} ms per connection')
+
+        sink.connections = sink.messages = 0
+        started = time.perf_counter()
+        for owner, subject, body in messages:
+            send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [owner.email])
+        elapsed = time.perf_counter() - started
+        print(f'  send_mail each:  {elapsed:6.2f}s  {len(messages) / elapsed:7.0f} notifications/s  '
+              f'{sink.messages} emails over {sink.connections} connections')
+
+        settings.NOTIFICATION_DIGEST_SECONDS = 0
+        sink.connections = sink.messages = 0
+        started = time.perf_counter()
+        notify((owner.id, subject, body) for owner, subject, body in messages)
+        emails = send_notifications()
+        elapsed = time.perf_counter() - started
+        print(f'  outbox:          {elapsed:6.2f}s  {len(messages) / elapsed:7.0f} notifications/s  '
+              f'{sink.messages} emails over {sink.connections} connections')
+
+        ok = (emails == sink.messages == args.owners and sink.connections == 1
+              and not Notification.objects.filter(sent_at__isnull=True).exists())
+        print('PASS' if ok else 'FAIL')
+        return 0 if ok else 1
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        sink.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Measure the bytes a browser downloads per page.
+
+Renders a few anonymous and owner pages against a throwaway database and
+reports, per page, the HTML size (raw and gzipped) and the size of the
+same-origin CSS/JS it links (brotli, as collectstatic precompresses them).
+A first visit pays for both; a repeat visit only for the HTML, since the
+hashed static files are cached for a year. External URLs can't be
+measured offline and are only counted.
+
+To compare with another version of the base template, pass it with
+``--before``, e.g. the one that inlined its CSS and used the CDN:
+
+    git show <commit>:templates/base.html > /tmp/base_before.html
+    python scripts/bench_page_weight.py --before /tmp/base_before.html
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db import connection
+from django.template import engines
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from booking.models import Booking, ServiceCategory, ServiceCenter, User, Vehicle
+
+PAGES = [(None, 'home'), (None, 'login'), (None, 'register'), ('owner', 'dashboard'), ('owner', 'my_bookings'),
+         ('owner', 'book_service')]
+ASSET = re.compile(r'<(?:link[^>]+href|script[^>]+src)="([^"]+\.(?:css|js))"')
+
+
+def seed():
+    owner = User.objects.create_user('pw_owner', role='owner')
+    center_user = User.objects.create_user('pw_center', role='service_center')
+    center = ServiceCenter.objects.create(user=center_user, name='Center', address='-', phone='-', email='c@example.com')
+    category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+    for i in range(10):
+        vehicle = Vehicle.objects.create(owner=owner, vehicle_type='car', brand='Brand', model='Model', year=2020,
+                                         registration_number=f'PW-{i}')
+        Booking.objects.create(vehicle=vehicle, service_center=center, service_category=category,
+                               booking_date=date.today() + timedelta(days=i), booking_time=time(10),
+                               service_description='Periodic service', estimated_cost=Decimal('100.00'))
+    return owner
+
+
+def asset_size(url):
+    """Brotli size of a same-origin static file, or None if external."""
+    if not url.startswith(settings.STATIC_URL) and not url.startswith('/' + settings.STATIC_URL):
+        return None
+    path = finders.find(url.lstrip('/')[len(settings.STATIC_URL.lstrip('/')):])
+    with open(path, 'rb') as f:
+        return len(brotli.compress(f.read()))
+
+
+def measure(clients):
+    rows = []
+    for role, name in PAGES:
+        html = clients[role].get(reverse(name)).content
+        sizes = [asset_size(url) for url in ASSET.findall(html.decode())]
+        rows.append((role or 'anonymous', name, len(html), len(gzip.compress(html)),
+                     sum(s for s in sizes if s is not None), sum(s is None for s in sizes)))
+    return rows
+
+
+def report(label, rows):
+    print(f'\n{label}')
+    print(f'{"page":30} {"html":>8} {"html gz":>8} {"assets br":>10} {"external":>8} {"first visit":>12} {"repeat":>8}')
+    for role, name, raw, gz, assets, external in rows:
+        print(f'{role + " " + name:30} {raw:8} {gz:8} {assets:10} {external:8} {gz + assets:12} {gz:8}')
+    total = sum(row[3] for row in rows)
+    print(f'{"repeat visits, all pages":30} {total:8} bytes of gzipped HTML')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--before', help='another templates/base.html to measure first')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['testserver']
+    # Unhashed URLs, so the files are found without running collectstatic
+    settings.STORAGES = {**settings.STORAGES, 'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    }}
+    override_dir = tempfile.mkdtemp()
+    engine = engines['django'].engine
+    engine.dirs.insert(0, override_dir)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        owner = seed()
+        clients = {None: Client(), 'owner': Client()}
+        clients['owner'].force_login(owner)
+        if args.before:
+            shutil.copy(args.before, os.path.join(override_dir, 'base.html'))
+            report(f'before ({args.before})', measure(clients))
+            os.remove(os.path.join(override_dir, 'base.html'))
+            for loader in engine.template_loaders:
+                loader.reset()
+        report('current templates/base.html', measure(clients))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(override_dir)
+
+
+if __name__ == '__main__':
+    main()
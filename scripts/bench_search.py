@@ -0,0 +1,113 @@
+"""Time the full-text booking search on a large synthetic dataset.
+
+Seeds a throwaway SQLite database with ``--bookings`` bookings spread over
+``--centers`` service centers (the FTS5 index is filled by its triggers as
+the rows are inserted), then times ranked searches for one center through
+the manage bookings page's search function:
+
+    python scripts/bench_search.py --bookings 1000000 --centers 1000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time as clock
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment
+
+from booking.models import Booking, ServiceCategory, ServiceCenter, User, Vehicle
+from booking.search import search_bookings
+
+FIRST_NAMES = ['Ravi', 'Anita', 'Suresh', 'Priya', 'Arjun', 'Meena', 'Kiran', 'Divya', 'Rahul', 'Sneha']
+LAST_NAMES = ['Kumar', 'Sharma', 'Reddy', 'Nair', 'Patel', 'Iyer', 'Singh', 'Rao', 'Das', 'Menon']
+PROBLEMS = [
+    'Brake squeal on front wheel', 'Engine oil change and filter', 'AC not cooling', 'Clutch slipping in traffic',
+    'Battery drains overnight', 'Steering vibration at speed', 'Periodic service', 'Headlight replacement',
+    'Coolant leak under engine', 'Gearbox noise when shifting',
+]
+QUERIES = ['brake', 'ka01', 'ravi kumar', 'coolant leak', '98450', 'periodic service', 'zzzz']
+
+
+def seed(bookings, centers, owners):
+    rng = random.Random(0)
+    center_users = User.objects.bulk_create(
+        [User(username=f'bench_center_{i}', role='service_center') for i in range(centers)], batch_size=5000,
+    )
+    center_rows = ServiceCenter.objects.bulk_create([
+        ServiceCenter(user=u, name=f'Center {i}', address='-', phone='-', email='c@example.com')
+        for i, u in enumerate(center_users)
+    ], batch_size=5000)
+    owner_users = User.objects.bulk_create([
+        User(username=f'owner{i}', role='owner', first_name=rng.choice(FIRST_NAMES),
+             last_name=rng.choice(LAST_NAMES), phone=f'+91 9845{i:06d}')
+        for i in range(owners)
+    ], batch_size=5000)
+    vehicles = Vehicle.objects.bulk_create([
+        Vehicle(owner=u, vehicle_type='car', brand='B', model='M', year=2020,
+                registration_number=f'KA-{i % 60:02d}-{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}-{i % 10000:04d}')
+        for i, u in enumerate(owner_users)
+    ], batch_size=5000)
+    category = ServiceCategory.objects.create(name='General')
+
+    statuses = [s for s, _ in Booking.STATUS_CHOICES]
+    today = date.today()
+    batch = []
+    for i in range(bookings):
+        batch.append(Booking(
+            vehicle=rng.choice(vehicles), service_center=rng.choice(center_rows), service_category=category,
+            booking_date=today + timedelta(days=rng.randrange(-365, 30)), booking_time=time(10),
+            service_description=rng.choice(PROBLEMS), status=rng.choice(statuses), estimated_cost=Decimal('100.00'),
+        ))
+        if len(batch) == 20000:
+            Booking.objects.bulk_create(batch)
+            batch = []
+    Booking.objects.bulk_create(batch)
+    return center_rows[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--centers', type=int, default=1000)
+    parser.add_argument('--owners', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        started = clock.perf_counter()
+        center = seed(args.bookings, args.centers, args.owners)
+        print(f'seeded {args.bookings} bookings (with search index) in {clock.perf_counter() - started:.1f}s')
+
+        factory = RequestFactory()
+        for query in QUERIES:
+            for page in (1, 3):
+                request = factory.get('/service-center/bookings/', {'q': query, 'page': page})
+                timings = []
+                for _ in range(args.repeat):
+                    started = clock.perf_counter()
+                    result = search_bookings(request, center, query)
+                    timings.append((clock.perf_counter() - started) * 1000)
+                timings.sort()
+                print(f'{query!r:20} page {page}: {len(result.items):2} results, '
+                      f'median {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Build static/css/icons.css from the vendored Bootstrap Icons sprite.
+
+The templates use about fifty icons as ``<i class="bi bi-NAME">``. Instead
+of the full icon font (its CSS plus a font file, for some two thousand
+icons), each icon the templates and views mention is written out as a
+CSS mask, so the ``<i>`` markup keeps working and the stylesheet is about
+8 KB compressed. The sprite (about 1 MB) is only read here, so it is kept
+in assets/ rather than static/, where collectstatic would copy and
+compress it on every deploy. Run again after using a new icon:
+
+    python scripts/build_icon_css.py
+"""
+import os
+import re
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPRITE = os.path.join(BASE_DIR, 'assets', 'bootstrap-icons', 'bootstrap-icons.svg')
+OUTPUT = os.path.join(BASE_DIR, 'static', 'css', 'icons.css')
+SOURCES = [os.path.join(BASE_DIR, 'templates'), os.path.join(BASE_DIR, 'booking')]
+
+ICON = re.compile(r'\bbi-([a-z0-9-]+)')
+SYMBOL = re.compile(r'<symbol [^>]*?viewBox="([^"]+)" id="([^"]+)">(.*?)</symbol>', re.S)
+
+HEADER = """\
+/* Generated by scripts/build_icon_css.py from Bootstrap Icons
+ * (https://icons.getbootstrap.com/, MIT License). Do not edit. */
+.bi::before,
+[class^="bi-"]::before,
+[class*=" bi-"]::before {
+    content: "";
+    display: inline-block;
+    width: 1em;
+    height: 1em;
+    vertical-align: -.125em;
+    background-color: currentColor;
+    -webkit-mask: var(--bi) no-repeat center / contain;
+    mask: var(--bi) no-repeat center / contain;
+}
+"""
+
+
+def data_uri(svg):
+    # Only what a quoted CSS url() and a data: URI need escaped
+    svg = svg.replace('"', "'").replace('%', '%25').replace('#', '%23').replace('<', '%3C').replace('>', '%3E')
+    return f'data:image/svg+xml,{svg}'
+
+
+def used_icons():
+    names = set()
+    for root in SOURCES:
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.html', '.py')):
+                    with open(os.path.join(dirpath, filename), encoding='utf-8') as f:
+                        names.update(ICON.findall(f.read()))
+    return names
+
+
+def main():
+    with open(SPRITE, encoding='utf-8') as f:
+        symbols = {name: (view_box, body) for view_box, name, body in SYMBOL.findall(f.read())}
+    names = used_icons()
+    missing = sorted(names - symbols.keys())
+    if missing:
+        raise SystemExit(f'Not in {SPRITE}: {", ".join(missing)}')
+
+    rules = []
+    for name in sorted(names):
+        view_box, body = symbols[name]
+        svg = f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}">{body}</svg>'
+        rules.append(f'.bi-{name} {{ --bi: url("{data_uri(svg)}"); }}\n')
+    with open(OUTPUT, 'w', encoding='utf-8') as f:
+        f.write(HEADER + ''.join(rules))
+    print(f'wrote {len(rules)} icons to {os.path.relpath(OUTPUT, BASE_DIR)} ({os.path.getsize(OUTPUT)} bytes)')
+
+
+if __name__ == '__main__':
+    main()
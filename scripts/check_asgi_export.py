@@ -0,0 +1,156 @@
+"""Check that exports are streamed under the ASGI server.
+
+Django 4.2 collects a sync iterator into a list before sending any of it
+when serving ASGI (and warns about it), which would hold a whole export
+in memory. This downloads one month's and the full export through
+vehicle_service/asgi.py and fails if Django warns, if the full export
+takes more memory than the month's by half the difference in their size
+or more, or if the file differs from the one served under WSGI. Runs
+against a throwaway database:
+
+    python scripts/check_asgi_export.py --rows 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tracemalloc
+import warnings
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from booking.models import Booking, ServiceCategory, ServiceCenter, User, Vehicle
+from vehicle_service.asgi import application
+
+SEED_BATCH = 5000
+
+
+def seed(rows):
+    user = User.objects.create_user('export_center', role='service_center')
+    center = ServiceCenter.objects.create(user=user, name='Export Center', address='-', phone='-',
+                                          email='e@example.com')
+    category = ServiceCategory.objects.create(name='General', base_price=Decimal('1500.00'))
+    owner = User.objects.create_user('export_owner', email='o@example.com', role='owner')
+    for lo in range(0, rows, SEED_BATCH):
+        hi = min(lo + SEED_BATCH, rows)
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(owner=owner, vehicle_type='car', brand='Brand', model='Model', year=2020,
+                    registration_number=f'EXP-{i}')
+            for i in range(lo, hi)
+        ])
+        Booking.objects.bulk_create([
+            Booking(vehicle=vehicle, service_center=center, service_category=category,
+                    # Half in January, so one month's export is more than
+                    # a chunk of rows too
+                    booking_date=date(2026, 1, 1) + timedelta(days=i % 31 if i % 2 else 31 + i % 269),
+                    booking_time=time(10),
+                    service_description='Periodic service, oil and filters', status='completed',
+                    estimated_cost=Decimal('1500.00'))
+            for i, vehicle in zip(range(lo, hi), vehicles)
+        ])
+    return user
+
+
+async def download(path, query, cookie, trace=True):
+    """Status and body size of a GET through the ASGI application, and
+    the most memory allocated at any point while serving it."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()
+
+    status, body = None, []
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            # Keep only the size, so the body doesn't count as held memory
+            body.append(len(message.get('body', b'')))
+
+    if not trace:
+        await application(scope, receive, send)
+        return status, sum(body), None
+    tracemalloc.start()
+    try:
+        await application(scope, receive, send)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return status, sum(body), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['testserver']
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = seed(args.rows)
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        wsgi = client.get('/export/bookings/', {'format': 'csv'})
+        expected = b''.join(wsgi.streaming_content)
+        del wsgi
+        connection.close()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            # Once untraced, so what is only allocated on first use (imports,
+            # caches) doesn't count
+            asyncio.run(download('/export/bookings/', 'format=csv', cookie, trace=False))
+            _, month_size, month_peak = asyncio.run(download('/export/bookings/', 'format=csv&month=2026-01', cookie))
+            status, size, peak = asyncio.run(download('/export/bookings/', 'format=csv', cookie))
+
+        failures = []
+        if status != 200:
+            failures.append(f'status {status}')
+        if size != len(expected):
+            failures.append(f'{size} bytes under ASGI, {len(expected)} under WSGI')
+        failures += [f'warning: {warning.message}' for warning in caught]
+        if peak - month_peak >= (size - month_size) / 2:
+            failures.append(f'memory grows with the export: {month_peak / 2 ** 20:.1f} MB for one month, '
+                            f'{peak / 2 ** 20:.1f} MB for all')
+
+        mb = 2 ** 20
+        print(f'one month: {month_size / mb:.1f} MB, {month_peak / mb:.1f} MB allocated at most')
+        print(f'{args.rows} rows: {size / mb:.1f} MB, {peak / mb:.1f} MB allocated at most')
+        for failure in failures:
+            print(f'FAIL {failure}')
+        if failures:
+            return 1
+        print('PASS')
+        return 0
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Check that the dashboard and list queries are served by indexes.
+
+Seeds a throwaway SQLite database with a large dataset, renders the
+dashboards and booking lists for each role while capturing their SQL, and
+runs EXPLAIN QUERY PLAN on every captured query that reads bookings or
+invoices. A plain ``SCAN booking_booking`` / ``SCAN booking_invoice``
+(a full table scan without any index) fails the check:
+
+    python scripts/check_query_plans.py --bookings 50000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from booking.models import Booking, Invoice, Mechanic, ServiceCategory, ServiceCenter, User, Vehicle
+
+PAGES = {
+    'owner': ['/dashboard/', '/my-bookings/'],
+    'service_center': ['/dashboard/', '/service-center/bookings/', '/service-center/bookings/?status=pending', '/service-center/analytics/'],
+    'mechanic': ['/dashboard/', '/mechanic/tasks/'],
+}
+
+FULL_SCAN = re.compile(r'SCAN (booking_booking|booking_invoice)\s*$')
+HOT_TABLES = re.compile(r'"booking_(booking|invoice)"')
+
+
+def seed(bookings, centers, owners):
+    rng = random.Random(0)
+    center_users = User.objects.bulk_create([User(username=f'plan_center_{i}', role='service_center') for i in range(centers)])
+    center_rows = ServiceCenter.objects.bulk_create([
+        ServiceCenter(user=u, name=f'Center {i}', address='-', phone='-', email='c@example.com')
+        for i, u in enumerate(center_users)
+    ])
+    mech_users = User.objects.bulk_create([User(username=f'plan_mech_{i}', role='mechanic') for i in range(centers * 3)])
+    mechanics = Mechanic.objects.bulk_create([
+        Mechanic(user=u, service_center=center_rows[i % centers]) for i, u in enumerate(mech_users)
+    ])
+    owner_users = User.objects.bulk_create([User(username=f'plan_owner_{i}', role='owner') for i in range(owners)])
+    vehicles = Vehicle.objects.bulk_create([
+        Vehicle(owner=u, vehicle_type='car', brand='B', model='M', year=2020, registration_number=f'PLAN-{i}')
+        for i, u in enumerate(owner_users)
+    ])
+    categories = ServiceCategory.objects.bulk_create([ServiceCategory(name=f'Category {i}') for i in range(8)])
+
+    statuses = [s for s, _ in Booking.STATUS_CHOICES]
+    today = date.today()
+    now = timezone.now()
+    rows = []
+    for i in range(bookings):
+        status = rng.choice(statuses)
+        center_index = rng.randrange(centers)
+        rows.append(Booking(
+            vehicle=rng.choice(vehicles), service_center=center_rows[center_index],
+            service_category=rng.choice(categories),
+            mechanic=mechanics[center_index + centers * rng.randrange(3)] if status != 'pending' else None,
+            booking_date=today + timedelta(days=rng.randrange(-365, 30)), booking_time=time(10),
+            service_description='-', status=status, estimated_cost=Decimal('100.00'),
+            completed_at=now - timedelta(days=rng.randrange(365)) if status == 'completed' else None,
+        ))
+    created = Booking.objects.bulk_create(rows, batch_size=5000)
+    Invoice.objects.bulk_create([
+        Invoice(booking=b, invoice_number=f'PLAN-{b.id}', subtotal=Decimal('100.00'), total=Decimal('118.00'),
+                payment_status=rng.choice(['pending', 'paid']))
+        for b in created if b.status in ('accepted', 'completed', 'ready_for_delivery')
+    ], batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return owner_users[0], center_users[0], mech_users[0]
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=50000)
+    parser.add_argument('--centers', type=int, default=100)
+    parser.add_argument('--owners', type=int, default=5000)
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['testserver']
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        owner, center, mechanic = seed(args.bookings, args.centers, args.owners)
+        users = {'owner': owner, 'service_center': center, 'mechanic': mechanic}
+
+        failed = False
+        for role, urls in PAGES.items():
+            client = Client()
+            client.force_login(users[role])
+            for url in urls:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = client.get(url)
+                assert response.status_code == 200, (role, url, response.status_code)
+                for query in ctx.captured_queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT') or not HOT_TABLES.search(sql):
+                        continue
+                    plan = explain(sql)
+                    scans = [line for line in plan if FULL_SCAN.search(line)]
+                    failed |= bool(scans)
+                    if scans or args.verbose:
+                        print(f"{'FAIL' if scans else 'ok'} {role} {url}\n  {sql[:200]}")
+                        for line in plan:
+                            print(f'    {line}')
+                print(f'checked {role:15} {url}')
+        print('FAIL' if failed else 'PASS')
+        return 1 if failed else 0
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
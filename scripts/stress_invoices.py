@@ -0,0 +1,132 @@
+"""Create invoices concurrently and check that every booking gets exactly
+one and that the year's numbers have no gaps or duplicates.
+
+Several threads race ``get_or_create_invoice`` on the same bookings while
+another runs the month-end batch over them. Then the batch is timed on a
+larger set of completed bookings. The numbering rules themselves are
+tested in booking/tests/test_invoices.py; this runs them under load,
+against a throwaway database:
+
+    python scripts/stress_invoices.py --threads 50 --bookings 200 --batch 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time as clock
+from datetime import date, time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection, connections
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from booking.invoices import get_or_create_invoice, invoice_completed_bookings, invoice_number
+from booking.models import Booking, Invoice, InvoiceSequence, ServiceCategory, ServiceCenter, User, Vehicle
+
+
+def add_bookings(center, category, owner, n, prefix):
+    vehicle = Vehicle.objects.create(owner=owner, vehicle_type='car', brand='B', model='M', year=2020,
+                                     registration_number=prefix)
+    return Booking.objects.bulk_create([
+        Booking(vehicle=vehicle, service_center=center, service_category=category, booking_date=date.today(),
+                booking_time=time(10), service_description='stress test', status='completed',
+                estimated_cost=Decimal('100.00') + i, completed_at=timezone.now())
+        for i in range(n)
+    ])
+
+
+def pay(booking_ids, barrier, results):
+    barrier.wait()
+    try:
+        for booking_id in booking_ids:
+            _, created = get_or_create_invoice(Booking.objects.get(pk=booking_id))
+            results.append('created' if created else 'existing')
+    except Exception as exc:  # report anything unexpected, e.g. lock timeouts
+        results.append(f'error: {exc}')
+    finally:
+        connections.close_all()
+
+
+def month_end(barrier, results):
+    barrier.wait()
+    try:
+        results.append(('batch', invoice_completed_bookings(batch_size=50)))
+    except Exception as exc:
+        results.append(f'error: {exc}')
+    finally:
+        connections.close_all()
+
+
+def check_numbers():
+    year = timezone.localdate().year
+    numbers = sorted(Invoice.objects.values_list('invoice_number', flat=True))
+    expected = sorted(invoice_number(year, n) for n in range(1, len(numbers) + 1))
+    last = InvoiceSequence.objects.get(year=year).last
+    return numbers == expected and last == len(numbers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--bookings', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=5000, help='completed bookings for the timed batch run')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    db_file = os.path.join(tempfile.mkdtemp(), 'stress.sqlite3')
+    connection.settings_dict['TEST']['NAME'] = db_file
+    connection.settings_dict.setdefault('OPTIONS', {})['timeout'] = 60
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        owner = User.objects.create_user('stress_owner', password='x', role='owner')
+        center_user = User.objects.create_user('stress_center', password='x', role='service_center')
+        center = ServiceCenter.objects.create(user=center_user, name='Stress Center', address='-', phone='-',
+                                              email='s@example.com')
+        category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+        ids = [b.id for b in add_bookings(center, category, owner, args.bookings, 'STRESS-1')]
+
+        barrier = threading.Barrier(args.threads + 1)
+        results = []
+        workers = [threading.Thread(target=month_end, args=(barrier, results))]
+        for _ in range(args.threads):
+            workers.append(threading.Thread(target=pay, args=(random.sample(ids, min(20, len(ids))), barrier, results)))
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        errors = [r for r in results if isinstance(r, str) and r.startswith('error')]
+        created = results.count('created') + sum(r[1] for r in results if isinstance(r, tuple))
+        invoices = Invoice.objects.count()
+        print(f"threads={args.threads} bookings={args.bookings} created={created} invoices={invoices} "
+              f"errors={len(errors)}")
+        for e in errors[:5]:
+            print(' ', e)
+        ok = created == invoices == args.bookings and not errors and check_numbers()
+
+        add_bookings(center, category, owner, args.batch, 'STRESS-2')
+        started = clock.perf_counter()
+        batch_created = invoice_completed_bookings()
+        elapsed = clock.perf_counter() - started
+        print(f"month-end batch: {batch_created} invoices in {elapsed:.2f}s "
+              f"({batch_created / elapsed:.0f}/s)")
+        ok = ok and batch_created == args.batch and check_numbers()
+
+        print('PASS' if ok else 'FAIL')
+        return 0 if ok else 1
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Run many jobs through several worker pools at once and check that every
+job ran to success, that failing jobs were retried and ended up dead after
+their last attempt, and how often a job ran more than once.
+
+Each pool stands in for a ``run_workers`` process. Runs against a
+throwaway database:
+
+    python scripts/stress_jobs.py --jobs 2000 --pools 3 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection, connections
+from django.test.utils import setup_test_environment
+
+from booking import jobs
+from booking.jobs import enqueue, work
+from booking.models import Job
+
+runs = Counter()
+_lock = threading.Lock()
+
+
+def flaky(n, fail_times):
+    """Job: fails its first ``fail_times`` runs."""
+    with _lock:
+        runs[n] += 1
+        attempt = runs[n]
+    time.sleep(0.001)  # a little I/O
+    if attempt <= fail_times:
+        raise RuntimeError(f'attempt {attempt} of job {n} failed')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--pools', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    db_file = os.path.join(tempfile.mkdtemp(), 'stress.sqlite3')
+    connection.settings_dict['TEST']['NAME'] = db_file
+    connection.settings_dict.setdefault('OPTIONS', {})['timeout'] = 60
+    old_name = connection.creation.create_test_db(verbosity=0)
+    jobs.BACKOFF_BASE = 0  # retry at once
+    jobs.logger.disabled = True
+    try:
+        # One in ten jobs fails once, one in a hundred every time
+        for n in range(args.jobs):
+            enqueue(flaky, n=n, fail_times=99 if n % 100 == 0 else 1 if n % 10 == 0 else 0, max_attempts=3)
+        connections.close_all()
+
+        results = []
+        started = time.perf_counter()
+        pools = [
+            threading.Thread(target=lambda: results.append(work(workers=args.workers, until_empty=True)))
+            for _ in range(args.pools)
+        ]
+        for pool in pools:
+            pool.start()
+        for pool in pools:
+            pool.join()
+        elapsed = time.perf_counter() - started
+
+        statuses = dict(Job.objects.values_list('status').annotate(n=django.db.models.Count('id')))
+        expected_dead = len(range(0, args.jobs, 100))
+        expected_runs = args.jobs + (args.jobs // 10 - expected_dead) + expected_dead * 2
+        total_runs = sum(runs.values())
+        succeeded = sum(r[0] for r in results)
+        print(f'jobs={args.jobs} pools={args.pools} workers={args.workers} {elapsed:.2f}s '
+              f'({total_runs / elapsed:.0f} runs/s)')
+        print(f'statuses={statuses} succeeded={succeeded} runs={total_runs} (expected {expected_runs})')
+
+        ok = (statuses.get('done') == args.jobs - expected_dead and statuses.get('dead') == expected_dead
+              and all(runs[n] for n in range(args.jobs)))
+        print('PASS' if ok else 'FAIL')
+        return 0 if ok else 1
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Fire many simultaneous bookings at one service center slot and check
+that no more than ``bays`` of them succeed.
+
+Runs against a throwaway database so it is safe to use on a dev checkout:
+
+    python scripts/stress_slot_booking.py --threads 300 --bays 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection, connections, transaction
+from django.test.utils import setup_test_environment
+
+from booking.models import Booking, BookingSlot, ServiceCategory, ServiceCenter, User, Vehicle
+from booking.slots import SlotUnavailable, reserve_slot
+
+
+def book(center, category, vehicle, when, barrier, results):
+    barrier.wait()
+    try:
+        with transaction.atomic():
+            slot = reserve_slot(center, when, time(10, 15))
+            Booking.objects.create(
+                vehicle=vehicle, service_center=center, service_category=category,
+                slot=slot, booking_date=when, booking_time=slot.start_time,
+                service_description='stress test', estimated_cost=category.base_price,
+            )
+        results.append('ok')
+    except SlotUnavailable:
+        results.append('full')
+    except Exception as exc:  # report anything unexpected, e.g. lock timeouts
+        results.append(f'error: {exc}')
+    finally:
+        connections.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=300)
+    parser.add_argument('--bays', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    db_file = os.path.join(tempfile.mkdtemp(), 'stress.sqlite3')
+    connection.settings_dict['TEST']['NAME'] = db_file
+    connection.settings_dict.setdefault('OPTIONS', {})['timeout'] = 60
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        owner = User.objects.create_user('stress_owner', password='x', role='owner')
+        center_user = User.objects.create_user('stress_center', password='x', role='service_center')
+        center = ServiceCenter.objects.create(
+            user=center_user, name='Stress Center', address='-', phone='-', email='s@example.com',
+            bays=args.bays, slot_minutes=60,
+        )
+        category = ServiceCategory.objects.create(name='General', base_price=Decimal('100.00'))
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(owner=owner, vehicle_type='car', brand='B', model='M', year=2020,
+                    registration_number=f'STRESS-{i}')
+            for i in range(args.threads)
+        ])
+        when = date.today() + timedelta(days=1)
+
+        barrier = threading.Barrier(args.threads)
+        results = []
+        workers = [
+            threading.Thread(target=book, args=(center, category, v, when, barrier, results))
+            for v in vehicles
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        booked = Booking.objects.filter(service_center=center, booking_date=when).count()
+        slot = BookingSlot.objects.get(service_center=center, date=when)
+        errors = [r for r in results if r.startswith('error')]
+        print(f"threads={args.threads} bays={args.bays} ok={results.count('ok')} "
+              f"full={results.count('full')} errors={len(errors)}")
+        print(f"bookings in slot={booked} slot.booked={slot.booked}")
+        for e in errors[:5]:
+            print(' ', e)
+
+        ok = booked == slot.booked == results.count('ok') == min(args.bays, args.threads) and not errors
+        print('PASS' if ok else 'FAIL')
+        return 0 if ok else 1
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
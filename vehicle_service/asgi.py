@@ -13,7 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehicle_service.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from booking.events import watch_disconnect  # noqa: E402
+
+# Closes live status streams (booking/events.py) when the browser goes away
+application = watch_disconnect(django_application)
 
 
 
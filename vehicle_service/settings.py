@@ -36,9 +36,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves the collected static files (gzip/brotli variants, far-future
+    # Cache-Control for the hashed names) without a separate web server.
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'booking.auth.RoleProfileMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -108,6 +112,51 @@ else:
     }
 
 
+# Cache
+# Computed dashboard/analytics contexts are cached per service center (see
+# booking/cache.py) under version stamps that move on every write. The
+# stamps live in the 'stamps' cache, which every worker process must share
+# so that each one sees a write as soon as it commits: Redis when REDIS_URL
+# is set, otherwise a database table (created by ``migrate``, see
+# migration 0019). Without Redis the cached values themselves stay in each
+# process's memory.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'stamps': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'stamps',
+            'TIMEOUT': None,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'vehicle-service',
+        },
+        'stamps': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_stamps',
+            'TIMEOUT': None,
+            # One stamp per center and per user; a culled one is simply
+            # redrawn, which only costs a reload
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+
+# Threads per process that run a page's independent queries at the same
+# time, each on its own connection (see booking/parallel.py); 0 runs them
+# one after another.
+DB_QUERY_THREADS = config('DB_QUERY_THREADS', default=4, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -146,6 +195,17 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic writes content-hashed copies of every file (plus .gz and
+# .br variants) and {% static %} links to them, so browsers can cache them
+# forever. Needs collectstatic, so development and tests keep plain names.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -156,7 +216,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom User Model
 AUTH_USER_MODEL = 'booking.User'
+# Loads request.user with its service center/mechanic profile joined in
+AUTHENTICATION_BACKENDS = ['booking.auth.RoleProfileBackend']
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 
+
+# Email (see DEPLOYMENT.md). Sent by the background workers (booking/jobs.py);
+# the timeout keeps a hung SMTP server from holding a worker indefinitely.
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER or 'webmaster@localhost')
+# Notifications to the same user within this many seconds go out as one
+# digest email (booking/notifications.py).
+NOTIFICATION_DIGEST_SECONDS = config('NOTIFICATION_DIGEST_SECONDS', default=60, cast=int)